@@ -0,0 +1,296 @@
+"""Benchmark: API endpoint latency and throughput on a seeded in-memory store.
+
+Run from the backend directory:
+    python benchmarks/bench_endpoints.py [--reviews 10000] [--requests 200] [--mode both]
+    python benchmarks/bench_endpoints.py --reviews 100000 --save-baseline
+
+Seeds sample_reviews/sample_users with synthetic reviews, then drives every
+/api/reviews filter and sort combination, /api/trending and POST /api/reviews
+through the Flask test client and through a real WSGI server (werkzeug, in a
+background thread, keep-alive connections from --concurrency client threads).
+
+Results are compared with the baseline stored for the same mode, scenario and
+store size in --baseline; the run exits with status 1 when p95 latency or
+throughput regresses by more than --tolerance, and with status 2 when no
+baseline matches the run at all. Baselines are machine-specific: record them
+with --save-baseline on the machine that runs the comparison.
+
+The response cache is off unless --cache is given, so every request runs its
+handler, and the rate limit is raised far above what the run sends.
+"""
+import argparse
+import datetime
+import http.client
+import itertools
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+from urllib.parse import urlencode
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+DEFAULT_BASELINE = os.path.join(BACKEND_DIR, 'benchmarks', 'baselines', 'endpoints.json')
+
+RESTAURANT_COUNT = 500
+USER_COUNT = 5000
+WORDS = ["great", "food", "slow", "service", "tasty", "cozy", "the", "pasta", "was", "really",
+         "friendly", "staff", "would", "come", "back", "portions", "dessert", "a", "bit", "pricey"]
+
+FILTERS = {
+    'all': lambda rng: {},
+    'restaurant': lambda rng: {'restaurant': restaurant_name(rng.randrange(RESTAURANT_COUNT))},
+    'user': lambda rng: {'userId': user_id(rng.randrange(USER_COUNT))},
+    'minRating': lambda rng: {'minRating': rng.randint(2, 5)},
+    'restaurant+minRating': lambda rng: {'restaurant': restaurant_name(rng.randrange(RESTAURANT_COUNT)),
+                                         'minRating': rng.randint(2, 5)},
+    'user+minRating': lambda rng: {'userId': user_id(rng.randrange(USER_COUNT)),
+                                   'minRating': rng.randint(2, 5)}
+}
+SORTS = [('timestamp', 'desc'), ('timestamp', 'asc'), ('rating', 'desc'), ('rating', 'asc')]
+
+def restaurant_name(number):
+    return f"Restaurant {number:04d}"
+
+def user_id(number):
+    return f"bench-user{number}"
+
+def configure_environment(args):
+    """Settings that must be in place before server is imported"""
+    os.environ['RATE_LIMIT_BACKEND'] = 'memory'
+    os.environ['RATE_LIMIT_REQUESTS'] = str(10 ** 12)
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    if not args.cache:
+        os.environ['RESPONSE_CACHE_SIZE'] = '0'
+    # Always benchmark the in-memory store, even where credentials exist
+    os.environ['FIREBASE_CREDENTIALS'] = os.path.join(BACKEND_DIR, 'benchmarks', 'no-credentials.json')
+    os.environ.pop('WRITE_BEHIND', None)
+
+def make_review(rng, number, base):
+    timestamp = base + datetime.timedelta(seconds=rng.randrange(365 * 86400))
+    return {
+        "id": f"bench{number}",
+        "restaurant": restaurant_name(rng.randrange(RESTAURANT_COUNT)),
+        "rating": rng.randint(1, 5),
+        "foodRating": rng.randint(1, 5),
+        "serviceRating": rng.randint(1, 5),
+        "ambianceRating": rng.randint(1, 5),
+        "review": " ".join(rng.choice(WORDS) for _ in range(rng.randint(10, 60))),
+        "photoUrl": None,
+        "userId": user_id(rng.randrange(USER_COUNT)),
+        "userName": "Bench User",
+        "location": {"latitude": 37.7 + rng.random() / 10, "longitude": -122.4 + rng.random() / 10},
+        "timestamp": timestamp.isoformat()
+    }
+
+def seed(server, count, seed_value=7):
+    rng = random.Random(seed_value)
+    base = datetime.datetime(2024, 1, 1)
+    start = time.perf_counter()
+    server.sample_reviews.extend(make_review(rng, number, base) for number in range(count))
+    for number in range(USER_COUNT):
+        server.sample_users.setdefault(user_id(number), {
+            "name": "Bench User", "email": f"bench{number}@example.com",
+            "favorites": [], "reviewCount": 0, "createdAt": base.isoformat()
+        })
+    print(f"Seeded {count} reviews in {time.perf_counter() - start:.1f}s "
+          f"({len(server.sample_reviews)} in the store)")
+
+def scenarios(requests, rng):
+    """(name, [(method, path, body)]) for every benchmarked request mix"""
+    for (filter_name, make_filter), (sort_by, order) in itertools.product(FILTERS.items(), SORTS):
+        calls = []
+        for _ in range(requests):
+            params = dict(make_filter(rng), sortBy=sort_by, order=order)
+            calls.append(('GET', '/api/reviews?' + urlencode(params), None))
+        yield f"reviews[{filter_name}] {sort_by} {order}", calls
+    yield 'trending', [('GET', '/api/trending', None)] * requests
+    posts = []
+    for _ in range(requests):
+        posts.append(('POST', '/api/reviews', {
+            "restaurant": restaurant_name(rng.randrange(RESTAURANT_COUNT)),
+            "rating": rng.randint(1, 5),
+            "review": " ".join(rng.choice(WORDS) for _ in range(30)),
+            "userId": user_id(rng.randrange(USER_COUNT)),
+            "userName": "Bench User"
+        }))
+    yield 'create review', posts
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile"""
+    index = max(0, math.ceil(pct / 100 * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+def summarize(latencies, elapsed):
+    values = sorted(latencies)
+    return {
+        'requests': len(values),
+        'p50_ms': percentile(values, 50) * 1000,
+        'p95_ms': percentile(values, 95) * 1000,
+        'p99_ms': percentile(values, 99) * 1000,
+        'throughput_rps': len(values) / elapsed if elapsed else 0.0
+    }
+
+def check_status(method, path, status):
+    expected = 201 if method == 'POST' else 200
+    if status != expected:
+        raise RuntimeError(f"{method} {path} returned {status}, expected {expected}")
+
+def run_test_client(app, calls):
+    client = app.test_client()
+    latencies = []
+    start = time.perf_counter()
+    for method, path, body in calls:
+        request_start = time.perf_counter()
+        response = client.open(path, method=method, json=body)
+        response.get_data()
+        latencies.append(time.perf_counter() - request_start)
+        check_status(method, path, response.status_code)
+    return summarize(latencies, time.perf_counter() - start)
+
+def start_wsgi_server(app):
+    from werkzeug.serving import WSGIRequestHandler, make_server
+
+    class KeepAliveHandler(WSGIRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_request(self, *args, **kwargs):
+            pass
+
+    server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=KeepAliveHandler)
+    threading.Thread(target=server.serve_forever, name='bench-wsgi', daemon=True).start()
+    return server
+
+def run_wsgi(port, calls, concurrency):
+    pending = iter(calls)
+    pending_lock = threading.Lock()
+    latencies = []
+    errors = []
+
+    def worker():
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+        try:
+            while not errors:
+                with pending_lock:
+                    call = next(pending, None)
+                if call is None:
+                    return
+                method, path, body = call
+                payload = json.dumps(body).encode('utf-8') if body is not None else None
+                headers = {'Content-Type': 'application/json'} if body is not None else {}
+                request_start = time.perf_counter()
+                connection.request(method, path, body=payload, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                elapsed = time.perf_counter() - request_start
+                try:
+                    check_status(method, path, response.status)
+                except RuntimeError as e:
+                    errors.append(e)
+                    return
+                latencies.append(elapsed)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+    return summarize(latencies, time.perf_counter() - start)
+
+def compare(results, baseline, tolerance):
+    """Descriptions of every result worse than its baseline by more than tolerance"""
+    regressions = []
+    for key, result in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        if result['p95_ms'] > base['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{key}: p95 {result['p95_ms']:.2f} ms vs baseline {base['p95_ms']:.2f} ms")
+        if result['throughput_rps'] < base['throughput_rps'] * (1 - tolerance):
+            regressions.append(f"{key}: {result['throughput_rps']:.0f} req/s "
+                               f"vs baseline {base['throughput_rps']:.0f} req/s")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--reviews', type=int, default=10000, help="synthetic reviews to seed (10k-1M)")
+    parser.add_argument('--requests', type=int, default=200, help="requests per scenario")
+    parser.add_argument('--mode', choices=('test-client', 'wsgi', 'both'), default='both')
+    parser.add_argument('--concurrency', type=int, default=4, help="client threads against the WSGI server")
+    parser.add_argument('--cache', action='store_true', help="keep the response cache enabled")
+    parser.add_argument('--only', help="run only scenarios whose name contains this text")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="baseline JSON file")
+    parser.add_argument('--save-baseline', action='store_true', help="record this run as the baseline")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="allowed p95/throughput regression before failing (0.25 = 25%%)")
+    parser.add_argument('--json', help="also write this run's results to this file")
+    args = parser.parse_args()
+
+    configure_environment(args)
+    import server  # noqa: E402 (configured through the environment above)
+
+    seed(server, args.reviews)
+    modes = ['test-client', 'wsgi'] if args.mode == 'both' else [args.mode]
+    wsgi_server = start_wsgi_server(server.app) if 'wsgi' in modes else None
+
+    results = {}
+    rng = random.Random(11)
+    print(f"{'mode':<12} {'scenario':<46} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'req/s':>9}")
+    for name, calls in scenarios(args.requests, rng):
+        if args.only and args.only not in name:
+            continue
+        for mode in modes:
+            if mode == 'wsgi':
+                result = run_wsgi(wsgi_server.server_port, calls, args.concurrency)
+            else:
+                result = run_test_client(server.app, calls)
+            key = f"{mode}:{name}:{args.reviews}"
+            results[key] = result
+            print(f"{mode:<12} {name:<46} {result['p50_ms']:8.2f} {result['p95_ms']:8.2f} "
+                  f"{result['p99_ms']:8.2f} {result['throughput_rps']:9.0f}")
+    if wsgi_server is not None:
+        wsgi_server.shutdown()
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    if args.save_baseline:
+        baseline.update(results)
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"Saved {len(results)} baselines to {args.baseline}")
+        return
+
+    compared = sum(1 for key in results if key in baseline)
+    if not compared:
+        # Nothing to compare with would otherwise pass every run
+        print(f"No baseline in {args.baseline} matches this run; record one with --save-baseline")
+        sys.exit(2)
+    if compared < len(results):
+        print(f"WARNING: {len(results) - compared} of {len(results)} results have no baseline "
+              f"and were not checked")
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"{len(regressions)} regressions against {args.baseline}:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print(f"No regressions in {compared} results")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""Benchmark: review sanitization, previous re.sub implementation vs. security.py.
+
+Run from the backend directory:
+    python benchmarks/bench_sanitizer.py [--reviews 2000] [--rounds 20] [--hostile 0.05]
+
+Checks that both implementations produce identical output before timing them.
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from security import sanitize_review_input, sanitize_string  # noqa: E402
+
+WORDS = ["great", "food", "slow", "service", "tasty", "cozy", "the", "pasta", "was", "really",
+         "friendly", "staff,", "would", "come", "back!", "portions", "dessert.", "(a", "bit)", "pricey"]
+HOSTILE = ['<script>alert(1)</script>', '<img src=x onerror=alert(1)>', 'javascript:alert(1)',
+           'JaVaScRiPt:void(0)', '<a href="x" onclick=steal()>link</a>', 'java<b>script:', 'on<i>load=']
+
+# The implementation security.py had before it was precompiled
+def legacy_sanitize_string(input_str):
+    if not isinstance(input_str, str):
+        return input_str
+    sanitized = re.sub(r'<[^>]*>', '', input_str)
+    sanitized = re.sub(r'javascript:', '', sanitized, flags=re.IGNORECASE)
+    sanitized = re.sub(r'on\w+=', '', sanitized, flags=re.IGNORECASE)
+    return sanitized
+
+def legacy_sanitize_review_input(data):
+    sanitized_data = {}
+    for key, value in data.items():
+        if isinstance(value, str):
+            sanitized_data[key] = legacy_sanitize_string(value)
+        elif isinstance(value, dict):
+            sanitized_data[key] = legacy_sanitize_review_input(value)
+        elif isinstance(value, list):
+            sanitized_data[key] = [legacy_sanitize_string(item) if isinstance(item, str) else item
+                                   for item in value]
+        else:
+            sanitized_data[key] = value
+    return sanitized_data
+
+def make_text(rng, length, hostile):
+    words = []
+    size = 0
+    while size < length:
+        word = rng.choice(HOSTILE) if rng.random() < hostile / 10 else rng.choice(WORDS)
+        words.append(word)
+        size += len(word) + 1
+    return " ".join(words)[:length]
+
+def make_reviews(count, hostile, seed=7):
+    """POST bodies as the frontend sends them, with 1000-character review text"""
+    rng = random.Random(seed)
+    reviews = []
+    for i in range(count):
+        reviews.append({
+            "restaurant": make_text(rng, 30, hostile),
+            "rating": rng.randint(1, 5),
+            "foodRating": rng.randint(1, 5),
+            "serviceRating": rng.randint(1, 5),
+            "ambianceRating": rng.randint(1, 5),
+            "review": make_text(rng, 1000, hostile),
+            "photoUrl": None,
+            "userId": f"user{rng.randrange(1000)}",
+            "userName": "Synthetic User",
+            "location": {"latitude": 37.7 + rng.random() / 10, "longitude": -122.4 + rng.random() / 10},
+            "tags": [make_text(rng, 12, hostile) for _ in range(3)]
+        })
+    return reviews
+
+def time_rounds(function, reviews, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for review in reviews:
+            function(review)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--reviews', type=int, default=2000, help="reviews per round")
+    parser.add_argument('--rounds', type=int, default=20, help="passes over the reviews")
+    parser.add_argument('--hostile', type=float, default=0.05,
+                        help="fraction of fields containing markup or scripts")
+    args = parser.parse_args()
+
+    reviews = make_reviews(args.reviews, args.hostile)
+    for review in reviews:
+        for value in [review['review'], review['restaurant']] + review['tags']:
+            if sanitize_string(value) != legacy_sanitize_string(value):
+                sys.exit(f"Output differs for {value!r}")
+        if sanitize_review_input(review) != legacy_sanitize_review_input(review):
+            sys.exit(f"Output differs for review {review!r}")
+    print(f"Output identical for {len(reviews)} reviews")
+
+    total = args.reviews * args.rounds
+    results = {}
+    for name, function in (('legacy', legacy_sanitize_review_input), ('current', sanitize_review_input)):
+        elapsed = time_rounds(function, reviews, args.rounds)
+        results[name] = elapsed
+        print(f"{name:>8}: {elapsed / total * 1e6:8.2f} us/review ({total / elapsed:10.0f} reviews/s)")
+    print(f"speedup: {results['legacy'] / results['current']:.1f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""Benchmark: stdlib vs. orjson response serialization on the /api/reviews payload shape.
+
+Run from the backend directory:
+    python benchmarks/bench_serializer.py [--reviews 200] [--pages 200]
+"""
+import argparse
+import datetime
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask  # noqa: E402
+
+from serialization import ReviewJSONProvider, SERIALIZERS, orjson  # noqa: E402
+
+RESTAURANTS = ["Delicious Bites", "Golden Dragon", "Pasta Paradise", "Taco Town", "Sushi Central"]
+
+def make_page(count, seed=7):
+    """A page of reviews as Firestore returns them (aware datetimes, nested location)"""
+    rng = random.Random(seed)
+    base = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+    page = []
+    for i in range(count):
+        timestamp = base + datetime.timedelta(seconds=rng.randrange(365 * 86400))
+        page.append({
+            "id": f"review{i:06d}",
+            "restaurant": rng.choice(RESTAURANTS),
+            "rating": rng.randint(1, 5),
+            "foodRating": rng.randint(1, 5),
+            "serviceRating": rng.randint(1, 5),
+            "ambianceRating": rng.randint(1, 5),
+            "review": " ".join(rng.choice(["great", "food", "slow", "service", "tasty", "cozy"])
+                               for _ in range(rng.randint(10, 150))),
+            "photoUrl": None,
+            "userId": f"user{rng.randrange(1000)}",
+            "userName": "Synthetic User",
+            "location": {"latitude": 37.7 + rng.random() / 10, "longitude": -122.4 + rng.random() / 10},
+            "timestamp": timestamp,
+            "timestampUs": int(timestamp.timestamp() * 1000000)
+        })
+    return page
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--reviews', type=int, default=200, help="reviews per response")
+    parser.add_argument('--pages', type=int, default=200, help="responses to serialize")
+    args = parser.parse_args()
+
+    page = make_page(args.reviews)
+    results = {}
+    for name, serializer_class in SERIALIZERS.items():
+        if name == 'orjson' and orjson is None:
+            print("orjson not installed, skipping")
+            continue
+        app = Flask(__name__)
+        app.json = ReviewJSONProvider(app, serializer=serializer_class())
+        with app.app_context():
+            size = len(app.json.response(page).get_data())
+            start = time.perf_counter()
+            for _ in range(args.pages):
+                app.json.response(page)
+            elapsed = time.perf_counter() - start
+        results[name] = elapsed
+        print(f"{name:>7}: {elapsed / args.pages * 1000:8.3f} ms/response "
+              f"({args.pages / elapsed:8.1f} responses/s, {size} bytes)")
+
+    if len(results) == 2:
+        print(f"orjson speedup: {results['json'] / results['orjson']:.1f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Benchmark: cold start of the API server and the socket server.
+
+Run from the backend directory:
+    python benchmarks/bench_startup.py [--runs 5] [--json startup.json]
+
+Every run is a fresh interpreter. "import" is the time to import the module;
+"boot" is the first use of what is now initialized lazily (the first API
+request, including Firebase setup, and loading the VADER analyzer).
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOCKET_SERVER_DIR = os.path.join(os.path.dirname(BACKEND_DIR), 'socket-server')
+
+TARGETS = {
+    'server': (BACKEND_DIR, """
+import time
+start = time.perf_counter()
+import server
+imported = time.perf_counter()
+server.app.test_client().get('/api/health')
+booted = time.perf_counter()
+"""),
+    'socket_server': (SOCKET_SERVER_DIR, """
+import time
+start = time.perf_counter()
+import socket_server
+imported = time.perf_counter()
+socket_server.get_sentiment_analyzer()
+booted = time.perf_counter()
+""")
+}
+
+REPORT = """
+import json
+print(json.dumps({'import': imported - start, 'boot': booted - imported}))
+"""
+
+def measure(directory, code):
+    """Timings from one fresh interpreter, or None if the target cannot start here"""
+    result = subprocess.run([sys.executable, '-c', code + REPORT], cwd=directory,
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        errors = [line for line in result.stderr.splitlines() if 'Error' in line]
+        print(errors[-1] if errors else "failed")
+        return None
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5, help="fresh interpreters per target")
+    parser.add_argument('--json', help="also write the results to this file")
+    args = parser.parse_args()
+
+    results = {}
+    for name, (directory, code) in TARGETS.items():
+        runs = []
+        for _ in range(args.runs):
+            timings = measure(directory, code)
+            if timings is None:
+                break
+            runs.append(timings)
+        if not runs:
+            print(f"{name:>14}: skipped")
+            continue
+        summary = {}
+        for phase in ('import', 'boot'):
+            values = [run[phase] * 1000 for run in runs]
+            summary[phase] = {'median_ms': statistics.median(values), 'max_ms': max(values)}
+        results[name] = summary
+        print(f"{name:>14}: import {summary['import']['median_ms']:7.1f} ms "
+              f"(max {summary['import']['max_ms']:7.1f}), "
+              f"boot {summary['boot']['median_ms']:7.1f} ms (max {summary['boot']['max_ms']:7.1f})")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+if __name__ == '__main__':
+    main()
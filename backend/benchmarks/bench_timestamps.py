@@ -0,0 +1,99 @@
+"""Microbenchmark: legacy timestamp parsing cascade vs. epoch-microsecond sort keys.
+
+Run from the backend directory:
+    python benchmarks/bench_timestamps.py [--count 100000]
+"""
+import argparse
+import datetime
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from timestamps import normalize_review_timestamp, timestamp_sort_key  # noqa: E402
+
+def legacy_safe_timestamp_to_datetime(timestamp):
+    """The parser sort_by_timestamp used before timestamps were normalized at ingest"""
+    if timestamp is None:
+        return datetime.datetime.min.replace(tzinfo=None)
+    if isinstance(timestamp, datetime.datetime):
+        if timestamp.tzinfo is not None:
+            timestamp = timestamp.replace(tzinfo=None)
+        return timestamp
+    if hasattr(timestamp, 'seconds') and hasattr(timestamp, 'nanoseconds'):
+        return datetime.datetime.fromtimestamp(timestamp.seconds + timestamp.nanoseconds / 1e9).replace(tzinfo=None)
+    if isinstance(timestamp, str):
+        try:
+            dt = datetime.datetime.fromisoformat(timestamp)
+            if dt.tzinfo is not None:
+                dt = dt.replace(tzinfo=None)
+            return dt
+        except ValueError:
+            for fmt in ("%Y-%m-%dT%H:%M:%S.%fZ", "%Y-%m-%dT%H:%M:%SZ", "%Y-%m-%d"):
+                try:
+                    return datetime.datetime.strptime(timestamp, fmt)
+                except ValueError:
+                    continue
+            return datetime.datetime.min.replace(tzinfo=None)
+    return datetime.datetime.min.replace(tzinfo=None)
+
+def make_reviews(count, seed=42):
+    """Reviews with the mix of timestamp formats found in Firestore and the sample data"""
+    rng = random.Random(seed)
+    base = datetime.datetime(2024, 1, 1)
+    reviews = []
+    for i in range(count):
+        dt = base + datetime.timedelta(seconds=rng.randrange(365 * 86400), microseconds=rng.randrange(1000000))
+        kind = i % 5
+        if kind == 0:
+            timestamp = dt.isoformat()                                    # datetime.now().isoformat()
+        elif kind == 1:
+            timestamp = dt.strftime('%Y-%m-%dT%H:%M:%S.') + f"{dt.microsecond // 1000:03d}Z"  # JS toISOString()
+        elif kind == 2:
+            timestamp = dt.strftime('%Y-%m-%dT%H:%M:%SZ')
+        elif kind == 3:
+            timestamp = dt.replace(tzinfo=datetime.timezone.utc)         # Firestore datetime
+        else:
+            timestamp = dt.strftime('%Y-%m-%d')
+        reviews.append({'id': str(i), 'timestamp': timestamp})
+    return reviews
+
+def best_of(repeat, func):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    reviews = make_reviews(args.count)
+
+    legacy = best_of(args.repeat, lambda: sorted(
+        reviews, key=lambda r: legacy_safe_timestamp_to_datetime(r.get('timestamp')), reverse=True))
+
+    # Ingest cost is paid once per review; sorts afterwards only compare ints
+    def ingest():
+        for r in reviews:
+            r.pop('timestampUs', None)
+        for r in reviews:
+            normalize_review_timestamp(r)
+    ingest_only = best_of(args.repeat, ingest)
+
+    normalized = reviews
+    sort_only = best_of(args.repeat, lambda: sorted(normalized, key=timestamp_sort_key, reverse=True))
+
+    print(f"{args.count} reviews, mixed timestamp formats (best of {args.repeat})")
+    print(f"  legacy cascade sort:          {legacy * 1000:9.1f} ms")
+    print(f"  sort on stored timestampUs:   {sort_only * 1000:9.1f} ms  ({legacy / sort_only:5.1f}x faster)")
+    print(f"  one-time ingest normalization:{ingest_only * 1000:9.1f} ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,19 @@
+import os
+import sys
+
+import pytest
+
+# Test helpers shared with the socket server's tests (local_redis)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'test-support'))
+
+class FakeClock:
+    """Callable clock for code that takes clock=...; tests move it by setting .now"""
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock():
+    return FakeClock()
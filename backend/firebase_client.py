@@ -0,0 +1,52 @@
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Firebase is initialized on first use instead of at import, so importing the
+# app (tests, tools, cold starts) does not load the SDK or read credentials.
+# The outcome is cached: a failed setup is reported once and the app keeps
+# using sample data.
+class FirebaseClient:
+    def __init__(self, credentials_path):
+        self.credentials_path = credentials_path
+        self.lock = threading.Lock()
+        self.initialized = False
+        self.db = None
+        self.firestore = None  # firebase_admin.firestore, once loaded
+        self.auth = None  # firebase_admin.auth, once loaded
+
+    def get(self):
+        """This client, initializing Firebase on the first call"""
+        if not self.initialized:
+            with self.lock:
+                if not self.initialized:
+                    self._initialize()
+                    self.initialized = True
+        return self
+
+    @property
+    def enabled(self):
+        return self.get().db is not None
+
+    def _initialize(self):
+        # Without credentials there is nothing to connect to, so skip importing the SDK
+        if not os.path.exists(self.credentials_path):
+            logger.warning("Firebase credentials %s not found, using sample data", self.credentials_path)
+            return
+        try:
+            import firebase_admin
+            from firebase_admin import credentials, firestore, auth
+        except ImportError:
+            logger.warning("Firebase admin SDK not available, using sample data")
+            return
+        self.firestore = firestore
+        self.auth = auth
+        try:
+            cred = credentials.Certificate(self.credentials_path)
+            firebase_admin.initialize_app(cred)
+            self.db = firestore.client()
+            logger.info("Firebase initialized successfully")
+        except Exception as e:
+            logger.error("Firebase initialization error, using sample data: %s", e)
@@ -0,0 +1,182 @@
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from flask import g, has_request_context, request
+
+# Request instrumentation: per-request phase timings and Firestore call and
+# document counts, aggregated into histograms and served in the Prometheus
+# text format. Metrics are per process.
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 5000)
+
+# Logging: records go through a queue to a listener thread that does the
+# actual writes, so request threads never block on stdout
+_log_listener = None
+
+def configure_logging(level=None):
+    """Route the root logger through a QueueHandler (once per process); level defaults to LOG_LEVEL"""
+    global _log_listener
+    root = logging.getLogger()
+    root.setLevel((level or os.environ.get('LOG_LEVEL', 'INFO')).upper())
+    if _log_listener is not None:
+        return
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+    log_queue = queue.SimpleQueue()
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    _log_listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _log_listener.start()
+    # Flush what is still queued on exit
+    atexit.register(_log_listener.stop)
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{escape_label(value)}"' for name, value in labels) + '}'
+
+def format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Histogram:
+    def __init__(self, name, help_text, label_names, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self.series = {}  # label values -> [per-bucket counts (+Inf last), sum, count]
+
+    def observe(self, label_values, value):
+        # Caller holds the registry lock
+        series = self.series.get(label_values)
+        if series is None:
+            series = self.series[label_values] = [[0] * (len(self.buckets) + 1), 0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for label_values, (counts, total, count) in sorted(self.series.items()):
+            labels = list(zip(self.label_names, label_values))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{format_labels(labels + [('le', format_value(bound))])} {cumulative}")
+            lines.append(f"{self.name}_sum{format_labels(labels)} {format_value(total)}")
+            lines.append(f"{self.name}_count{format_labels(labels)} {count}")
+        return lines
+
+class Counter:
+    def __init__(self, name, help_text, label_names):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.series = {}
+
+    def inc(self, label_values, amount=1):
+        # Caller holds the registry lock
+        self.series[label_values] = self.series.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for label_values, value in sorted(self.series.items()):
+            lines.append(f"{self.name}{format_labels(list(zip(self.label_names, label_values)))} {format_value(value)}")
+        return lines
+
+# Holds every metric; values kept elsewhere (cache counters, queue depth) are
+# read from collector callbacks at scrape time
+class MetricsRegistry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = Counter('review_api_requests_total', "Requests handled",
+                                ('endpoint', 'method', 'status'))
+        self.latency = Histogram('review_api_request_duration_seconds', "Request latency",
+                                 ('endpoint', 'method'), LATENCY_BUCKETS)
+        self.phases = Histogram('review_api_phase_duration_seconds',
+                                "Time spent per request in each phase (auth, firestore, sort, serialize, ...)",
+                                ('endpoint', 'phase'), LATENCY_BUCKETS)
+        self.firestore_calls = Histogram('review_api_firestore_calls_per_request',
+                                         "Firestore calls made by a request", ('endpoint',), COUNT_BUCKETS)
+        self.firestore_documents = Histogram('review_api_firestore_documents_per_request',
+                                             "Firestore documents read or written by a request",
+                                             ('endpoint',), COUNT_BUCKETS)
+        self.collectors = []
+
+    def add_collector(self, collector):
+        """collector() -> [(name, type, help, {((label, value), ...): value})], read on each scrape"""
+        self.collectors.append(collector)
+
+    def record_request(self, endpoint, method, status, duration, phases, firestore_calls, firestore_documents):
+        with self.lock:
+            self.requests.inc((endpoint, method, str(status)))
+            self.latency.observe((endpoint, method), duration)
+            for phase_name, seconds in phases.items():
+                self.phases.observe((endpoint, phase_name), seconds)
+            self.firestore_calls.observe((endpoint,), firestore_calls)
+            self.firestore_documents.observe((endpoint,), firestore_documents)
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        with self.lock:
+            lines = []
+            for metric in (self.requests, self.latency, self.phases, self.firestore_calls, self.firestore_documents):
+                lines.extend(metric.render())
+        for collector in self.collectors:
+            for name, metric_type, help_text, series in collector():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {metric_type}")
+                for labels, value in sorted(series.items()):
+                    lines.append(f"{name}{format_labels(labels)} {format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+metrics = MetricsRegistry()
+
+# Per-request recording. Outside a request (background workers, scripts) these are no-ops.
+@contextmanager
+def phase(name):
+    """Time a block as one phase of the current request; repeated phases add up"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if has_request_context() and 'metrics_phases' in g:
+            phases = g.metrics_phases
+            phases[name] = phases.get(name, 0.0) + time.perf_counter() - start
+
+def record_firestore(calls=1, documents=0):
+    """Count Firestore round trips and the documents they read or wrote"""
+    if has_request_context() and 'metrics_phases' in g:
+        g.metrics_firestore_calls += calls
+        g.metrics_firestore_documents += documents
+
+def init_app(app, registry=metrics):
+    """Time every request of a Flask app into the registry"""
+    @app.before_request
+    def start_request_metrics():
+        g.metrics_start = time.perf_counter()
+        g.metrics_phases = {}
+        g.metrics_firestore_calls = 0
+        g.metrics_firestore_documents = 0
+
+    @app.after_request
+    def record_request_metrics(response):
+        if 'metrics_start' in g:
+            # Rule patterns, not raw paths, keep label cardinality bounded
+            endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+            registry.record_request(endpoint, request.method, response.status_code,
+                                    time.perf_counter() - g.metrics_start, g.metrics_phases,
+                                    g.metrics_firestore_calls, g.metrics_firestore_documents)
+        return response
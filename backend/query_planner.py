@@ -0,0 +1,117 @@
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Composite index definitions deployed with `firebase deploy --only firestore:indexes`
+INDEX_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'firestore.indexes.json')
+
+SORT_FIELDS = ('timestamp', 'rating')
+
+def load_composite_indexes(path=INDEX_FILE):
+    """Load the declared composite indexes for the reviews collection.
+
+    Each index is returned as a tuple of (equality_fields, sort_field, direction),
+    where equality_fields is a frozenset of the leading ASCENDING fields.
+    """
+    try:
+        with open(path) as f:
+            definitions = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning("Could not load Firestore index definitions: %s", e)
+        return set()
+
+    indexes = set()
+    for index in definitions.get('indexes', []):
+        if index.get('collectionGroup') != 'reviews':
+            continue
+        fields = index.get('fields', [])
+        if len(fields) < 2:
+            continue
+        *equality, last = fields
+        indexes.add((
+            frozenset(field['fieldPath'] for field in equality),
+            last['fieldPath'],
+            last.get('order', 'ASCENDING')
+        ))
+    return indexes
+
+composite_indexes = load_composite_indexes()
+
+class ReviewQueryPlan:
+    """How a review listing is split between Firestore and Python"""
+
+    def __init__(self, filters, sort_field, descending, push_down_sort):
+        self.filters = filters  # list of (field, op, value) applied with where()
+        self.sort_field = sort_field
+        self.descending = descending
+        self.push_down_sort = push_down_sort
+
+    @property
+    def direction(self):
+        return 'DESCENDING' if self.descending else 'ASCENDING'
+
+    def without_push_down(self):
+        """Same filters, but sorted in Python (used when Firestore rejects the index)"""
+        return ReviewQueryPlan(self.filters, self.sort_field, self.descending, False)
+
+    def apply_filters(self, query):
+        for field, op, value in self.filters:
+            query = query.where(field, op, value)
+        return query
+
+    def apply(self, query):
+        """Apply filters and, when pushed down, the Firestore ordering"""
+        query = self.apply_filters(query)
+        if self.push_down_sort:
+            query = query.order_by(self.sort_field, direction=self.direction)
+        return query
+
+    def __repr__(self):
+        where = 'firestore' if self.push_down_sort else 'python'
+        return f"ReviewQueryPlan(filters={self.filters}, sort={self.sort_field} {self.direction}, sorted_in={where})"
+
+def plan_review_query(restaurant=None, user_id=None, min_rating=None, sort_by='timestamp', order='desc',
+                      indexes=None):
+    """Turn review listing parameters into a ReviewQueryPlan.
+
+    Sorting is pushed into Firestore when an index can serve it: single-field
+    indexes cover queries without equality filters, otherwise a matching
+    composite index must be declared in firestore.indexes.json.
+    """
+    if indexes is None:
+        indexes = composite_indexes
+
+    sort_field = sort_by if sort_by in SORT_FIELDS else 'timestamp'
+    descending = order == 'desc'
+
+    filters = []
+    equality_fields = set()
+    if restaurant:
+        filters.append(('restaurant', '==', restaurant))
+        equality_fields.add('restaurant')
+    if user_id:
+        filters.append(('userId', '==', user_id))
+        equality_fields.add('userId')
+    if min_rating is not None:
+        filters.append(('rating', '>=', min_rating))
+
+    # Firestore requires the first order_by to be on the inequality field
+    if min_rating is not None and sort_field != 'rating':
+        return ReviewQueryPlan(filters, sort_field, descending, False)
+
+    if not equality_fields:
+        return ReviewQueryPlan(filters, sort_field, descending, True)
+
+    direction = 'DESCENDING' if descending else 'ASCENDING'
+    has_index = (frozenset(equality_fields), sort_field, direction) in indexes
+    return ReviewQueryPlan(filters, sort_field, descending, has_index)
+
+def is_missing_index_error(error):
+    """True when Firestore rejected a query because its index does not exist"""
+    try:
+        from google.api_core.exceptions import FailedPrecondition
+    except ImportError:
+        return False
+    return isinstance(error, FailedPrecondition)
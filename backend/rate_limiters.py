@@ -0,0 +1,313 @@
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows; the shm backend needs it
+    fcntl = None
+
+from redis_client import RedisClient, RedisError
+
+logger = logging.getLogger(__name__)
+
+# Rate limiter backends. All implement is_allowed(key) -> bool with the same
+# sliding-window-counter estimate: the count in the current fixed window plus
+# the previous window's count weighted by how much of it the sliding window
+# still covers.
+#   memory - per process (RateLimiter)
+#   shm    - shared by the worker processes of one host through an mmap file
+#   redis  - shared cluster-wide through Redis
+
+def sliding_window(now, time_window):
+    """(current window number, fraction of the previous window still inside the sliding window)"""
+    window = int(now // time_window)
+    return window, 1 - (now - window * time_window) / time_window
+
+def key_fingerprint(key):
+    """Stable, non-zero 64-bit hash of a key (zero marks an unused shm cell)"""
+    digest = hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little') or 1
+
+# O(1) per request, with at most max_keys keys held (least recently seen keys
+# are evicted first).
+class RateLimiter:
+    # Evicting up to two keys per call, while adding at most one, keeps the bound exact
+    EVICTIONS_PER_CALL = 2
+
+    def __init__(self, max_requests=100, time_window=60, max_keys=100000, clock=time.monotonic):
+        self.max_requests = max_requests
+        self.time_window = time_window
+        self.max_keys = max_keys
+        self.clock = clock
+        # key -> [window number, count in that window, count in the window before]
+        self.buckets = OrderedDict()
+        self.lock = threading.Lock()
+
+    def is_allowed(self, ip):
+        window, overlap = sliding_window(self.clock(), self.time_window)
+        with self.lock:
+            bucket = self.buckets.get(ip)
+            if bucket is None:
+                bucket = self.buckets[ip] = [window, 0, 0]
+            else:
+                self.buckets.move_to_end(ip)
+                if bucket[0] != window:
+                    # Roll forward; windows older than the previous one no longer count
+                    bucket[2] = bucket[1] if bucket[0] == window - 1 else 0
+                    bucket[1] = 0
+                    bucket[0] = window
+
+            allowed = bucket[2] * overlap + bucket[1] < self.max_requests
+            if allowed:
+                bucket[1] += 1
+            self._evict(window)
+            return allowed
+
+    def _evict(self, window):
+        # Caller holds the lock. Keys idle for two windows have no effect on
+        # their estimate, so dropping them is free; over max_keys the least
+        # recently seen key goes regardless.
+        for _ in range(self.EVICTIONS_PER_CALL):
+            if not self.buckets:
+                return
+            oldest = next(iter(self.buckets.values()))
+            if oldest[0] >= window - 1 and len(self.buckets) <= self.max_keys:
+                return
+            self.buckets.popitem(last=False)
+
+    def __len__(self):
+        return len(self.buckets)
+
+# Counter table in a shared memory-mapped file. Every worker process claims a
+# slot (a lock on one byte of the file, released by the OS when the process
+# exits) and only ever writes cells in its own slot, so no cross-process lock
+# is taken per request: a check reads the key's cell in every claimed slot and
+# sums them. Reads can race a concurrent write in another worker, which at
+# worst misses that one in-flight request.
+class SharedMemoryRateLimiter:
+    MAGIC = b'RLSHM001'
+    # magic, worker slots, buckets per slot, slots claimed so far (high-water mark)
+    HEADER = struct.Struct('<8sIII')
+    # key fingerprint, window number, count in that window, count in the window before
+    CELL = struct.Struct('<QqII')
+    # Cells tried after a key's home bucket before it replaces the stalest one
+    PROBES = 4
+
+    # (path, pid) -> slots claimed by limiters in this process
+    claimed_slots = {}
+    claimed_lock = threading.Lock()
+
+    def __init__(self, max_requests=100, time_window=60, path=None, slots=32, buckets=16384,
+                 clock=time.time):
+        if fcntl is None:
+            raise RuntimeError("The shared-memory rate limiter needs fcntl (POSIX)")
+        self.max_requests = max_requests
+        self.time_window = time_window
+        self.clock = clock
+        self.path = os.path.realpath(path or self.default_path())
+        self.slots = slots
+        self.buckets = buckets
+        self.slot_size = buckets * self.CELL.size
+        self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        size = self.HEADER.size + slots * self.slot_size
+        # Creating the table is the only step that locks the whole file
+        fcntl.flock(self.fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(self.fd).st_size == 0:
+                os.ftruncate(self.fd, size)
+                os.pwrite(self.fd, self.HEADER.pack(self.MAGIC, slots, buckets, 0), 0)
+            magic, file_slots, file_buckets, _ = self.HEADER.unpack(os.pread(self.fd, self.HEADER.size, 0))
+            if (magic, file_slots, file_buckets) != (self.MAGIC, slots, buckets):
+                raise ValueError(f"{self.path} holds a rate limit table with a different layout")
+        finally:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+        self.map = mmap.mmap(self.fd, size)
+        self.owner = None  # (pid, slot); re-claimed after a fork
+        self.lock = threading.Lock()
+        self._slot()
+
+    @staticmethod
+    def default_path():
+        directory = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+        return os.path.join(directory, 'reviews-rate-limit')
+
+    def _slot(self):
+        pid = os.getpid()
+        owner = self.owner
+        if owner is not None and owner[0] == pid:
+            return owner[1]
+        with self.claimed_lock:
+            claimed = self.claimed_slots.setdefault((self.path, pid), set())
+            for slot in range(self.slots):
+                if slot in claimed:
+                    continue
+                try:
+                    fcntl.lockf(self.fd, fcntl.LOCK_EX | fcntl.LOCK_NB, 1, slot)
+                except OSError:
+                    continue
+                claimed.add(slot)
+                self._raise_high_water(slot + 1)
+                self.owner = (pid, slot)
+                return slot
+        raise RuntimeError(f"All {self.slots} rate limit slots in {self.path} are in use")
+
+    def _raise_high_water(self, used):
+        fcntl.flock(self.fd, fcntl.LOCK_EX)
+        try:
+            magic, slots, buckets, high_water = self.HEADER.unpack_from(self.map, 0)
+            if used > high_water:
+                self.HEADER.pack_into(self.map, 0, magic, slots, buckets, used)
+        finally:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+
+    def _cell_offset(self, slot, bucket):
+        return self.HEADER.size + slot * self.slot_size + (bucket % self.buckets) * self.CELL.size
+
+    def is_allowed(self, ip):
+        window, overlap = sliding_window(self.clock(), self.time_window)
+        fingerprint = key_fingerprint(ip)
+        home = fingerprint % self.buckets
+        try:
+            own_slot = self._slot()
+        except RuntimeError as e:
+            # More workers than slots; this one is left unlimited
+            logger.warning("Rate limiting disabled in this worker: %s", e)
+            return True
+        cell = self.CELL
+        mem = self.map
+
+        current = previous = 0
+        high_water = self.HEADER.unpack_from(mem, 0)[3]
+        for slot in range(high_water):
+            for probe in range(self.PROBES):
+                cell_fingerprint, cell_window, cell_current, cell_previous = cell.unpack_from(
+                    mem, self._cell_offset(slot, home + probe))
+                if cell_fingerprint == fingerprint:
+                    if cell_window == window:
+                        current += cell_current
+                        previous += cell_previous
+                    elif cell_window == window - 1:
+                        previous += cell_current
+                    break
+                if cell_fingerprint == 0:
+                    # Cells are never cleared, so the key is not further along
+                    break
+
+        if previous * overlap + current >= self.max_requests:
+            return False
+        with self.lock:
+            self._increment(own_slot, fingerprint, home, window)
+        return True
+
+    def _increment(self, slot, fingerprint, home, window):
+        # Caller holds self.lock, which only orders threads of this process
+        cell = self.CELL
+        mem = self.map
+        target = None
+        for probe in range(self.PROBES):
+            offset = self._cell_offset(slot, home + probe)
+            values = cell.unpack_from(mem, offset)
+            if values[0] == fingerprint:
+                target, found = offset, values
+                break
+            # Prefer an unused cell, then the one used longest ago
+            if target is None or values[1] < found[1]:
+                target, found = offset, values
+
+        cell_fingerprint, cell_window, cell_current, cell_previous = found
+        if cell_fingerprint != fingerprint:
+            cell_window, cell_current, cell_previous = window, 0, 0
+        elif cell_window != window:
+            cell_previous = cell_current if cell_window == window - 1 else 0
+            cell_current = 0
+            cell_window = window
+        cell.pack_into(mem, target, fingerprint, cell_window, cell_current + 1, cell_previous)
+
+    def close(self):
+        owner = self.owner
+        if owner is not None and owner[0] == os.getpid():
+            with self.claimed_lock:
+                self.claimed_slots.get((self.path, owner[0]), set()).discard(owner[1])
+                fcntl.lockf(self.fd, fcntl.LOCK_UN, 1, owner[1])
+        self.owner = None
+        self.map.close()
+        os.close(self.fd)
+
+# Counters in Redis, shared by every worker and pod. One pipelined round trip
+# per request: INCR this window's counter, refresh its expiry, read the
+# previous window's. Rejected requests are counted too, so a client that keeps
+# retrying stays limited. If Redis is unreachable requests are allowed.
+class RedisRateLimiter:
+    # Seconds between repeated "Redis unavailable" messages
+    ERROR_REPORT_INTERVAL = 30
+
+    def __init__(self, max_requests=100, time_window=60, client=None, url='redis://localhost:6379/0',
+                 prefix='ratelimit:', clock=time.time):
+        self.max_requests = max_requests
+        self.time_window = time_window
+        self.client = client or RedisClient.from_url(url)
+        self.prefix = prefix
+        self.clock = clock
+        # Counters outlive the window that follows them, then expire
+        self.expire_ms = int(time_window * 2000) + 1000
+        self.last_error_report = None
+
+    def is_allowed(self, ip):
+        window, overlap = sliding_window(self.clock(), self.time_window)
+        current_key = f"{self.prefix}{ip}:{window}"
+        try:
+            current, _, previous = self.client.pipeline([
+                ('INCR', current_key),
+                ('PEXPIRE', current_key, self.expire_ms),
+                ('GET', f"{self.prefix}{ip}:{window - 1}")
+            ])
+        except (OSError, RedisError) as e:
+            self._report_error(e)
+            return True
+        # current includes this request
+        return int(previous or 0) * overlap + current - 1 < self.max_requests
+
+    def _report_error(self, error):
+        now = time.monotonic()
+        if self.last_error_report is None or now - self.last_error_report > self.ERROR_REPORT_INTERVAL:
+            self.last_error_report = now
+            logger.warning("Redis rate limiter unavailable, allowing requests: %s", error)
+
+RATE_LIMIT_BACKENDS = {
+    'memory': RateLimiter,
+    'shm': SharedMemoryRateLimiter,
+    'redis': RedisRateLimiter
+}
+
+def create_rate_limiter(backend=None, max_requests=None, time_window=None):
+    """Rate limiter for RATE_LIMIT_BACKEND ('memory', 'shm' or 'redis'), configured from the environment.
+
+    Falls back to the in-memory limiter if the backend cannot be set up.
+    """
+    backend = backend or os.environ.get('RATE_LIMIT_BACKEND', 'memory')
+    if max_requests is None:
+        max_requests = int(os.environ.get('RATE_LIMIT_REQUESTS', 100))
+    if time_window is None:
+        time_window = float(os.environ.get('RATE_LIMIT_WINDOW', 60))
+    options = {
+        'memory': lambda: {'max_keys': int(os.environ.get('RATE_LIMIT_MAX_KEYS', 100000))},
+        'shm': lambda: {'path': os.environ.get('RATE_LIMIT_SHM_PATH'),
+                        'slots': int(os.environ.get('RATE_LIMIT_SHM_WORKERS', 32)),
+                        'buckets': int(os.environ.get('RATE_LIMIT_SHM_BUCKETS', 16384))},
+        'redis': lambda: {'url': os.environ.get('RATE_LIMIT_REDIS_URL', 'redis://localhost:6379/0')}
+    }
+    if backend not in RATE_LIMIT_BACKENDS:
+        logger.warning("Unknown rate limit backend %r, using memory", backend)
+        backend = 'memory'
+    try:
+        return RATE_LIMIT_BACKENDS[backend](max_requests, time_window, **options[backend]())
+    except Exception as e:
+        logger.warning("Could not set up the %s rate limiter, using memory: %s", backend, e)
+        return RateLimiter(max_requests, time_window, **options['memory']())
@@ -0,0 +1,109 @@
+import socket
+import threading
+from urllib.parse import urlparse
+
+# Minimal Redis (RESP2) client, enough for counters and pub/sub without adding
+# a dependency. Each thread gets its own connection, so callers never wait on
+# a shared socket; commands sent together are pipelined in one round trip.
+
+class RedisError(Exception):
+    """Error reply from the server"""
+
+def encode_command(args):
+    parts = [b'*%d\r\n' % len(args)]
+    for arg in args:
+        if isinstance(arg, bytes):
+            data = arg
+        elif isinstance(arg, str):
+            data = arg.encode('utf-8')
+        else:
+            data = str(arg).encode('utf-8')
+        parts.append(b'$%d\r\n%s\r\n' % (len(data), data))
+    return b''.join(parts)
+
+def read_reply(reader):
+    """Next reply from a buffered socket reader; error replies are returned as RedisError"""
+    line = reader.readline()
+    if not line.endswith(b'\r\n'):
+        raise ConnectionError("Connection closed by Redis")
+    kind, payload = line[:1], line[1:-2]
+    if kind == b'+':
+        return payload.decode('utf-8')
+    if kind == b'-':
+        return RedisError(payload.decode('utf-8'))
+    if kind == b':':
+        return int(payload)
+    if kind == b'$':
+        length = int(payload)
+        if length < 0:
+            return None
+        data = reader.read(length + 2)
+        if len(data) != length + 2:
+            raise ConnectionError("Connection closed by Redis")
+        return data[:-2]
+    if kind == b'*':
+        length = int(payload)
+        if length < 0:
+            return None
+        return [read_reply(reader) for _ in range(length)]
+    raise ConnectionError(f"Unexpected reply from Redis: {line!r}")
+
+class RedisClient:
+    def __init__(self, host='localhost', port=6379, db=0, password=None, timeout=0.5):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.timeout = timeout
+        self.local = threading.local()
+
+    @classmethod
+    def from_url(cls, url, **kwargs):
+        """Client for a redis://[:password@]host[:port][/db] URL"""
+        parsed = urlparse(url)
+        db = parsed.path.lstrip('/')
+        return cls(host=parsed.hostname or 'localhost', port=parsed.port or 6379,
+                   db=int(db) if db else 0, password=parsed.password, **kwargs)
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        connection = (sock, sock.makefile('rb'))
+        setup = []
+        if self.password:
+            setup.append(('AUTH', self.password))
+        if self.db:
+            setup.append(('SELECT', self.db))
+        if setup:
+            self.local.connection = connection
+            self.pipeline(setup)
+        return connection
+
+    def pipeline(self, commands):
+        """Send commands in one write and return their replies in order"""
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = self.local.connection = self._connect()
+        sock, reader = connection
+        try:
+            sock.sendall(b''.join(encode_command(command) for command in commands))
+            replies = [read_reply(reader) for _ in commands]
+        except (OSError, ValueError):
+            # The stream may be out of step with the commands; start over next time
+            self.close()
+            raise
+        for reply in replies:
+            if isinstance(reply, RedisError):
+                raise reply
+        return replies
+
+    def execute(self, *args):
+        return self.pipeline([args])[0]
+
+    def close(self):
+        """Close this thread's connection"""
+        connection = getattr(self.local, 'connection', None)
+        self.local.connection = None
+        if connection is not None:
+            connection[1].close()
+            connection[0].close()
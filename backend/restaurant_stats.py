@@ -0,0 +1,127 @@
+import hashlib
+import heapq
+import threading
+
+# Per-restaurant aggregates kept up to date on every review write, so trending
+# is a read of the top documents instead of a scan over all reviews
+STATS_COLLECTION = 'restaurant_stats'
+MAX_STATS_PHOTOS = 3
+
+def rating_key(review):
+    """Numeric rating for sorting, filtering and aggregates; bad values count as 0"""
+    try:
+        return int(review.get('rating') or 0)
+    except (TypeError, ValueError):
+        return 0
+
+def stats_doc_id(restaurant):
+    """Stable Firestore document ID for a restaurant name (names may contain '/')"""
+    return hashlib.sha1(restaurant.encode('utf-8')).hexdigest()
+
+def apply_reviews(stats, restaurant, reviews, timestamp_key=None):
+    """Fold new reviews into a restaurant's stats and return the updated copy.
+
+    When timestamp_key is None the reviews are assumed to be newer than anything
+    already folded in (e.g. they carry a server timestamp), so the last one
+    becomes latestReview.
+    """
+    if stats:
+        stats = dict(stats)
+        stats['photos'] = list(stats.get('photos') or [])
+    else:
+        stats = {
+            'restaurant': restaurant,
+            'totalRating': 0,
+            'count': 0,
+            'photos': [],
+            'latestReview': None
+        }
+
+    for review in reviews:
+        stats['totalRating'] += rating_key(review)
+        stats['count'] += 1
+
+        if review.get('photoUrl') and len(stats['photos']) < MAX_STATS_PHOTOS:
+            stats['photos'].append(review.get('photoUrl'))
+
+        latest = stats.get('latestReview')
+        if latest is None or timestamp_key is None or timestamp_key(review) > timestamp_key(latest):
+            stats['latestReview'] = dict(review)
+
+    stats['avgRating'] = stats['totalRating'] / stats['count'] if stats['count'] else 0
+    return stats
+
+def update_restaurant_stats(db, restaurant, reviews, timestamp_key=None):
+    """Transactionally fold reviews into the restaurant's Firestore stats document"""
+    from firebase_admin import firestore
+
+    stats_ref = db.collection(STATS_COLLECTION).document(stats_doc_id(restaurant))
+
+    @firestore.transactional
+    def update_in_transaction(transaction):
+        snapshot = stats_ref.get(transaction=transaction)
+        stats = apply_reviews(snapshot.to_dict() if snapshot.exists else None, restaurant, reviews,
+                              timestamp_key)
+        transaction.set(stats_ref, stats)
+        return stats
+
+    return update_in_transaction(db.transaction())
+
+def rebuild_restaurant_stats(db, timestamp_key):
+    """Recompute every stats document from the reviews collection.
+
+    Needed once for reviews written before stats were maintained:
+        python -c "import server; server.rebuild_stats()"
+    """
+    grouped = {}
+    for doc in db.collection('reviews').stream():
+        review = doc.to_dict()
+        review['id'] = doc.id
+        if review.get('restaurant'):
+            grouped.setdefault(review['restaurant'], []).append(review)
+
+    batch = db.batch()
+    pending = 0
+    for restaurant, reviews in grouped.items():
+        reviews.sort(key=timestamp_key)
+        stats = apply_reviews(None, restaurant, reviews, timestamp_key)
+        batch.set(db.collection(STATS_COLLECTION).document(stats_doc_id(restaurant)), stats)
+        pending += 1
+        # Firestore batches are limited to 500 writes
+        if pending == 500:
+            batch.commit()
+            batch = db.batch()
+            pending = 0
+    if pending:
+        batch.commit()
+    return len(grouped)
+
+# In-process equivalent used with the sample data
+class RestaurantStatsStore:
+    def __init__(self, timestamp_key):
+        self.timestamp_key = timestamp_key
+        self.stats = {}
+        self.lock = threading.Lock()
+
+    def record(self, review):
+        self.save(self.updated(review))
+
+    def updated(self, review):
+        """The review's restaurant stats with it folded in, without storing them (None without a restaurant)"""
+        restaurant = review.get('restaurant')
+        if not restaurant:
+            return None
+        with self.lock:
+            return apply_reviews(self.stats.get(restaurant), restaurant, [review], self.timestamp_key)
+
+    def save(self, stats):
+        """Store stats returned by updated()"""
+        if stats is None:
+            return
+        with self.lock:
+            self.stats[stats['restaurant']] = stats
+
+    def top(self, n):
+        """Top-n restaurants by average rating"""
+        with self.lock:
+            return heapq.nlargest(n, self.stats.values(), key=lambda s: s['avgRating'])
@@ -0,0 +1,220 @@
+import gc
+import threading
+from bisect import bisect_left, bisect_right
+
+from restaurant_stats import RestaurantStatsStore, rating_key
+from timestamps import normalize_review_timestamp, timestamp_sort_key
+
+SORT_FIELDS = ('timestamp', 'rating')
+
+# Reviews kept ordered by (sort value, insertion sequence), so ties have a
+# stable position and a cursor review can be found again with bisect
+class SortedIndex:
+    def __init__(self, key):
+        self.key = key
+        self.keys = []
+        self.items = []
+
+    def add(self, review, seq):
+        entry = (self.key(review), seq)
+        position = bisect_right(self.keys, entry)
+        self.keys.insert(position, entry)
+        self.items.insert(position, review)
+
+    def extend(self, reviews_with_seq):
+        """Bulk insert: append everything, then re-sort once"""
+        key = self.key
+        entries = [((key(review), seq), review) for review, seq in reviews_with_seq]
+        if not entries:
+            return
+        entries.extend(zip(self.keys, self.items))
+        entries.sort(key=lambda entry: entry[0])
+        self.keys = [entry[0] for entry in entries]
+        self.items = [entry[1] for entry in entries]
+
+    def position(self, review, seq):
+        return bisect_left(self.keys, (self.key(review), seq))
+
+    def __len__(self):
+        return len(self.items)
+
+# Indexed in-memory review store used when Firebase is not available.
+# Filters become hash lookups (restaurant, userId) or bisects (minRating),
+# sorts are reads of an already sorted index, and per-restaurant aggregates
+# are maintained as reviews are added.
+class ReviewStore:
+    def __init__(self, reviews=()):
+        self.lock = threading.RLock()
+        self.by_id = {}
+        self.seq = {}  # review id -> insertion sequence
+        self.sorted = self._new_indexes()
+        self.by_restaurant = {}  # restaurant -> {sort field: SortedIndex}
+        self.by_user = {}  # userId -> {sort field: SortedIndex}
+        self.restaurant_stats = RestaurantStatsStore(timestamp_key=timestamp_sort_key)
+        self.extend(reviews)
+
+    @staticmethod
+    def _new_indexes():
+        return {
+            'timestamp': SortedIndex(timestamp_sort_key),
+            'rating': SortedIndex(rating_key)
+        }
+
+    def add(self, review):
+        """Index a review; it is stored as given, with its timestamp normalized.
+
+        Raises before changing anything, so a failed add leaves no trace.
+        """
+        with self.lock:
+            review_id = self._check(review)
+            stats = self.restaurant_stats.updated(review)
+            seq = self._register(review_id, review)
+            for index in self._indexes_for(review):
+                index.add(review, seq)
+            self.restaurant_stats.save(stats)
+        return review
+
+    def extend(self, reviews):
+        """Index many reviews at once, sorting each index a single time (used for seeding)"""
+        # The cyclic GC would otherwise rescan the growing store over and over
+        # while millions of index tuples are allocated
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            self._extend(reviews)
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+
+    def _extend(self, reviews):
+        with self.lock:
+            pending = {}  # SortedIndex -> [(review, seq)]
+            for review in reviews:
+                entry = (review, self._register(self._check(review), review))
+                for index in self._indexes_for(review):
+                    additions = pending.get(index)
+                    if additions is None:
+                        additions = pending[index] = []
+                    additions.append(entry)
+                self.restaurant_stats.record(review)
+            for index, additions in pending.items():
+                index.extend(additions)
+
+    def _check(self, review):
+        """ID a new review is stored under; normalizes its timestamp but leaves the store as it is"""
+        # Caller holds the lock
+        normalize_review_timestamp(review)
+        review_id = str(review['id'])
+        if review_id in self.by_id:
+            raise ValueError(f"Duplicate review id: {review_id}")
+        return review_id
+
+    def _register(self, review_id, review):
+        # Caller holds the lock
+        seq = len(self.seq)
+        self.by_id[review_id] = review
+        self.seq[review_id] = seq
+        return seq
+
+    def _indexes_for(self, review):
+        # Caller holds the lock
+        groups = [self.sorted]
+        for value, group_index in ((review.get('restaurant'), self.by_restaurant),
+                                   (review.get('userId'), self.by_user)):
+            if value:
+                indexes = group_index.get(value)
+                if indexes is None:
+                    indexes = group_index[value] = self._new_indexes()
+                groups.append(indexes)
+        return [index for indexes in groups for index in indexes.values()]
+
+    def new_id(self):
+        """Next free numeric ID, matching the IDs of the sample data"""
+        with self.lock:
+            candidate = len(self.by_id) + 1
+            while str(candidate) in self.by_id:
+                candidate += 1
+            return str(candidate)
+
+    def get(self, review_id):
+        return self.by_id.get(str(review_id))
+
+    def _scan(self, restaurant, user_id, min_rating, sort_by, descending, after_id):
+        """Yield matching reviews in order from the most selective index (caller holds the lock)"""
+        sort_field = sort_by if sort_by in SORT_FIELDS else 'timestamp'
+
+        indexes = self.sorted
+        if restaurant or user_id:
+            groups = []
+            if restaurant:
+                groups.append(self.by_restaurant.get(restaurant))
+            if user_id:
+                groups.append(self.by_user.get(user_id))
+            if any(group is None for group in groups):
+                return
+            indexes = min(groups, key=lambda group: len(group[sort_field]))
+        index = indexes[sort_field]
+
+        start, stop = 0, len(index)
+        if min_rating is not None and sort_field == 'rating':
+            start = bisect_left(index.keys, (min_rating,))
+        if after_id is not None:
+            cursor = self.by_id.get(str(after_id))
+            if cursor is None:
+                raise KeyError(after_id)
+            position = index.position(cursor, self.seq[str(after_id)])
+            if descending:
+                stop = min(stop, position)
+            else:
+                start = max(start, position + 1)
+
+        positions = range(stop - 1, start - 1, -1) if descending else range(start, stop)
+        items = index.items
+        for position in positions:
+            review = items[position]
+            if restaurant and review.get('restaurant') != restaurant:
+                continue
+            if user_id and review.get('userId') != user_id:
+                continue
+            if min_rating is not None and rating_key(review) < min_rating:
+                continue
+            yield review
+
+    def page(self, restaurant=None, user_id=None, min_rating=None, sort_by='timestamp', descending=True,
+             after_id=None, limit=50):
+        """One page of matching reviews and the ID to continue after (None on the last page).
+
+        Raises KeyError if after_id is not a stored review.
+        """
+        with self.lock:
+            page = []
+            for review in self._scan(restaurant, user_id, min_rating, sort_by, descending, after_id):
+                if len(page) == limit:
+                    return page, str(page[-1]['id'])
+                page.append(review)
+            return page, None
+
+    def query(self, restaurant=None, user_id=None, min_rating=None, sort_by='timestamp', descending=True):
+        """All matching reviews in order (snapshot taken under the lock)"""
+        with self.lock:
+            return list(self._scan(restaurant, user_id, min_rating, sort_by, descending, None))
+
+    def recent(self, n):
+        """The n most recent reviews"""
+        with self.lock:
+            return self.sorted['timestamp'].items[-n:][::-1] if n else []
+
+    def top_restaurants(self, n):
+        return self.restaurant_stats.top(n)
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def __iter__(self):
+        with self.lock:
+            return iter(list(self.by_id.values()))
+
+    def __getitem__(self, index):
+        """Reviews in insertion order, e.g. store[:50]"""
+        with self.lock:
+            return list(self.by_id.values())[index]
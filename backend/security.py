@@ -1,36 +1,15 @@
-import time
+import logging
 import re
 from functools import wraps
 from flask import request, jsonify
 
-# Simple in-memory rate limiter
-class RateLimiter:
-    def __init__(self, max_requests=100, time_window=60):
-        self.max_requests = max_requests
-        self.time_window = time_window
-        self.requests = {}
-        
-    def is_allowed(self, ip):
-        current_time = time.time()
-        # Clean up old entries
-        self.requests = {k: v for k, v in self.requests.items() 
-                         if current_time - v[-1] < self.time_window}
-        
-        # Check if IP exists and has request history
-        if ip not in self.requests:
-            self.requests[ip] = [current_time]
-            return True
-            
-        # If requests within time window exceed limit
-        if len(self.requests[ip]) >= self.max_requests:
-            return False
-            
-        # Add this request timestamp
-        self.requests[ip].append(current_time)
-        return True
+from rate_limiters import create_rate_limiter
 
-# Create rate limiter with 100 requests per minute
-rate_limiter = RateLimiter(100, 60)
+logger = logging.getLogger(__name__)
+
+# Backend chosen by RATE_LIMIT_BACKEND (see rate_limiters.py); defaults to
+# 100 requests per minute per client IP
+rate_limiter = create_rate_limiter()
 
 # Rate limiting decorator
 def rate_limit(f):
@@ -50,7 +29,7 @@ def validate_review_input(data):
         errors.append("Invalid or missing review data")
         return errors
     
-    print(f"Validating review data: {data}")
+    logger.debug("Validating review with fields: %s", sorted(data))
     
     # Required fields
     required_fields = ['restaurant', 'rating', 'review', 'userId', 'userName']
@@ -80,28 +59,46 @@ def validate_review_input(data):
     return errors
 
 # Sanitize input to prevent XSS
+# Patterns are compiled once and applied in this order; each step only removes
+# characters, and a step can only match if its trigger character is present
+HTML_TAG_PATTERN = re.compile(r'<[^>]*>')  # Remove HTML tags
+JAVASCRIPT_PROTOCOL_PATTERN = re.compile(r'javascript:', re.IGNORECASE)  # Remove javascript: protocol
+EVENT_HANDLER_PATTERN = re.compile(r'on\w+=', re.IGNORECASE)  # Remove event handlers
+
 def sanitize_string(input_str):
     if not isinstance(input_str, str):
         return input_str
-        
-    # Replace potentially dangerous characters
-    sanitized = re.sub(r'<[^>]*>', '', input_str)  # Remove HTML tags
-    sanitized = re.sub(r'javascript:', '', sanitized, flags=re.IGNORECASE)  # Remove javascript: protocol
-    sanitized = re.sub(r'on\w+=', '', sanitized, flags=re.IGNORECASE)  # Remove event handlers
+    
+    # Most review text has none of '<', ':' or '=' and is returned untouched
+    sanitized = input_str
+    if '<' in sanitized:
+        sanitized = HTML_TAG_PATTERN.sub('', sanitized)
+    if ':' in sanitized:
+        sanitized = JAVASCRIPT_PROTOCOL_PATTERN.sub('', sanitized)
+    if '=' in sanitized:
+        sanitized = EVENT_HANDLER_PATTERN.sub('', sanitized)
     
     return sanitized
 
 def sanitize_review_input(data):
+    """Sanitized copy of review data; strings are cleaned at any depth of nested dicts and lists"""
     sanitized_data = {}
+    # (source container, copy being filled), walked without recursion
+    pending = [(data, sanitized_data)]
+    while pending:
+        source, target = pending.pop()
+        items = source.items() if isinstance(source, dict) else enumerate(source)
+        for key, value in items:
+            if isinstance(value, str):
+                value = sanitize_string(value)
+            elif isinstance(value, dict):
+                copy = {}
+                pending.append((value, copy))
+                value = copy
+            elif isinstance(value, list):
+                copy = [None] * len(value)
+                pending.append((value, copy))
+                value = copy
+            target[key] = value
     
-    for key, value in data.items():
-        if isinstance(value, str):
-            sanitized_data[key] = sanitize_string(value)
-        elif isinstance(value, dict):
-            sanitized_data[key] = sanitize_review_input(value)
-        elif isinstance(value, list):
-            sanitized_data[key] = [sanitize_string(item) if isinstance(item, str) else item for item in value]
-        else:
-            sanitized_data[key] = value
-            
-    return sanitized_data 
\ No newline at end of file
+    return sanitized_data
@@ -32,7 +32,7 @@ def get_cors_config():
             'origins': "*",  # Allow all origins in development
             'methods': ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
             'allow_headers': ["Content-Type", "Authorization", "*"],
-            'expose_headers': ["Content-Type", "X-Request-ID"],
+            'expose_headers': ["Content-Type", "X-Request-ID", "X-Next-Cursor"],
             'supports_credentials': True,
             'max_age': 600,
             'vary_header': True
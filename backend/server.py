@@ -1,9 +1,33 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, g, stream_with_context
 from flask_cors import CORS
 import os
 import datetime
 import json
 import random
+import base64
+import concurrent.futures
+import hashlib
+import logging
+import uuid
+from collections import Counter
+from functools import wraps
+
+from cache import TTLCache
+from token_cache import VerifiedTokenCache
+from serialization import ReviewJSONProvider
+from timestamps import (TIMESTAMP_US_FIELD, timestamp_sort_key, normalize_review_timestamp,
+                        datetime_to_epoch_us, epoch_us_to_iso)
+from query_planner import plan_review_query, is_missing_index_error
+from restaurant_stats import (STATS_COLLECTION, MAX_STATS_PHOTOS, update_restaurant_stats,
+                              rebuild_restaurant_stats)
+from review_store import ReviewStore, rating_key
+from write_behind import WriteBehindQueue
+from firebase_client import FirebaseClient
+from instrumentation import configure_logging, init_app, metrics, phase, record_firestore
+
+# Log records are written by a background thread (see instrumentation.py)
+configure_logging()
+logger = logging.getLogger(__name__)
 
 # Try to import security modules, but continue if they're not available
 try:
@@ -11,7 +35,7 @@ try:
     from security_headers import configure_security_headers, get_cors_config
     security_modules_available = True
 except ImportError as e:
-    print(f"Warning: Security modules not fully available: {e}")
+    logger.warning("Security modules not fully available: %s", e)
     security_modules_available = False
     # Define dummy functions to avoid errors
     def rate_limit(f):
@@ -22,6 +46,10 @@ except ImportError as e:
         return data
 
 app = Flask(__name__)
+# Timestamps are encoded during serialization (see serialization.py)
+app.json = ReviewJSONProvider(app)
+# Per-request latency, phase and Firestore metrics, served at /api/metrics
+init_app(app)
 
 # Apply security headers if available
 if security_modules_available:
@@ -30,16 +58,35 @@ if security_modules_available:
         # Configure CORS using secure configuration
         CORS(app, **get_cors_config())
     except Exception as e:
-        print(f"Warning: Could not apply security configuration: {e}")
+        logger.warning("Could not apply security configuration: %s", e)
         # Fall back to basic CORS
-        CORS(app, resources={r"/*": {"origins": "*"}}, supports_credentials=True)
+        CORS(app, resources={r"/*": {"origins": "*"}}, supports_credentials=True,
+             expose_headers=["X-Next-Cursor"])
 else:
     # Basic CORS configuration for development
-    print("Using basic CORS configuration (security modules not available)")
-    CORS(app, resources={r"/*": {"origins": "*"}}, supports_credentials=True)
+    logger.info("Using basic CORS configuration (security modules not available)")
+    CORS(app, resources={r"/*": {"origins": "*"}}, supports_credentials=True,
+         expose_headers=["X-Next-Cursor"])
+
+# Number of restaurants and recent reviews returned by /api/trending
+TRENDING_LIMIT = 5
+
+# Bulk ingestion: reviews accepted per request, and Firestore's limit on writes per batch
+MAX_BATCH_REVIEWS = int(os.environ.get('REVIEWS_BATCH_MAX', 1000))
+FIRESTORE_BATCH_LIMIT = 500
+
+# Write-behind mode: POST /api/reviews answers 202 once the review is queued and
+# journaled; background workers write queued reviews in batches
+WRITE_BEHIND_ENABLED = os.environ.get('WRITE_BEHIND', '').lower() in ('1', 'true', 'yes')
+WRITE_BEHIND_JOURNAL = os.environ.get('WRITE_BEHIND_JOURNAL')  # required: a path on durable storage
+WRITE_BEHIND_RETRY_AFTER = 1
+
+# Page size for review listings; clients page through with the X-Next-Cursor header
+DEFAULT_PAGE_SIZE = int(os.environ.get('REVIEWS_PAGE_SIZE', 50))
+MAX_PAGE_SIZE = int(os.environ.get('REVIEWS_MAX_PAGE_SIZE', 200))
 
 # In-memory fallback data in case Firebase connection fails
-sample_reviews = [
+sample_reviews = ReviewStore([
     {
         "id": "1",
         "restaurant": "Delicious Bites",
@@ -82,7 +129,7 @@ sample_reviews = [
         "location": {"latitude": 37.7900, "longitude": -122.4000},
         "timestamp": (datetime.datetime.now() - datetime.timedelta(days=2)).isoformat()
     }
-]
+])
 
 sample_users = {
     "user1": {
@@ -108,135 +155,516 @@ sample_users = {
     }
 }
 
-# Try to initialize Firebase
-firebase_enabled = False
-db = None
+# Firebase is initialized on first use (see firebase_client.py); importing
+# this module does not load the SDK
+firebase = FirebaseClient(os.environ.get('FIREBASE_CREDENTIALS', './firebase-credentials.json'))
 
-try:
-    import firebase_admin
-    from firebase_admin import credentials, firestore, auth
-    
-    # Try to load credentials from file
-    try:
-        cred = credentials.Certificate('./firebase-credentials.json')
-        firebase_admin.initialize_app(cred)
-        db = firestore.client()
-        firebase_enabled = True
-        print("Firebase initialized successfully")
-    except Exception as e:
-        print(f"Firebase initialization error: {e}")
-        print("Using sample data as fallback")
-except ImportError:
-    print("Firebase admin SDK not available, using sample data")
+def get_db():
+    """Firestore client, or None when Firebase is unavailable (initializes it on the first call)"""
+    return firebase.get().db
+
+# Verified tokens are cached until they expire; revocation is re-checked
+# against Firebase every TOKEN_REVOCATION_CHECK_INTERVAL seconds per token
+token_cache = VerifiedTokenCache(
+    verify=lambda token: firebase.auth.verify_id_token(token, check_revoked=True),
+    maxsize=int(os.environ.get('TOKEN_CACHE_SIZE', 10000)),
+    revocation_check_interval=float(os.environ.get('TOKEN_REVOCATION_CHECK_INTERVAL', 300))
+)
 
 # Authentication middleware
 def get_user_from_token(token):
-    if not firebase_enabled:
+    with phase('auth'):
+        return verify_user_token(token)
+
+def verify_user_token(token):
+    if not firebase.enabled:
         # For demo, allow any token and use a demo user
         return {"uid": "demo_user", "name": "Demo User"}
         
     try:
-        # Verify and decode the token with full check_revoked option
-        decoded_token = auth.verify_id_token(token, check_revoked=True)
+        # Verify and decode the token with full check_revoked option (cached)
+        decoded_token = token_cache.get(token)
         
         # Check if token is expired (Firebase does this but adding extra check)
         now = datetime.datetime.now()
         exp = datetime.datetime.fromtimestamp(decoded_token.get('exp', 0))
         
         if now > exp:
-            print("Token expired")
+            logger.info("Token expired")
             return None
             
         return decoded_token
-    except auth.ExpiredIdTokenError:
-        print("Firebase token expired")
+    except firebase.auth.ExpiredIdTokenError:
+        logger.info("Firebase token expired")
         return None
-    except auth.RevokedIdTokenError:
-        print("Firebase token revoked")
+    except firebase.auth.RevokedIdTokenError:
+        logger.info("Firebase token revoked")
         return None
-    except auth.InvalidIdTokenError:
-        print("Firebase token invalid")
+    except firebase.auth.InvalidIdTokenError:
+        logger.info("Firebase token invalid")
         return None
     except Exception as e:
-        print(f"Token verification error: {e}")
+        logger.warning("Token verification error: %s", e)
         return None
 
-# Convert Firestore timestamps to string when needed
-def convert_timestamps(obj):
-    if isinstance(obj, dict):
-        for key, value in obj.items():
-            # Check if it's a Firestore timestamp
-            if hasattr(value, 'seconds') and hasattr(value, 'nanoseconds'):
-                # Convert Firestore timestamp to datetime then to ISO format
-                obj[key] = datetime.datetime.fromtimestamp(value.seconds + value.nanoseconds / 1e9).isoformat()
-            elif isinstance(value, dict):
-                convert_timestamps(value)
-            elif isinstance(value, list):
-                for item in value:
-                    if isinstance(item, dict):
-                        convert_timestamps(item)
-    return obj
-
-# Safe timestamp parsing for comparison
-def safe_timestamp_to_datetime(timestamp):
-    """Convert different timestamp formats to datetime for safe comparison"""
-    if timestamp is None:
-        return datetime.datetime.min.replace(tzinfo=None)
+# Helper function for timestamp sorting on the precomputed epoch-microsecond key
+def sort_by_timestamp(items, reverse=True):
+    """Sort normalized reviews by timestamp"""
+    return sorted(items, key=timestamp_sort_key, reverse=reverse)
+
+def review_timestamp_us(review):
+    """Sort key for reviews that may predate the stored timestampUs field"""
+    return normalize_review_timestamp(review)[TIMESTAMP_US_FIELD]
+
+def review_from_doc(doc):
+    """Review dict for a Firestore document, with its ID and timestamp sort key"""
+    review_data = doc.to_dict()
+    review_data['id'] = doc.id
+    return normalize_review_timestamp(review_data)
+
+def rebuild_stats():
+    """Backfill the restaurant_stats collection from all existing reviews"""
+    db = get_db()
+    if db is None:
+        logger.info("Firebase not enabled, nothing to rebuild")
+        return 0
+    count = rebuild_restaurant_stats(
+        db, timestamp_key=review_timestamp_us
+    )
+    logger.info("Rebuilt stats for %d restaurants", count)
+    return count
+
+# Cursor pagination helpers
+class InvalidCursorError(ValueError):
+    """Raised when a page cursor cannot be decoded or no longer matches a review"""
+
+def parse_page_size(value):
+    """Parse the `limit` query parameter, clamped to MAX_PAGE_SIZE"""
+    if value is None or value == '':
+        return DEFAULT_PAGE_SIZE
+    limit = int(value)
+    if limit < 1:
+        raise ValueError("limit must be positive")
+    return min(limit, MAX_PAGE_SIZE)
+
+def encode_cursor(review_id):
+    """Build an opaque next-page token pointing after the given review"""
+    payload = json.dumps({'after': str(review_id)}).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    """Return the review ID a page token points after"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return str(data['after'])
+    except (ValueError, KeyError, TypeError):
+        raise InvalidCursorError(f"Invalid cursor: {cursor}")
+
+def paginate(items, cursor_id, limit):
+    """Slice an already sorted list into a page, returning (page, next_cursor)"""
+    start = 0
+    if cursor_id is not None:
+        for index, item in enumerate(items):
+            if str(item.get('id')) == cursor_id:
+                start = index + 1
+                break
+        else:
+            raise InvalidCursorError(f"Unknown cursor review: {cursor_id}")
+
+    page = items[start:start + limit]
+    next_cursor = encode_cursor(page[-1]['id']) if page and start + limit < len(items) else None
+    return page, next_cursor
+
+def page_response(page, next_cursor):
+    """JSON array response carrying the next-page token in X-Next-Cursor"""
+    response = jsonify(page)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
+
+# Response cache for the read endpoints. Each worker process has its own cache,
+# so writes handled by other workers are only picked up once entries expire.
+response_cache = TTLCache(
+    maxsize=int(os.environ.get('RESPONSE_CACHE_SIZE', 512)),
+    ttl=float(os.environ.get('RESPONSE_CACHE_TTL', 30))
+)
+
+REVIEW_QUERY_DEFAULTS = {
+    'restaurant': '',
+    'userId': '',
+    'minRating': '',
+    'sortBy': 'timestamp',
+    'order': 'desc',
+    'limit': '',
+    'cursor': '',
+    'stream': ''
+}
+CACHED_HEADERS = ('X-Next-Cursor',)
+
+def reviews_cache_key(args):
+    """Cache key for a review listing; unknown params such as _t are ignored"""
+    return ('reviews',) + tuple(
+        (name, args.get(name) or default) for name, default in REVIEW_QUERY_DEFAULTS.items()
+    )
+
+def reviews_cache_tags(args):
+    """Tags naming the writes that can change a review listing"""
+    if args.get('restaurant'):
+        return [f"restaurant:{args.get('restaurant')}"]
+    if args.get('userId'):
+        return [f"user:{args.get('userId')}"]
+    return ['reviews:all']
+
+def review_write_tags(review):
+    """Tags of every cached response a new review can affect"""
+    return ['trending', 'reviews:all',
+            f"restaurant:{review.get('restaurant')}", f"user:{review.get('userId')}"]
+
+def body_etag(body):
+    """Version tag for a serialized result set"""
+    return hashlib.blake2b(body, digest_size=12).hexdigest()
+
+def conditional_json_response(body, headers, etag):
+    """JSON response, or an empty 304 when the client already holds this version"""
+    if request.if_none_match.contains_weak(etag):
+        response = app.response_class(status=304)
+    else:
+        response = app.response_class(body, mimetype='application/json')
+    response.headers.update(headers)
+    response.set_etag(etag)
+    # Let browsers keep the body but revalidate it on every poll
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def cached_response(key_func, tags_func):
+    """Serve GET responses from response_cache with ETag / If-None-Match support.
+
+    Cache hits are answered without running the view or serializing anything;
+    a matching If-None-Match turns them into a bodiless 304.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            key = key_func(request.args)
+            cached = response_cache.get(key)
+            if cached is not None:
+                return conditional_json_response(*cached)
+            
+            # Views clear this when they fall back to sample data after an error
+            g.response_cacheable = True
+            response = app.make_response(f(*args, **kwargs))
+            if response.status_code != 200 or response.is_streamed:
+                return response
+            
+            body = response.get_data()
+            headers = {name: response.headers[name] for name in CACHED_HEADERS if name in response.headers}
+            etag = body_etag(body)
+            if g.response_cacheable:
+                response_cache.set(key, (body, headers, etag), tags=tags_func(request.args))
+            return conditional_json_response(body, headers, etag)
+        return decorated_function
+    return decorator
+
+# Firestore review listing, driven by a ReviewQueryPlan
+def fetch_review_page(plan, cursor_id, limit):
+    """Fetch one page with filtering and ordering done by Firestore"""
+    db = get_db()
+    query = plan.apply(db.collection('reviews'))
+    
+    with phase('firestore'):
+        if cursor_id:
+            cursor_doc = db.collection('reviews').document(cursor_id).get()
+            record_firestore(documents=1)
+            if not cursor_doc.exists:
+                raise InvalidCursorError(f"Unknown cursor review: {cursor_id}")
+            query = query.start_after(cursor_doc)
         
-    # If it's already a datetime
-    if isinstance(timestamp, datetime.datetime):
-        # Ensure it's timezone-naive for comparison
-        if timestamp.tzinfo is not None:
-            timestamp = timestamp.replace(tzinfo=None)
-        return timestamp
+        # Fetch one extra document to know whether another page exists
+        docs = query.limit(limit + 1).get()
+        record_firestore(documents=len(docs))
+    reviews = []
+    for doc in docs:
+        reviews.append(review_from_doc(doc))
+    
+    next_cursor = None
+    if len(reviews) > limit:
+        reviews = reviews[:limit]
+        next_cursor = encode_cursor(reviews[-1]['id'])
+    return reviews, next_cursor
+
+def fetch_and_sort_reviews(plan, cursor_id, limit):
+    """Fallback for plans without a usable index: filter in Firestore, sort in Python"""
+    db = get_db()
+    with phase('firestore'):
+        docs = plan.apply(db.collection('reviews')).get()
+        record_firestore(documents=len(docs))
+    reviews = []
+    for doc in docs:
+        reviews.append(review_from_doc(doc))
+    
+    with phase('sort'):
+        if plan.sort_field == 'rating':
+            reviews = sorted(reviews, key=lambda x: x.get('rating', 0), reverse=plan.descending)
+        else:
+            reviews = sort_by_timestamp(reviews, reverse=plan.descending)
+        return paginate(reviews, cursor_id, limit)
+
+def save_review_to_firestore(review_data):
+    """Write a review and its user's reviewCount in one batch commit (one round trip).
+
+    The document ID is generated client-side, so the created review is built
+    from local data rather than read back from Firestore. Restaurant stats are
+    derived data: they are updated afterwards in the background, so contention
+    on a busy restaurant's stats document never fails or delays the review.
+    """
+    db = get_db()
+    review_ref = db.collection('reviews').document()
+    review_with_id = dict(review_data, id=review_ref.id)
+    user_id = review_data.get('userId')
+    
+    batch = db.batch()
+    batch.set(review_ref, review_data)
+    if user_id:
+        # merge: an increment that doesn't need to read the user document first
+        batch.set(db.collection('users').document(user_id),
+                  {'reviewCount': firebase.firestore.Increment(1)}, merge=True)
+    with phase('firestore'):
+        batch.commit()
+    record_firestore(documents=2 if user_id else 1)
+    
+    stats_executor.submit(update_stats_in_background, db, review_with_id)
+    return review_with_id
+
+# One worker, so stats updates never contend with each other
+stats_executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix='restaurant-stats')
+
+def update_stats_in_background(db, review):
+    try:
+        update_restaurant_stats(db, review['restaurant'], [review], timestamp_key=review_timestamp_us)
+    except Exception as e:
+        # The review is stored; rebuild_stats() can repair the aggregate
+        logger.error("Error updating stats for %s: %s", review['restaurant'], e)
+
+def stamp_review(review_data):
+    """Set the timestamp fields on a validated, sanitized review, and store its rating as an int"""
+    # Validation accepts ratings like "5"
+    if 'rating' in review_data:
+        review_data['rating'] = rating_key(review_data)
+    if get_db() is not None:
+        # Stamp the review here rather than with SERVER_TIMESTAMP, so the
+        # epoch-microsecond sort key can be stored alongside it
+        now = datetime.datetime.now(datetime.timezone.utc)
+        review_data['timestamp'] = now
+        review_data[TIMESTAMP_US_FIELD] = datetime_to_epoch_us(now)
+        return review_data
+    
+    # Sample data keeps a client-supplied timestamp
+    review_data['timestamp'] = review_data.get('timestamp') or datetime.datetime.now().isoformat()
+    # Never trust a client-supplied sort key
+    review_data.pop(TIMESTAMP_US_FIELD, None)
+    return normalize_review_timestamp(review_data)
+
+def add_sample_reviews(reviews, ids=None):
+    """Store stamped reviews in the sample data under ids, or new IDs.
+
+    Returns (written, failed); a review that can't be added is in `failed`
+    and the others are still stored.
+    """
+    written, failed = [], []
+    for index, review_data in enumerate(reviews):
+        review_data['id'] = ids[index] if ids is not None else sample_reviews.new_id()
         
-    # If it's a Firestore timestamp
-    if hasattr(timestamp, 'seconds') and hasattr(timestamp, 'nanoseconds'):
-        # Convert to timezone-naive datetime
-        return datetime.datetime.fromtimestamp(timestamp.seconds + timestamp.nanoseconds / 1e9).replace(tzinfo=None)
+        # Add to sample data - make a copy to avoid modifying the original
+        try:
+            sample_reviews.add(review_data.copy())
+        except Exception as e:
+            logger.error("Error adding review %s: %s", review_data['id'], e)
+            failed.append(review_data)
+            continue
+        written.append(review_data)
         
-    # If it's an ISO format string
-    if isinstance(timestamp, str):
+        # Update user review count
+        user_id = review_data.get('userId')
+        if user_id in sample_users:
+            sample_users[user_id]['reviewCount'] = sample_users[user_id].get('reviewCount', 0) + 1
+    return written, failed
+
+def write_reviews_to_firestore(reviews, ids=None):
+    """Bulk write stamped reviews (see _write_reviews_to_firestore); returns (written, failed)"""
+    with phase('firestore'):
+        return _write_reviews_to_firestore(reviews, ids)
+
+def _write_reviews_to_firestore(reviews, ids=None):
+    """Bulk write stamped reviews with WriteBatch, FIRESTORE_BATCH_LIMIT writes per commit.
+
+    Reviews are stored under ids (server-generated, for queued reviews) or
+    under new document IDs.
+
+    User reviewCount increments are coalesced per user and restaurant stats
+    per restaurant. Returns (written, failed); reviews in a chunk whose commit
+    failed are in `failed` and are left out of the counters.
+    """
+    db = get_db()
+    written, failed = [], []
+    for start in range(0, len(reviews), FIRESTORE_BATCH_LIMIT):
+        chunk = reviews[start:start + FIRESTORE_BATCH_LIMIT]
+        batch = db.batch()
+        for offset, review_data in enumerate(chunk):
+            # document(None) generates an ID client-side
+            review_ref = db.collection('reviews').document(ids[start + offset] if ids is not None else None)
+            review_data['id'] = review_ref.id
+            batch.set(review_ref, {key: value for key, value in review_data.items() if key != 'id'})
         try:
-            # Try standard ISO format, ensure timezone-naive
-            dt = datetime.datetime.fromisoformat(timestamp)
-            if dt.tzinfo is not None:
-                dt = dt.replace(tzinfo=None)
-            return dt
-        except ValueError:
-            try:
-                # Try with more flexible parsing
-                dt = datetime.datetime.strptime(timestamp, "%Y-%m-%dT%H:%M:%S.%fZ")
-                return dt.replace(tzinfo=None)
-            except ValueError:
-                try:
-                    # Try without microseconds
-                    dt = datetime.datetime.strptime(timestamp, "%Y-%m-%dT%H:%M:%SZ")
-                    return dt.replace(tzinfo=None)
-                except ValueError:
-                    try:
-                        # Try just date
-                        dt = datetime.datetime.strptime(timestamp, "%Y-%m-%d")
-                        return dt.replace(tzinfo=None)
-                    except ValueError:
-                        # Return minimum date as fallback
-                        return datetime.datetime.min.replace(tzinfo=None)
+            batch.commit()
+            record_firestore(documents=len(chunk))
+            written.extend(chunk)
+        except Exception as e:
+            logger.error("Error committing review batch of %d: %s", len(chunk), e)
+            failed.extend(chunk)
+    
+    try:
+        review_counts = Counter(review['userId'] for review in written if review.get('userId'))
+        if review_counts:
+            user_refs = [db.collection('users').document(user_id) for user_id in review_counts]
+            existing = [snapshot.reference for snapshot in db.get_all(user_refs) if snapshot.exists]
+            record_firestore(documents=len(user_refs))
+            for start in range(0, len(existing), FIRESTORE_BATCH_LIMIT):
+                batch = db.batch()
+                user_batch = existing[start:start + FIRESTORE_BATCH_LIMIT]
+                for user_ref in user_batch:
+                    batch.update(user_ref, {'reviewCount': firebase.firestore.Increment(review_counts[user_ref.id])})
+                batch.commit()
+                record_firestore(documents=len(user_batch))
+    except Exception as e:
+        logger.error("Error updating user review counts: %s", e)
+    
+    by_restaurant = {}
+    for review_data in written:
+        by_restaurant.setdefault(review_data['restaurant'], []).append(review_data)
+    for restaurant, restaurant_reviews in by_restaurant.items():
+        try:
+            update_restaurant_stats(db, restaurant, restaurant_reviews, timestamp_key=review_timestamp_us)
+            # Transactional read and write of the stats document
+            record_firestore(calls=2, documents=2)
+        except Exception as e:
+            # The reviews are stored; rebuild_stats() can repair the aggregate
+            logger.error("Error updating stats for %s: %s", restaurant, e)
     
-    # Fallback
-    return datetime.datetime.min.replace(tzinfo=None)
+    return written, failed
 
-# Helper function for safe timestamp sorting
-def sort_by_timestamp(items, reverse=True):
-    """Sort items by timestamp safely handling different timestamp formats"""
-    return sorted(items, key=lambda x: safe_timestamp_to_datetime(x.get('timestamp')), reverse=reverse)
+def store_reviews(reviews, ids=None):
+    """Write stamped reviews to Firestore or the sample data and drop the cached
+    responses they affect. ids are only passed for reviews that were given a
+    server-generated ID when queued. Returns (written, failed)."""
+    if get_db() is None:
+        written, failed = add_sample_reviews(reviews, ids)
+    else:
+        written, failed = write_reviews_to_firestore(reviews, ids)
+    
+    tags = set()
+    for review in written:
+        tags.update(review_write_tags(review))
+    response_cache.invalidate_tags(tags)
+    return written, failed
+
+def store_queued_reviews(reviews):
+    """Write-behind sink: store reviews under the IDs new_review_id() gave them"""
+    return store_reviews(reviews, [review['id'] for review in reviews])
+
+def restore_queued_review(review):
+    """Undo the JSON round trip of a review replayed from the write-behind journal"""
+    if get_db() is not None and isinstance(review.get('timestamp'), str):
+        # Firestore reviews are stamped with a datetime, journaled as ISO 8601
+        review['timestamp'] = datetime.datetime.fromisoformat(review['timestamp'])
+    return review
+
+def new_review_id():
+    """ID for a review that is queued before it is written"""
+    db = get_db()
+    if db is not None:
+        # Generated client-side, no round trip
+        return db.collection('reviews').document().id
+    # Sample IDs are only unique once stored, and queued reviews are not yet
+    return f"wb-{uuid.uuid4().hex}"
+
+write_behind = None
+if WRITE_BEHIND_ENABLED and not WRITE_BEHIND_JOURNAL:
+    # Accepted reviews are only as durable as the journal; a default in the
+    # (ephemeral) temp directory would lose them on every restart
+    logger.error("WRITE_BEHIND requires WRITE_BEHIND_JOURNAL on durable storage (e.g. a mounted volume); "
+                 "writing reviews synchronously")
+elif WRITE_BEHIND_ENABLED:
+    write_behind = WriteBehindQueue(
+        sink=store_queued_reviews,
+        journal_path=WRITE_BEHIND_JOURNAL,
+        maxsize=int(os.environ.get('WRITE_BEHIND_QUEUE_SIZE', 10000)),
+        batch_size=min(int(os.environ.get('WRITE_BEHIND_BATCH_SIZE', 100)), FIRESTORE_BATCH_LIMIT),
+        workers=int(os.environ.get('WRITE_BEHIND_WORKERS', 2)),
+        max_retries=int(os.environ.get('WRITE_BEHIND_MAX_RETRIES', 5)),
+        fsync=os.environ.get('WRITE_BEHIND_FSYNC', '').lower() in ('1', 'true', 'yes'),
+        restore=restore_queued_review
+    ).start()
+
+# Streaming exports: documents are encoded and sent one at a time
+STREAM_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'json': 'application/json'
+}
+
+def stream_firestore_reviews(plan):
+    """Iterate Firestore reviews as query.stream() yields them.
+
+    Ordering is only applied when an index serves it; otherwise documents
+    come back filtered but in Firestore's natural order.
+    """
+    db = get_db()
+    # Only the first document is timed; the rest arrive while the response streams
+    with phase('firestore'):
+        documents = plan.apply(db.collection('reviews')).stream()
+        record_firestore()
+        try:
+            # Pull the first document now so a missing index surfaces before the response starts
+            first = next(documents, None)
+        except Exception as e:
+            if not is_missing_index_error(e):
+                raise
+            logger.warning("Firestore index missing, streaming unsorted: %s", e)
+            documents = plan.without_push_down().apply(db.collection('reviews')).stream()
+            record_firestore()
+            first = next(documents, None)
+    
+    def generate():
+        if first is None:
+            return
+        yield review_from_doc(first)
+        for doc in documents:
+            yield review_from_doc(doc)
+    return generate()
+
+def streaming_reviews_response(reviews, stream_format):
+    """Chunked response encoding one review per chunk"""
+    def generate():
+        if stream_format == 'ndjson':
+            for review in reviews:
+                yield app.json.dumps(review) + '\n'
+            return
+        # Chunked JSON array
+        yield '['
+        separator = ''
+        for review in reviews:
+            yield separator + app.json.dumps(review)
+            separator = ','
+        yield ']'
+    return app.response_class(stream_with_context(generate()), mimetype=STREAM_FORMATS[stream_format])
 
 # Reviews endpoints
 @app.route('/api/reviews', methods=['GET'])
-# Temporarily disable rate limiting for debugging
-# @rate_limit
+@rate_limit
+@cached_response(reviews_cache_key, reviews_cache_tags)
 def get_reviews():
     try:
-        print("Fetching reviews...")
+        logger.debug("Fetching reviews")
         
         # Query parameters for filtering
         restaurant = request.args.get('restaurant')
@@ -245,192 +673,170 @@ def get_reviews():
         min_rating = request.args.get('minRating')
         user_id = request.args.get('userId')
         
+        # Full exports stream every matching review instead of a page
+        stream_format = request.args.get('stream')
+        if stream_format:
+            if stream_format not in STREAM_FORMATS:
+                return jsonify({"error": f"stream must be one of: {', '.join(STREAM_FORMATS)}"}), 400
+            if get_db() is not None:
+                plan = plan_review_query(
+                    restaurant=restaurant,
+                    user_id=user_id,
+                    min_rating=int(min_rating) if min_rating else None,
+                    sort_by=sort_by,
+                    order=order
+                )
+                reviews = stream_firestore_reviews(plan)
+            else:
+                with phase('store'):
+                    reviews = sample_reviews.query(
+                        restaurant=restaurant,
+                        user_id=user_id,
+                        min_rating=int(min_rating) if min_rating else None,
+                        sort_by=sort_by,
+                        descending=order == 'desc'
+                    )
+            return streaming_reviews_response(reviews, stream_format)
+        
+        # Query parameters for paging
+        cursor = request.args.get('cursor')
+        try:
+            limit = parse_page_size(request.args.get('limit'))
+        except ValueError:
+            return jsonify({"error": "limit must be a positive integer"}), 400
+        cursor_id = decode_cursor(cursor) if cursor else None
+        
         # If Firebase is enabled and available, get data from it
-        if firebase_enabled and db is not None:
+        if get_db() is not None:
             try:
-                print("Fetching reviews from Firebase...")
-                # Build the query
-                query = db.collection('reviews')
-                
-                # Apply filters
-                if restaurant:
-                    query = query.where('restaurant', '==', restaurant)
-                
-                if min_rating:
-                    query = query.where('rating', '>=', int(min_rating))
-                
-                if user_id:
-                    query = query.where('userId', '==', user_id)
-                
-                # Execute query
-                results = query.get()
-                    
-                # Convert to list and format
-                reviews = []
-                for doc in results:
-                    review_data = doc.to_dict()
-                    review_data['id'] = doc.id
-                    reviews.append(review_data)
+                logger.debug("Fetching reviews from Firebase")
+                plan = plan_review_query(
+                    restaurant=restaurant,
+                    user_id=user_id,
+                    min_rating=int(min_rating) if min_rating else None,
+                    sort_by=sort_by,
+                    order=order
+                )
+                logger.debug("Review query plan: %s", plan)
                 
-                # Sort results
-                if sort_by == 'rating':
-                    reverse = order == 'desc'
-                    reviews = sorted(reviews, key=lambda x: x.get('rating', 0), reverse=reverse)
-                elif sort_by == 'timestamp':
-                    reverse = order == 'desc'
-                    reviews = sort_by_timestamp(reviews, reverse=reverse)
+                reviews = None
+                if plan.push_down_sort:
+                    try:
+                        reviews, next_cursor = fetch_review_page(plan, cursor_id, limit)
+                    except InvalidCursorError:
+                        raise
+                    except Exception as e:
+                        if not is_missing_index_error(e):
+                            raise
+                        logger.warning("Firestore index missing, sorting in Python: %s", e)
+                        plan = plan.without_push_down()
                 
-                # Now convert timestamps to strings for JSON serialization
-                reviews = [convert_timestamps(review) for review in reviews]
+                if reviews is None:
+                    reviews, next_cursor = fetch_and_sort_reviews(plan, cursor_id, limit)
                 
-                print(f"Found {len(reviews)} reviews in Firebase")
-                return jsonify(reviews)
+                logger.debug("Found %d reviews in Firebase", len(reviews))
+                return page_response(reviews, next_cursor)
+            except InvalidCursorError:
+                raise
             except Exception as e:
-                print(f"Error fetching from Firebase: {e}")
-                print("Falling back to sample data")
+                logger.error("Error fetching from Firebase, falling back to sample data: %s", e)
+                g.response_cacheable = False
                 # Fall back to sample data on error
         
         # Use sample data as fallback
-        print("Using sample reviews data")
-        filtered_reviews = sample_reviews.copy()
-        
-        # Apply filters to sample data
-        if restaurant:
-            filtered_reviews = [r for r in filtered_reviews if r.get('restaurant') == restaurant]
-        
-        if min_rating:
-            filtered_reviews = [r for r in filtered_reviews if r.get('rating', 0) >= int(min_rating)]
-            
-        if user_id:
-            filtered_reviews = [r for r in filtered_reviews if r.get('userId') == user_id]
-        
-        # Sort the results
-        if sort_by == 'rating':
-            reverse = order == 'desc'
-            filtered_reviews = sorted(filtered_reviews, key=lambda x: x.get('rating', 0), reverse=reverse)
-        else:  # Default to timestamp
-            reverse = order == 'desc'
-            filtered_reviews = sorted(filtered_reviews, 
-                                     key=lambda x: safe_timestamp_to_datetime(x.get('timestamp')), 
-                                     reverse=reverse)
-            
-        return jsonify(filtered_reviews)
+        logger.debug("Using sample reviews data")
+        try:
+            with phase('store'):
+                page, last_id = sample_reviews.page(
+                    restaurant=restaurant,
+                    user_id=user_id,
+                    min_rating=int(min_rating) if min_rating else None,
+                    sort_by=sort_by,
+                    descending=order == 'desc',
+                    after_id=cursor_id,
+                    limit=limit
+                )
+        except KeyError:
+            raise InvalidCursorError(f"Unknown cursor review: {cursor_id}")
+        return page_response(page, encode_cursor(last_id) if last_id else None)
+    except InvalidCursorError as e:
+        logger.info("Invalid cursor: %s", e)
+        return jsonify({"error": "Invalid cursor"}), 400
     except Exception as e:
-        print(f"Error getting reviews: {e}")
+        logger.error("Error getting reviews: %s", e)
+        g.response_cacheable = False
         # Return sample data on error
-        return jsonify(sample_reviews)
+        return jsonify(sample_reviews[:DEFAULT_PAGE_SIZE])
 
 @app.route('/api/trending', methods=['GET'])
-# Temporarily disable rate limiting for debugging
-# @rate_limit
+@rate_limit
+@cached_response(lambda args: ('trending',), lambda args: ['trending'])
 def get_trending():
     try:
-        print("Fetching trending data...")
+        logger.debug("Fetching trending data")
         
         # If Firebase is enabled and available, get data from it
-        if firebase_enabled and db is not None:
+        db = get_db()
+        if db is not None:
             try:
-                print("Fetching trending data from Firebase...")
-                # Get all reviews
-                reviews_ref = db.collection('reviews').limit(50).get()
-                reviews = []
+                logger.debug("Fetching trending data from Firebase")
+                # Top restaurants come straight from the maintained aggregates
+                with phase('firestore'):
+                    stats_docs = (db.collection(STATS_COLLECTION)
+                                  .order_by('avgRating', direction=firebase.firestore.Query.DESCENDING)
+                                  .limit(TRENDING_LIMIT)
+                                  .get())
+                    record_firestore(documents=len(stats_docs))
                 
-                for doc in reviews_ref:
-                    review_data = doc.to_dict()
-                    review_data['id'] = doc.id
-                    reviews.append(review_data)
-                
-                # Get top restaurants by average rating
-                restaurant_ratings = {}
-                for review in reviews:
-                    restaurant = review.get('restaurant')
-                    if not restaurant:
-                        continue
-                        
-                    if restaurant not in restaurant_ratings:
-                        restaurant_ratings[restaurant] = {
-                            'totalRating': 0,
-                            'count': 0,
-                            'photos': [],
-                            'latestReview': None
-                        }
-                    
-                    restaurant_ratings[restaurant]['totalRating'] += review.get('rating', 0)
-                    restaurant_ratings[restaurant]['count'] += 1
-                    
-                    # Track photos
-                    if review.get('photoUrl'):
-                        restaurant_ratings[restaurant]['photos'].append(review.get('photoUrl'))
-                    
-                    # Track latest review - using safe timestamp comparison
-                    if restaurant_ratings[restaurant]['latestReview'] is None:
-                        restaurant_ratings[restaurant]['latestReview'] = review
-                    else:
-                        current_timestamp = safe_timestamp_to_datetime(restaurant_ratings[restaurant]['latestReview'].get('timestamp'))
-                        new_timestamp = safe_timestamp_to_datetime(review.get('timestamp'))
-                        
-                        if new_timestamp > current_timestamp:
-                            restaurant_ratings[restaurant]['latestReview'] = review
-                
-                # Format top restaurants
                 top_restaurants = []
-                for restaurant, data in restaurant_ratings.items():
-                    if data['count'] > 0:
-                        avg_rating = data['totalRating'] / data['count']
-                        
-                        top_restaurants.append({
-                            'restaurant': restaurant,  # Use consistent naming
-                            'avgRating': round(avg_rating, 1),
-                            'reviewCount': data['count'],
-                            'latestReview': convert_timestamps(data['latestReview']) if data['latestReview'] else None,
-                            'photos': data['photos'][:3]  # Limit to 3 photos
-                        })
-                
-                # Sort by average rating
-                top_restaurants.sort(key=lambda x: x['avgRating'], reverse=True)
+                for doc in stats_docs:
+                    stats = doc.to_dict()
+                    if not stats.get('count'):
+                        continue
+                    top_restaurants.append({
+                        'restaurant': stats.get('restaurant'),  # Use consistent naming
+                        'avgRating': round(stats['avgRating'], 1),
+                        'reviewCount': stats['count'],
+                        'latestReview': stats.get('latestReview'),
+                        'photos': stats.get('photos', [])[:MAX_STATS_PHOTOS]
+                    })
                 
-                # Get recent activity - using our safe sorting function
-                sorted_reviews = sort_by_timestamp(reviews, reverse=True)
+                # Get recent activity
+                with phase('firestore'):
+                    recent_docs = (db.collection('reviews')
+                                   .order_by('timestamp', direction=firebase.firestore.Query.DESCENDING)
+                                   .limit(TRENDING_LIMIT)
+                                   .get())
+                    record_firestore(documents=len(recent_docs))
                 recent_activity = []
+                for doc in recent_docs:
+                    recent_activity.append(review_from_doc(doc))
                 
-                for review in sorted_reviews[:5]:
-                    converted_review = convert_timestamps(review)  # Convert timestamps now
-                    recent_activity.append(converted_review)
-                
-                print(f"Found {len(top_restaurants)} top restaurants and {len(recent_activity)} recent activities")
+                logger.debug("Found %d top restaurants and %d recent activities",
+                             len(top_restaurants), len(recent_activity))
                 return jsonify({
-                    'topRestaurants': top_restaurants[:5],
+                    'topRestaurants': top_restaurants,
                     'recentActivity': recent_activity
                 })
             except Exception as e:
-                print(f"Error fetching trending from Firebase: {e}")
-                print("Falling back to sample data")
+                logger.error("Error fetching trending from Firebase, falling back to sample data: %s", e)
+                g.response_cacheable = False
                 # Fall back to sample data on error
         
         # Generate trending data from sample reviews
-        print("Using sample data for trending")
-        top_restaurants = []
-        restaurant_names = set(review['restaurant'] for review in sample_reviews)
-        
-        for restaurant in restaurant_names:
-            restaurant_reviews = [r for r in sample_reviews if r['restaurant'] == restaurant]
-            avg_rating = sum(r['rating'] for r in restaurant_reviews) / len(restaurant_reviews)
-            top_restaurants.append({
-                "restaurant": restaurant,
-                "avgRating": round(avg_rating, 1),
-                "reviewCount": len(restaurant_reviews),
-                "lastReviewDate": max(safe_timestamp_to_datetime(r.get('timestamp')) for r in restaurant_reviews).isoformat()
-            })
-        
-        # Sort by average rating (descending)
-        top_restaurants = sorted(top_restaurants, key=lambda x: x['avgRating'], reverse=True)
-        
-        # Get recent activity
-        recent_reviews = sorted(
-            sample_reviews, 
-            key=lambda x: safe_timestamp_to_datetime(x.get('timestamp')), 
-            reverse=True
-        )[:5]
+        logger.debug("Using sample data for trending")
+        with phase('store'):
+            top_restaurants = []
+            for stats in sample_reviews.top_restaurants(TRENDING_LIMIT):
+                top_restaurants.append({
+                    "restaurant": stats['restaurant'],
+                    "avgRating": round(stats['avgRating'], 1),
+                    "reviewCount": stats['count'],
+                    "lastReviewDate": epoch_us_to_iso(stats['latestReview'][TIMESTAMP_US_FIELD])
+                })
+            
+            # Get recent activity
+            recent_reviews = sample_reviews.recent(TRENDING_LIMIT)
         
         trending_data = {
             "topRestaurants": top_restaurants,
@@ -439,7 +845,8 @@ def get_trending():
         
         return jsonify(trending_data)
     except Exception as e:
-        print(f"Error getting trending data: {e}")
+        logger.error("Error getting trending data: %s", e)
+        g.response_cacheable = False
         # Return empty data on error
         return jsonify({"topRestaurants": [], "recentActivity": []})
 
@@ -449,66 +856,107 @@ def create_review():
     try:
         # Get JSON data
         review_data = request.get_json()
-        print(f"Received review data: {review_data}")
+        # Field names only; review text and user details stay out of the logs
+        logger.debug("Received review with fields: %s",
+                     sorted(review_data) if isinstance(review_data, dict) else type(review_data).__name__)
         
         # Validate input but show detailed validation errors
         validation_errors = validate_review_input(review_data)
         if validation_errors:
-            print(f"Validation errors: {validation_errors}")
+            logger.info("Review rejected: %s", validation_errors)
             return jsonify({"errors": validation_errors}), 400
             
         # Sanitize input to prevent XSS
-        review_data = sanitize_review_input(review_data)
+        review_data = stamp_review(sanitize_review_input(review_data))
+        # Review IDs are always assigned by the server
+        review_data.pop('id', None)
+        
+        if write_behind is not None:
+            review_data['id'] = new_review_id()
+            if not write_behind.submit(review_data):
+                response = jsonify({"error": "Too many pending reviews, try again shortly"})
+                response.headers['Retry-After'] = str(WRITE_BEHIND_RETRY_AFTER)
+                return response, 503
+            # Accepted: the review is journaled and will be written shortly
+            return jsonify(review_data), 202
         
         # If Firebase is not enabled, add to sample data
-        if not firebase_enabled or db is None:
-            # Generate a unique ID
-            new_id = str(len(sample_reviews) + 1)
-            
-            # Set timestamp and ID if not already set
-            review_data['timestamp'] = review_data.get('timestamp') or datetime.datetime.now().isoformat()
-            review_data['id'] = new_id
-            
-            # Add to sample data - make a copy to avoid modifying the original
-            sample_reviews.append(review_data.copy())
-            
-            # Update user review count
-            user_id = review_data.get('userId')
-            if user_id in sample_users:
-                sample_users[user_id]['reviewCount'] = sample_users[user_id].get('reviewCount', 0) + 1
-            
+        if get_db() is None:
+            written, _ = add_sample_reviews([review_data])
+            if not written:
+                return jsonify({"error": "Failed to create review"}), 500
+            response_cache.invalidate_tags(review_write_tags(review_data))
             return jsonify(review_data), 201
         
         # If Firebase is enabled
-        # Add current timestamp
-        review_data['timestamp'] = firestore.SERVER_TIMESTAMP
+        # Review and user count in one commit; restaurant stats follow in the background
+        review_with_id = save_review_to_firestore(review_data)
+        response_cache.invalidate_tags(review_write_tags(review_with_id))
         
-        # Add to Firestore
-        review_ref = db.collection('reviews').document()
-        review_ref.set(review_data)
+        # Return the created review
+        return jsonify(review_with_id), 201
+    except Exception as e:
+        logger.error("Error creating review: %s", e)
+        return jsonify({"error": "Failed to create review"}), 500
+
+@app.route('/api/reviews/batch', methods=['POST'])
+def create_reviews_batch():
+    """Bulk ingestion: validate every review, write the valid ones, report per item"""
+    try:
+        payload = request.get_json(silent=True)
+        items = payload.get('reviews') if isinstance(payload, dict) else payload
+        if not isinstance(items, list) or not items:
+            return jsonify({"error": "Expected a non-empty list of reviews"}), 400
+        if len(items) > MAX_BATCH_REVIEWS:
+            return jsonify({"error": f"A batch may contain at most {MAX_BATCH_REVIEWS} reviews"}), 413
         
-        # Get the document with the generated ID
-        review_doc = review_ref.get()
-        review_with_id = review_doc.to_dict()
-        review_with_id['id'] = review_doc.id
+        results = [None] * len(items)
+        pending = []  # (index, review)
+        for index, item in enumerate(items):
+            validation_errors = validate_review_input(item)
+            if validation_errors:
+                results[index] = {"index": index, "status": "invalid", "errors": validation_errors}
+                continue
+            try:
+                review = stamp_review(sanitize_review_input(item))
+            except Exception as e:
+                logger.error("Error preparing batch review %d: %s", index, e)
+                results[index] = {"index": index, "status": "failed", "error": "Failed to write review"}
+                continue
+            # Review IDs are always assigned by the server
+            review.pop('id', None)
+            pending.append((index, review))
         
-        # Update user's review count
-        user_id = review_data.get('userId')
-        if user_id:
-            user_ref = db.collection('users').document(user_id)
-            user_doc = user_ref.get()
-            
-            if user_doc.exists:
-                # Update review count
-                user_ref.update({
-                    'reviewCount': firestore.Increment(1)
-                })
+        # Failures are reported per review; the written ones stay written
+        written, failed = store_reviews([review for _, review in pending])
         
-        # Return the created review
-        return jsonify(convert_timestamps(review_with_id)), 201
+        failed_ids = {id(review) for review in failed}
+        for index, review in pending:
+            if id(review) in failed_ids:
+                results[index] = {"index": index, "status": "failed", "error": "Failed to write review"}
+            else:
+                results[index] = {"index": index, "status": "created", "id": review['id']}
+        
+        created = len(written)
+        statuses = Counter(result['status'] for result in results)
+        failed = statuses['failed']
+        summary = {
+            "results": results,
+            "created": created,
+            "failed": failed,
+            "invalid": statuses['invalid']
+        }
+        logger.info("Batch ingestion: %d created, %d failed, %d invalid",
+                    created, summary['failed'], summary['invalid'])
+        if created == len(items):
+            return jsonify(summary), 201
+        if created:
+            return jsonify(summary), 207
+        # Nothing created: bad input only if no write was even attempted
+        return jsonify(summary), 503 if failed else 400
     except Exception as e:
-        print(f"Error creating review: {e}")
-        return jsonify({"error": "Failed to create review"}), 500
+        logger.error("Error creating review batch: %s", e)
+        return jsonify({"error": "Failed to create reviews"}), 500
 
 # Add a simple test endpoint to check if the server is running
 @app.route('/api/test', methods=['GET'])
@@ -520,17 +968,55 @@ def test_endpoint():
         'timestamp': datetime.datetime.now().isoformat()
     })
 
+@app.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    """Hit/miss counters for tuning the response and verified-token caches"""
+    return jsonify({
+        'responses': response_cache.stats(),
+        'tokens': token_cache.stats()
+    })
+
+CACHE_COUNTERS = ('hits', 'misses', 'evictions', 'expirations', 'invalidations')
+WRITE_BEHIND_COUNTERS = ('accepted', 'rejected', 'written', 'retries', 'abandoned')
+
+def collect_component_metrics():
+    """Cache and write-behind queue figures for /api/metrics"""
+    caches = {'responses': response_cache.stats(), 'tokens': token_cache.stats()}
+    collected = [
+        ('review_api_cache_entries', 'gauge', "Entries held by each cache",
+         {(('cache', name),): stats['size'] for name, stats in caches.items()})
+    ]
+    for counter in CACHE_COUNTERS:
+        collected.append((f'review_api_cache_{counter}_total', 'counter', f"Cache {counter}",
+                          {(('cache', name),): stats[counter] for name, stats in caches.items()}))
+    if write_behind is not None:
+        stats = write_behind.stats()
+        collected.append(('review_api_write_behind_depth', 'gauge', "Reviews waiting to be written",
+                          {(): stats['depth']}))
+        for counter in WRITE_BEHIND_COUNTERS:
+            collected.append((f'review_api_write_behind_{counter}_total', 'counter',
+                              f"Write-behind reviews {counter}", {(): stats[counter]}))
+    return collected
+
+metrics.add_collector(collect_component_metrics)
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Request, phase, Firestore and cache metrics in the Prometheus text format"""
+    return app.response_class(metrics.render(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     return jsonify({
         'status': 'ok',
         'message': 'Server is running',
-        'firebase_enabled': firebase_enabled
+        'firebase_enabled': firebase.enabled,
+        'write_behind': write_behind.stats() if write_behind is not None else None
     })
 
 if __name__ == '__main__':
     # Print information about the server
-    print(f"Starting server on port {os.environ.get('PORT', 5001)}")
-    print(f"Firebase enabled: {firebase_enabled}")
+    logger.info("Starting server on port %s", os.environ.get('PORT', 5001))
+    logger.info("Firebase enabled: %s", firebase.enabled)
     # Use 0.0.0.0 to make it accessible from other devices/Docker
     app.run(host='0.0.0.0', port=int(os.environ.get('PORT', 5001)), debug=True) 
\ No newline at end of file
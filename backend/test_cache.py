@@ -0,0 +1,47 @@
+from cache import TTLCache
+
+def test_entries_expire_after_ttl(clock):
+    """Test that entries are dropped once their TTL has passed"""
+    cache = TTLCache(maxsize=10, ttl=5, clock=clock)
+    cache.set('key', 'value')
+    assert cache.get('key') == 'value'
+    clock.now = 6
+    assert cache.get('key') is None
+    assert cache.stats()['expirations'] == 1
+
+def test_lru_eviction_and_tag_invalidation():
+    """Test least-recently-used eviction and dropping entries by tag"""
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set('a', 1, tags=['restaurant:A'])
+    cache.set('b', 2, tags=['user:u1'])
+    cache.get('a')
+    cache.set('c', 3, tags=['restaurant:A'])
+    assert cache.get('b') is None
+    assert cache.invalidate_tags(['restaurant:A']) == 2
+    assert len(cache) == 0
+
+def test_verified_token_cache_rechecks_revocation(clock):
+    """Test that verified tokens are reused and revocation is re-checked on an interval"""
+    from token_cache import VerifiedTokenCache
+
+    calls = []
+
+    def verify(token):
+        calls.append(token)
+        return {'uid': 'user1', 'exp': 1000}
+
+    tokens = VerifiedTokenCache(verify, revocation_check_interval=60, clock=clock, wall_clock=clock)
+    assert tokens.get('token')['uid'] == 'user1'
+    clock.now = 30
+    tokens.get('token')
+    assert len(calls) == 1
+
+    clock.now = 90
+    tokens.get('token')
+    assert len(calls) == 2
+    assert tokens.stats()['revocationChecks'] == 1
+
+    # Expired tokens go back to the verifier
+    clock.now = 1001
+    tokens.get('token')
+    assert len(calls) == 3
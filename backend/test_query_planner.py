@@ -0,0 +1,15 @@
+from query_planner import plan_review_query
+
+def test_plan_pushes_down_indexed_sort():
+    """Test that sorts backed by an index are ordered in Firestore"""
+    assert plan_review_query(sort_by='rating').push_down_sort
+    plan = plan_review_query(restaurant='Golden Dragon', sort_by='timestamp', order='desc')
+    assert plan.push_down_sort
+    assert plan.filters == [('restaurant', '==', 'Golden Dragon')]
+
+def test_plan_falls_back_to_python_sort():
+    """Test that sorts Firestore cannot serve are planned for Python"""
+    # Inequality on rating while ordering by timestamp
+    assert not plan_review_query(min_rating=4, sort_by='timestamp').push_down_sort
+    # No composite index declared
+    assert not plan_review_query(restaurant='Golden Dragon', indexes=set()).push_down_sort
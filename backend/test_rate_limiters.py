@@ -0,0 +1,44 @@
+import multiprocessing
+
+from local_redis import LocalRedisServer
+from rate_limiters import RedisRateLimiter, SharedMemoryRateLimiter
+from redis_client import RedisClient
+
+def use_limiter(path, requests, results):
+    limiter = SharedMemoryRateLimiter(max_requests=10, time_window=60, path=path, slots=4, buckets=64)
+    results.put(sum(limiter.is_allowed('1.2.3.4') for _ in range(requests)))
+
+def test_shared_memory_limit_holds_across_processes(tmp_path):
+    """Test that worker processes sharing the mmap table share one limit"""
+    path = str(tmp_path / 'rate-limit')
+    results = multiprocessing.get_context('fork').Queue()
+    workers = [multiprocessing.get_context('fork').Process(target=use_limiter, args=(path, 5, results))
+               for _ in range(3)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert sum(results.get() for _ in workers) == 10
+
+    # Slots of exited workers are free again; their counts still apply
+    limiter = SharedMemoryRateLimiter(max_requests=10, time_window=60, path=path, slots=4, buckets=64)
+    assert not limiter.is_allowed('1.2.3.4')
+    assert limiter.is_allowed('5.6.7.8')
+    limiter.close()
+
+def test_redis_limit_is_shared_and_fails_open(clock):
+    """Test that Redis-backed limiters share counters, and allow requests when Redis is down"""
+    server = LocalRedisServer().start()
+    url = f"redis://127.0.0.1:{server.port}/0"
+    first = RedisRateLimiter(max_requests=10, time_window=60, url=url, clock=clock)
+    second = RedisRateLimiter(max_requests=10, time_window=60, client=RedisClient.from_url(url), clock=clock)
+    assert all(first.is_allowed('1.2.3.4') for _ in range(6))
+    assert all(second.is_allowed('1.2.3.4') for _ in range(4))
+    assert not first.is_allowed('1.2.3.4')
+    assert not second.is_allowed('1.2.3.4')
+    # Two windows later the counters have moved on
+    clock.now += 120
+    assert second.is_allowed('1.2.3.4')
+
+    server.stop()
+    assert first.is_allowed('1.2.3.4')
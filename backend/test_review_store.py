@@ -0,0 +1,73 @@
+import random
+
+import pytest
+
+from review_store import ReviewStore
+
+def make_reviews(count, seed=3):
+    rng = random.Random(seed)
+    return [{
+        'id': str(i),
+        'restaurant': rng.choice(['A', 'B', 'C']),
+        'userId': rng.choice(['u1', 'u2']),
+        'rating': rng.randint(1, 5),
+        'timestamp': f"2024-01-{rng.randint(1, 28):02d}T{rng.randint(0, 23):02d}:00:00"
+    } for i in range(count)]
+
+def expected(reviews, restaurant, user_id, min_rating, sort_by, descending):
+    key_field = 'timestampUs' if sort_by == 'timestamp' else 'rating'
+    matches = [(r[key_field], int(r['id']), r) for r in reviews
+               if (not restaurant or r['restaurant'] == restaurant)
+               and (not user_id or r['userId'] == user_id)
+               and (min_rating is None or r['rating'] >= min_rating)]
+    matches.sort(key=lambda m: m[:2], reverse=descending)
+    return [m[2]['id'] for m in matches]
+
+def test_indexed_queries_match_full_scan():
+    """Test that index-backed filtering, sorting and paging match a brute-force scan"""
+    reviews = make_reviews(300)
+    store = ReviewStore(reviews)
+    for restaurant in (None, 'A'):
+        for user_id in (None, 'u2'):
+            for min_rating in (None, 3):
+                for sort_by in ('timestamp', 'rating'):
+                    for descending in (True, False):
+                        want = expected(reviews, restaurant, user_id, min_rating, sort_by, descending)
+                        got, after_id = [], None
+                        while True:
+                            page, after_id = store.page(restaurant, user_id, min_rating, sort_by,
+                                                        descending, after_id, limit=7)
+                            got.extend(r['id'] for r in page)
+                            if after_id is None:
+                                break
+                        assert got == want
+
+def test_aggregates_and_recent():
+    """Test the per-restaurant aggregates and recent reviews"""
+    reviews = make_reviews(50)
+    store = ReviewStore(reviews)
+    top = {s['restaurant']: s for s in store.top_restaurants(3)}
+    a_ratings = [r['rating'] for r in reviews if r['restaurant'] == 'A']
+    assert top['A']['count'] == len(a_ratings)
+    assert top['A']['avgRating'] == sum(a_ratings) / len(a_ratings)
+    assert store.recent(1)[0]['timestampUs'] == max(r['timestampUs'] for r in reviews)
+
+def test_failed_add_changes_nothing(monkeypatch):
+    """Test that an add that fails leaves the store as it was, so the review can be added again"""
+    store = ReviewStore(make_reviews(5))
+    review = {'id': 'new', 'restaurant': 'A', 'userId': 'u1', 'rating': 4, 'timestamp': '2024-02-01T00:00:00'}
+
+    def fail(review):
+        raise RuntimeError("stats unavailable")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(store.restaurant_stats, 'updated', fail)
+        with pytest.raises(RuntimeError):
+            store.add(review)
+    assert store.get('new') is None
+    assert len(store) == 5
+    assert 'new' not in [r['id'] for r in store.query(restaurant='A')]
+
+    store.add(review)
+    assert store.query(restaurant='A', sort_by='timestamp')[0]['id'] == 'new'
+    assert store.get('new') is review
@@ -0,0 +1,51 @@
+import re
+
+from rate_limiters import RateLimiter
+from security import sanitize_string, sanitize_review_input
+
+def legacy_sanitize_string(input_str):
+    sanitized = re.sub(r'<[^>]*>', '', input_str)
+    sanitized = re.sub(r'javascript:', '', sanitized, flags=re.IGNORECASE)
+    return re.sub(r'on\w+=', '', sanitized, flags=re.IGNORECASE)
+
+def test_sanitize_string_matches_previous_output():
+    """Test that the precompiled sanitizer removes exactly what the re.sub chain did"""
+    samples = ['Plain review, nothing to strip.', '<b>bold</b> claim', 'JavaScript:alert(1)',
+               '<img src=x onerror=alert(1)>', 'java<b>script:x', 'on<i>load=x', 'a=b: c<d',
+               'ONCLICK=go()', '<unclosed tag', 'ratio 3:1 and x=y', '']
+    for sample in samples:
+        assert sanitize_string(sample) == legacy_sanitize_string(sample)
+
+def test_sanitize_review_input_handles_nested_lists():
+    """Test that strings inside nested lists and dicts are sanitized and the input is untouched"""
+    data = {'review': '<b>ok</b>', 'rating': 5,
+            'photos': [{'caption': '<script>x</script>hi'}, ['onload=y']]}
+    assert sanitize_review_input(data) == {
+        'review': 'ok', 'rating': 5, 'photos': [{'caption': 'xhi'}, ['y']]
+    }
+    assert data['photos'][0]['caption'] == '<script>x</script>hi'
+
+def test_rate_limiter_slides_and_recovers(clock):
+    """Test that the limit holds across a window boundary and clients recover afterwards"""
+    limiter = RateLimiter(max_requests=10, time_window=60, clock=clock)
+    assert all(limiter.is_allowed('1.2.3.4') for _ in range(10))
+    assert not limiter.is_allowed('1.2.3.4')
+    assert limiter.is_allowed('5.6.7.8')
+    # Halfway into the next window half of the previous count still applies
+    clock.now = 90
+    assert all(limiter.is_allowed('1.2.3.4') for _ in range(5))
+    assert not limiter.is_allowed('1.2.3.4')
+    # Two windows later the client starts from zero
+    clock.now = 240
+    assert all(limiter.is_allowed('1.2.3.4') for _ in range(10))
+
+def test_rate_limiter_bounds_keys(clock):
+    """Test that idle keys are evicted and the key count never exceeds max_keys"""
+    limiter = RateLimiter(max_requests=5, time_window=60, max_keys=100, clock=clock)
+    for number in range(1000):
+        limiter.is_allowed(f"10.0.{number // 256}.{number % 256}")
+        assert len(limiter) <= 100
+    clock.now = 600
+    limiter.is_allowed('a')
+    limiter.is_allowed('b')
+    assert len(limiter) < 100
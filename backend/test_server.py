@@ -1,4 +1,5 @@
 import pytest
+import json
 from server import app
 
 @pytest.fixture
@@ -14,4 +15,292 @@ def test_health_check(client):
     data = response.json
     assert data['status'] == 'ok'
     assert 'message' in data
-    assert 'firebase_enabled' in data 
\ No newline at end of file
+    assert 'firebase_enabled' in data
+
+
+def test_reviews_pagination(client):
+    """Test paging through reviews with limit and the next-page cursor"""
+    response = client.get('/api/reviews?limit=2')
+    assert response.status_code == 200
+    first_page = response.json
+    assert len(first_page) == 2
+    cursor = response.headers.get('X-Next-Cursor')
+    assert cursor
+
+    response = client.get(f'/api/reviews?limit=2&cursor={cursor}')
+    assert response.status_code == 200
+    second_page = response.json
+    assert second_page
+    assert not {r['id'] for r in first_page} & {r['id'] for r in second_page}
+
+def test_reviews_invalid_cursor(client):
+    """Test that a malformed cursor is rejected"""
+    response = client.get('/api/reviews?cursor=not-a-cursor')
+    assert response.status_code == 400
+
+def test_trending_reflects_new_review(client):
+    """Test that a created review updates the restaurant aggregates used by trending"""
+    review = {
+        'restaurant': 'Trending Test Diner',
+        'rating': 5,
+        'review': 'Great spot',
+        'userId': 'user1',
+        'userName': 'John Smith'
+    }
+    response = client.post('/api/reviews', json=review)
+    assert response.status_code == 201
+
+    response = client.get('/api/trending')
+    assert response.status_code == 200
+    top = {r['restaurant']: r for r in response.json['topRestaurants']}
+    assert top['Trending Test Diner']['reviewCount'] == 1
+    assert top['Trending Test Diner']['avgRating'] == 5
+
+def test_reviews_response_cache(client):
+    """Test that repeated listings are served from the cache until a write invalidates them"""
+    from server import response_cache
+    response_cache.clear()
+
+    client.get('/api/reviews?restaurant=Golden%20Dragon&_t=1')
+    hits = response_cache.hits
+    client.get('/api/reviews?restaurant=Golden%20Dragon&_t=2')
+    assert response_cache.hits == hits + 1
+
+    review = {
+        'restaurant': 'Golden Dragon',
+        'rating': 3,
+        'review': 'Fine',
+        'userId': 'user2',
+        'userName': 'Emily Johnson'
+    }
+    client.post('/api/reviews', json=review)
+    response = client.get('/api/reviews?restaurant=Golden%20Dragon')
+    assert any(r['review'] == 'Fine' for r in response.json)
+
+def test_reviews_etag_not_modified(client):
+    """Test that a matching If-None-Match is answered with an empty 304"""
+    response = client.get('/api/reviews')
+    etag = response.headers.get('ETag')
+    assert response.status_code == 200
+    assert etag
+
+    response = client.get('/api/reviews', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+    assert response.headers.get('ETag') == etag
+
+def test_json_encodes_firestore_timestamps():
+    """Test that datetimes and Firestore-style timestamps are encoded as ISO strings"""
+    import datetime
+
+    class FirestoreTimestamp:
+        seconds = 1704067200
+        nanoseconds = 500000000
+
+    review = {
+        'timestamp': datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc),
+        'latest': [{'timestamp': FirestoreTimestamp()}]
+    }
+    data = json.loads(app.json.dumps(review))
+    assert data['timestamp'] == '2024-01-01T00:00:00+00:00'
+    assert data['latest'][0]['timestamp'] == '2024-01-01T00:00:00.500000+00:00'
+
+def test_reviews_ndjson_stream(client):
+    """Test streaming every matching review as newline-delimited JSON"""
+    response = client.get('/api/reviews?stream=ndjson&limit=1')
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    lines = response.get_data(as_text=True).splitlines()
+    assert len(lines) > 1
+    assert all('restaurant' in json.loads(line) for line in lines)
+
+    response = client.get('/api/reviews?stream=json&restaurant=Golden%20Dragon')
+    assert all(r['restaurant'] == 'Golden Dragon' for r in json.loads(response.data))
+
+def test_serializers_produce_same_json():
+    """Test that the fast and stdlib serializers encode reviews identically"""
+    import datetime
+    from serialization import SERIALIZERS, orjson
+
+    if orjson is None:
+        pytest.skip("orjson not installed")
+    review = {
+        'restaurant': 'Golden Dragon',
+        'timestamp': datetime.datetime(2024, 1, 1, 12, 30, tzinfo=datetime.timezone.utc),
+        'location': {'latitude': 37.7833, 'longitude': -122.4167}
+    }
+    outputs = [json.loads(serializer().dumps(review, app.json.default)) for serializer in SERIALIZERS.values()]
+    assert outputs[0] == outputs[1]
+
+def test_batch_review_ingestion(client):
+    """Test bulk ingestion with per-item results"""
+    valid = {
+        'restaurant': 'Batch Bistro',
+        'rating': 4,
+        'review': 'Good',
+        'userId': 'user3',
+        'userName': 'Michael Brown'
+    }
+    invalid = {'restaurant': 'Batch Bistro', 'rating': 9}
+    response = client.post('/api/reviews/batch', json={'reviews': [valid, invalid, dict(valid, rating=2)]})
+    assert response.status_code == 207
+    data = response.json
+    assert data['created'] == 2
+    assert data['invalid'] == 1
+    assert [r['status'] for r in data['results']] == ['created', 'invalid', 'created']
+
+    response = client.get('/api/reviews?restaurant=Batch%20Bistro')
+    assert len(response.json) == 2
+
+def test_metrics_endpoint(client):
+    """Test that request timings and phases are exported in the Prometheus text format"""
+    client.get('/api/reviews?restaurant=Golden%20Dragon&limit=1')
+    response = client.get('/api/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    text = response.get_data(as_text=True)
+    assert '# TYPE review_api_request_duration_seconds histogram' in text
+    assert 'review_api_request_duration_seconds_count{endpoint="/api/reviews",method="GET"}' in text
+    assert 'review_api_phase_duration_seconds_bucket{endpoint="/api/reviews",phase="serialize",le="+Inf"}' in text
+    assert 'review_api_cache_entries{cache="responses"}' in text
+
+def test_client_review_ids_are_ignored(client):
+    """Test that a client-supplied id never replaces or collides with a stored review"""
+    from server import sample_reviews
+    original = dict(sample_reviews.get('1'))
+    review = {
+        'id': '1',
+        'restaurant': 'Id Test Cafe',
+        'rating': 4,
+        'review': 'Tried to pick my own id',
+        'userId': 'user1',
+        'userName': 'John Smith'
+    }
+    response = client.post('/api/reviews', json=review)
+    assert response.status_code == 201
+    assert response.json['id'] != '1'
+
+    response = client.post('/api/reviews/batch', json={'reviews': [review, dict(review, id='../chosen')]})
+    assert response.status_code == 201
+    assert not {r['id'] for r in response.json['results']} & {'1', '../chosen'}
+    assert sample_reviews.get('1') == original
+
+def test_batch_write_failures_are_server_errors(client, monkeypatch):
+    """Test that a batch whose valid reviews all failed to write is a 503, not a 400"""
+    import server
+    monkeypatch.setattr(server, 'store_reviews', lambda reviews: ([], reviews))
+    valid = {'restaurant': 'Batch Bistro', 'rating': 4, 'review': 'Good',
+             'userId': 'user3', 'userName': 'Michael Brown'}
+    response = client.post('/api/reviews/batch', json={'reviews': [valid, {'rating': 9}]})
+    assert response.status_code == 503
+    assert response.json['failed'] == 1
+
+    response = client.post('/api/reviews/batch', json={'reviews': [{'rating': 9}]})
+    assert response.status_code == 400
+
+def test_string_rating_is_stored_as_int(client):
+    """Test that a rating given as a string is accepted and counted in the aggregates"""
+    response = client.post('/api/reviews', json={
+        'restaurant': 'String Rating Grill',
+        'rating': '5',
+        'review': 'Rated with a string',
+        'userId': 'user1',
+        'userName': 'John Smith'
+    })
+    assert response.status_code == 201
+    assert response.json['rating'] == 5
+    top = {s['restaurant']: s for s in client.get('/api/trending').json['topRestaurants']}
+    assert top['String Rating Grill']['avgRating'] == 5
+
+def test_legacy_string_ratings_in_aggregates():
+    """Test that stats rebuilt from stored reviews with string ratings don't fail"""
+    from restaurant_stats import apply_reviews
+    stats = apply_reviews(None, 'Old Diner', [{'rating': '4'}, {'rating': 2}, {'rating': 'bad'}])
+    assert stats['totalRating'] == 6
+    assert stats['count'] == 3
+
+def test_batch_reports_reviews_that_fail_to_store(client, monkeypatch):
+    """Test that one review failing mid-batch is reported while the others are stored and visible"""
+    import server
+    add = server.sample_reviews.add
+
+    def add_unless_middle(review):
+        if review['review'] == 'middle':
+            raise RuntimeError("store unavailable")
+        return add(review)
+
+    # Cache the restaurant's (empty) listing so invalidation is checked too
+    assert client.get('/api/reviews?restaurant=Partial%20Pub').json == []
+    review_count = server.sample_users['user1']['reviewCount']
+    monkeypatch.setattr(server.sample_reviews, 'add', add_unless_middle)
+    reviews = [{'restaurant': 'Partial Pub', 'rating': rating, 'review': text, 'userId': 'user1',
+                'userName': 'John Smith'} for rating, text in ((4, 'first'), ('3', 'middle'), (5, 'last'))]
+    response = client.post('/api/reviews/batch', json={'reviews': reviews})
+    assert response.status_code == 207
+    assert [r['status'] for r in response.json['results']] == ['created', 'failed', 'created']
+    assert response.json['failed'] == 1
+    assert server.sample_users['user1']['reviewCount'] == review_count + 2
+    listed = client.get('/api/reviews?restaurant=Partial%20Pub').json
+    assert sorted(r['review'] for r in listed) == ['first', 'last']
+
+class FakeFirestore:
+    """Records batch commits and their writes; any other call is a round trip we don't expect"""
+    class Ref:
+        def __init__(self, path):
+            self.path = path
+            self.id = path.rsplit('/', 1)[-1]
+
+    class Collection:
+        def __init__(self, name):
+            self.name = name
+
+        def document(self, doc_id=None):
+            return FakeFirestore.Ref(f"{self.name}/{doc_id or 'generated-id'}")
+
+    class Batch:
+        def __init__(self, db):
+            self.db = db
+            self.writes = []
+
+        def set(self, ref, data, merge=False):
+            self.writes.append(('set', ref.path, data, merge))
+
+        def commit(self):
+            self.db.commits.append(self.writes)
+
+    def __init__(self):
+        self.commits = []
+
+    def collection(self, name):
+        return FakeFirestore.Collection(name)
+
+    def batch(self):
+        return FakeFirestore.Batch(self)
+
+def test_firestore_review_write_is_one_commit(monkeypatch):
+    """Test that a Firestore review costs one batch commit, with stats updated off the request path"""
+    import server
+
+    class Increment:
+        def __init__(self, value):
+            self.value = value
+
+    db = FakeFirestore()
+    stats_updates = []
+    monkeypatch.setattr(server, 'get_db', lambda: db)
+    monkeypatch.setattr(server.firebase, 'firestore', type('firestore', (), {'Increment': Increment}))
+    monkeypatch.setattr(server, 'update_restaurant_stats',
+                        lambda db, restaurant, reviews, timestamp_key: stats_updates.append((restaurant, reviews)))
+    review = {'restaurant': 'Firestore Cafe', 'rating': 4, 'review': 'Good', 'userId': 'user1'}
+    created = server.save_review_to_firestore(review)
+    assert created['id'] == 'generated-id'
+
+    assert len(db.commits) == 1
+    (review_write, user_write), = db.commits
+    assert review_write == ('set', 'reviews/generated-id', review, False)
+    assert user_write[:2] == ('set', 'users/user1')
+    assert user_write[2]['reviewCount'].value == 1
+    assert user_write[3]
+    # Wait for the stats worker
+    server.stats_executor.submit(lambda: None).result()
+    assert stats_updates == [('Firestore Cafe', [created])]
@@ -0,0 +1,18 @@
+import datetime
+
+from timestamps import MIN_EPOCH_US, epoch_us_to_iso, timestamp_to_epoch_us
+
+def test_mixed_formats_normalize_to_same_instant():
+    """Test that every stored timestamp format maps to the same epoch microseconds"""
+    expected = 1704067200123000
+    assert timestamp_to_epoch_us('2024-01-01T00:00:00.123000') == expected
+    assert timestamp_to_epoch_us('2024-01-01T00:00:00.123Z') == expected
+    assert timestamp_to_epoch_us('2024-01-01T01:00:00.123+01:00') == expected
+    aware = datetime.datetime(2024, 1, 1, 0, 0, 0, 123000, tzinfo=datetime.timezone.utc)
+    assert timestamp_to_epoch_us(aware) == expected
+    assert epoch_us_to_iso(expected) == '2024-01-01T00:00:00.123000'
+
+def test_unparseable_timestamps_sort_first():
+    """Test that missing and malformed timestamps get the minimum sort key"""
+    assert timestamp_to_epoch_us(None) == MIN_EPOCH_US
+    assert timestamp_to_epoch_us('yesterday') == MIN_EPOCH_US
@@ -0,0 +1,64 @@
+import datetime
+import os
+
+from write_behind import Journal, WriteBehindQueue
+
+class RecordingSink:
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.written = []
+
+    def __call__(self, reviews):
+        if self.failures:
+            self.failures -= 1
+            return [], list(reviews)
+        self.written.extend(reviews)
+        return list(reviews), []
+
+def test_queue_batches_and_retries(tmp_path):
+    """Test that queued reviews are written by the workers, retrying failed batches"""
+    sink = RecordingSink(failures=2)
+    queue = WriteBehindQueue(sink, str(tmp_path / 'journal.jsonl'), retry_backoff=0).start()
+    for number in range(10):
+        assert queue.submit({'id': str(number), 'timestamp': datetime.datetime(2024, 1, 1)})
+    queue.join()
+    queue.stop()
+    assert sorted(review['id'] for review in sink.written) == [str(number) for number in range(10)]
+    assert queue.stats()['written'] == 10
+    assert queue.stats()['retries'] >= 2
+
+def test_full_queue_rejects_and_journal_replays(tmp_path):
+    """Test backpressure on a full queue and replay of unwritten reviews after a restart"""
+    path = str(tmp_path / 'journal.jsonl')
+    # Never started, like a process that died before its workers caught up
+    crashed = WriteBehindQueue(RecordingSink(), path, maxsize=2)
+    assert crashed.submit({'id': 'a'})
+    assert crashed.submit({'id': 'b'})
+    assert not crashed.submit({'id': 'c'})
+    assert crashed.stats()['rejected'] == 1
+    crashed.journal.close()
+
+    sink = RecordingSink()
+    restarted = WriteBehindQueue(sink, path).start()
+    restarted.join()
+    restarted.stop()
+    assert sorted(review['id'] for review in sink.written) == ['a', 'b']
+
+    # Everything is acknowledged, so a further restart has nothing to replay
+    assert WriteBehindQueue(RecordingSink(), path).journal.load() == []
+
+def test_journal_compacts_while_reviews_are_pending(tmp_path):
+    """Test that acked records are dropped from the journal even though the queue never empties"""
+    path = str(tmp_path / 'journal.jsonl')
+    journal = Journal(path, compact_bytes=2048)
+    for number in range(500):
+        journal.add({'id': str(number), 'review': 'x' * 20})
+        if number >= 5:
+            # Always a few reviews in flight
+            journal.ack([str(number - 5)])
+    assert os.path.getsize(path) < 4096
+    journal.close()
+
+    reloaded = Journal(path)
+    assert sorted(review['id'] for review in reloaded.load()) == [str(number) for number in range(495, 500)]
+    reloaded.close()
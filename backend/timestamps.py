@@ -0,0 +1,64 @@
+import datetime
+from operator import itemgetter
+
+# Reviews carry their timestamp as an epoch-microsecond integer ("timestampUs")
+# next to the original value. It is computed once when a review is ingested,
+# so sorting and latest-review selection compare plain ints.
+TIMESTAMP_US_FIELD = 'timestampUs'
+
+EPOCH = datetime.datetime(1970, 1, 1)
+EPOCH_UTC = EPOCH.replace(tzinfo=datetime.timezone.utc)
+ONE_MICROSECOND = datetime.timedelta(microseconds=1)
+# Sort key for missing or unparseable timestamps (datetime.min)
+MIN_EPOCH_US = -62135596800000000
+
+# Formats accepted before ISO parsing covered them, kept for odd client input
+LEGACY_FORMATS = ("%Y-%m-%dT%H:%M:%S.%fZ", "%Y-%m-%dT%H:%M:%SZ", "%Y-%m-%d")
+
+timestamp_sort_key = itemgetter(TIMESTAMP_US_FIELD)
+
+def datetime_to_epoch_us(dt):
+    """Epoch microseconds for a datetime; aware values are converted to UTC, naive ones taken as UTC"""
+    if dt.tzinfo is None:
+        return (dt - EPOCH) // ONE_MICROSECOND
+    return (dt - EPOCH_UTC) // ONE_MICROSECOND
+
+def parse_timestamp_string(value):
+    """Epoch microseconds for an ISO 8601 string, or MIN_EPOCH_US if it cannot be parsed"""
+    text = value[:-1] + '+00:00' if value.endswith('Z') else value
+    try:
+        return datetime_to_epoch_us(datetime.datetime.fromisoformat(text))
+    except ValueError:
+        pass
+    for fmt in LEGACY_FORMATS:
+        try:
+            return datetime_to_epoch_us(datetime.datetime.strptime(value, fmt))
+        except ValueError:
+            continue
+    return MIN_EPOCH_US
+
+def timestamp_to_epoch_us(timestamp):
+    """Normalize any timestamp we store (ISO string, datetime, Firestore timestamp) to epoch microseconds"""
+    if timestamp is None:
+        return MIN_EPOCH_US
+    if isinstance(timestamp, str):
+        return parse_timestamp_string(timestamp)
+    # DatetimeWithNanoseconds from Firestore is a datetime subclass
+    if isinstance(timestamp, datetime.datetime):
+        return datetime_to_epoch_us(timestamp)
+    if isinstance(timestamp, int) and not isinstance(timestamp, bool):
+        return timestamp
+    # Protobuf-style Firestore timestamp
+    if hasattr(timestamp, 'seconds') and hasattr(timestamp, 'nanoseconds'):
+        return timestamp.seconds * 1000000 + timestamp.nanoseconds // 1000
+    return MIN_EPOCH_US
+
+def epoch_us_to_iso(epoch_us):
+    """ISO 8601 string (UTC, naive) for an epoch-microsecond value"""
+    return (EPOCH + datetime.timedelta(microseconds=epoch_us)).isoformat()
+
+def normalize_review_timestamp(review):
+    """Store the epoch-microsecond sort key on a review, unless it already has one"""
+    if not isinstance(review.get(TIMESTAMP_US_FIELD), int):
+        review[TIMESTAMP_US_FIELD] = timestamp_to_epoch_us(review.get('timestamp'))
+    return review
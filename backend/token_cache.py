@@ -0,0 +1,67 @@
+import hashlib
+import threading
+import time
+
+from cache import TTLCache
+
+# Cache of verified Firebase ID tokens, so authenticated requests skip the
+# network round trip that verify_id_token(check_revoked=True) makes.
+# Entries live until the token's own `exp`; revocation is re-checked with the
+# verifier at most once per revocation_check_interval for each token.
+class VerifiedTokenCache:
+    def __init__(self, verify, maxsize=10000, revocation_check_interval=300,
+                 clock=time.monotonic, wall_clock=time.time):
+        self.verify = verify
+        self.revocation_check_interval = revocation_check_interval
+        self.clock = clock
+        self.wall_clock = wall_clock
+        self.cache = TTLCache(maxsize=maxsize, ttl=revocation_check_interval, clock=clock)
+        self.lock = threading.Lock()
+        self.verifications = 0
+        self.revocation_checks = 0
+
+    @staticmethod
+    def key(token):
+        # Raw tokens are credentials; keep only their hash in memory
+        return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+    def get(self, token):
+        """Decoded token, from the cache or the verifier. Verifier errors propagate."""
+        key = self.key(token)
+        entry = self.cache.get(key)
+        if entry is not None:
+            decoded, checked_at = entry
+            if decoded.get('exp', 0) <= self.wall_clock():
+                self.cache.delete(key)
+            elif self.clock() - checked_at < self.revocation_check_interval:
+                return decoded
+            else:
+                with self.lock:
+                    self.revocation_checks += 1
+                return self._verify_and_store(key, token)
+        with self.lock:
+            self.verifications += 1
+        return self._verify_and_store(key, token)
+
+    def _verify_and_store(self, key, token):
+        try:
+            decoded = self.verify(token)
+        except Exception:
+            self.cache.delete(key)
+            raise
+        remaining = decoded.get('exp', 0) - self.wall_clock()
+        if remaining > 0:
+            self.cache.set(key, (decoded, self.clock()), ttl=remaining)
+        return decoded
+
+    def invalidate(self, token):
+        self.cache.delete(self.key(token))
+
+    def stats(self):
+        stats = self.cache.stats()
+        stats.pop('ttl', None)
+        with self.lock:
+            stats['verifications'] = self.verifications
+            stats['revocationChecks'] = self.revocation_checks
+        stats['revocationCheckInterval'] = self.revocation_check_interval
+        return stats
@@ -0,0 +1,218 @@
+import json
+import logging
+import os
+import queue
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows; journals are then unlocked
+    fcntl = None
+
+from serialization import encode_timestamp
+
+logger = logging.getLogger(__name__)
+
+def _encode_default(value):
+    encoded = encode_timestamp(value)
+    if encoded is None:
+        raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+    return encoded
+
+# Append-only journal of queued reviews: an "add" line when a review is accepted
+# and an "ack" line once it has been written. Whatever is added but not acked
+# is replayed on the next start.
+class Journal:
+    def __init__(self, path, fsync=False, compact_bytes=1024 * 1024):
+        self.path, self.file = self._open_unlocked(path)
+        self.fsync = fsync
+        self.compact_bytes = compact_bytes
+        self.compacted_bytes = 0  # size right after the last rewrite
+        self.pending = {}  # review id -> review
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _open_unlocked(path):
+        """Open (and lock) the journal, or a numbered sibling if another worker holds it"""
+        for attempt in range(64):
+            candidate = path if attempt == 0 else f"{path}.{attempt}"
+            handle = open(candidate, 'a+', encoding='utf-8')
+            if fcntl is None:
+                return candidate, handle
+            try:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return candidate, handle
+            except OSError:
+                handle.close()
+        raise RuntimeError(f"No unlocked write-behind journal available at {path}")
+
+    def load(self):
+        """Read pending reviews left by a previous run and compact the file to just those"""
+        with self.lock:
+            self.file.seek(0)
+            for line in self.file:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # A torn final line from a crash mid-write
+                    continue
+                if record.get('op') == 'add':
+                    self.pending[record['review']['id']] = record['review']
+                elif record.get('op') == 'ack':
+                    self.pending.pop(record['id'], None)
+            self._rewrite()
+            return list(self.pending.values())
+
+    def add(self, review):
+        with self.lock:
+            self.pending[review['id']] = review
+            self._append({'op': 'add', 'review': review})
+
+    def ack(self, review_ids):
+        with self.lock:
+            for review_id in review_ids:
+                self.pending.pop(review_id, None)
+                self._append({'op': 'ack', 'id': review_id})
+            # Reviews keep arriving under steady load, so don't wait for an
+            # empty queue: drop the acked records once they dominate the file
+            size = self.file.tell()
+            if size > self.compact_bytes and size > 2 * self.compacted_bytes:
+                self._rewrite()
+
+    def _append(self, record):
+        # Caller holds the lock
+        self.file.write(json.dumps(record, default=_encode_default) + '\n')
+        self.file.flush()
+        if self.fsync:
+            os.fsync(self.file.fileno())
+
+    def _rewrite(self):
+        """Replace the journal with one holding just the pending reviews"""
+        # Caller holds the lock. The new file is written next to the journal
+        # and renamed over it, so a crash mid-rewrite leaves the old one intact.
+        temp_path = f"{self.path}.compact"
+        handle = open(temp_path, 'w+', encoding='utf-8')
+        if fcntl is not None:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        previous, self.file = self.file, handle
+        for review in self.pending.values():
+            self._append({'op': 'add', 'review': review})
+        os.replace(temp_path, self.path)
+        previous.close()
+        self.compacted_bytes = self.file.tell()
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+
+# Bounded in-process queue drained by background workers that write reviews in
+# batches. submit() never blocks: a full queue is reported back so the API can
+# answer 503 instead of piling up requests (backpressure).
+class WriteBehindQueue:
+    def __init__(self, sink, journal_path, maxsize=10000, batch_size=100, workers=2,
+                 max_retries=5, retry_backoff=0.5, fsync=False, restore=None):
+        """sink(reviews) -> (written, failed) persists a batch; restore(review) fixes up replayed reviews"""
+        self.sink = sink
+        self.restore = restore
+        self.journal = Journal(journal_path, fsync=fsync)
+        self.queue = queue.Queue(maxsize)
+        self.batch_size = batch_size
+        self.worker_count = workers
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.workers = []
+        self.stopping = threading.Event()
+        self.lock = threading.Lock()
+        self.counters = {'accepted': 0, 'rejected': 0, 'written': 0, 'retries': 0, 'abandoned': 0}
+
+    def start(self):
+        replayed = self.journal.load()
+        for review in replayed:
+            if self.restore is not None:
+                review = self.restore(review)
+            # Replayed reviews may exceed maxsize; never drop them
+            with self.queue.mutex:
+                self.queue.queue.append(review)
+                self.queue.unfinished_tasks += 1
+        if replayed:
+            logger.info("Replaying %d queued reviews from %s", len(replayed), self.journal.path)
+        for number in range(self.worker_count):
+            worker = threading.Thread(target=self._run, name=f"write-behind-{number}", daemon=True)
+            worker.start()
+            self.workers.append(worker)
+        return self
+
+    def submit(self, review):
+        """Queue a review that already has its ID; False when the queue is full"""
+        if self.queue.full():
+            self._count('rejected')
+            return False
+        self.journal.add(review)
+        try:
+            self.queue.put_nowait(review)
+        except queue.Full:
+            self.journal.ack([review['id']])
+            self._count('rejected')
+            return False
+        self._count('accepted')
+        return True
+
+    def _run(self):
+        while not self.stopping.is_set() or not self.queue.empty():
+            try:
+                batch = [self.queue.get(timeout=0.1)]
+            except queue.Empty:
+                continue
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._write(batch)
+            for _ in batch:
+                self.queue.task_done()
+
+    def _write(self, batch):
+        attempt = 0
+        while batch:
+            try:
+                written, failed = self.sink(batch)
+            except Exception as e:
+                logger.error("Write-behind batch of %d failed: %s", len(batch), e)
+                written, failed = [], batch
+            if written:
+                self.journal.ack([review['id'] for review in written])
+                self._count('written', len(written))
+            batch = failed
+            if not batch:
+                return
+            attempt += 1
+            if attempt > self.max_retries:
+                # Left un-acked in the journal, so the next start retries them
+                logger.error("Giving up on %d reviews after %d retries", len(batch), self.max_retries)
+                self._count('abandoned', len(batch))
+                return
+            self._count('retries')
+            time.sleep(self.retry_backoff * 2 ** (attempt - 1))
+
+    def _count(self, name, amount=1):
+        with self.lock:
+            self.counters[name] += amount
+
+    def join(self):
+        """Block until everything queued so far has been processed"""
+        self.queue.join()
+
+    def stop(self, timeout=10):
+        self.stopping.set()
+        for worker in self.workers:
+            worker.join(timeout)
+        self.journal.close()
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counters)
+        stats['depth'] = self.queue.qsize()
+        stats['capacity'] = self.queue.maxsize
+        return stats
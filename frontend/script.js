@@ -361,20 +361,93 @@ function initPhotoPreview() {
   }
 }
 
+// Reviews are served in pages; the X-Next-Cursor response header names the
+// next page and is absent on the last one
+function fetchReviewsPage(url, params, cursor) {
+  const pageParams = new URLSearchParams(params);
+  if (cursor) pageParams.set('cursor', cursor);
+  return fetch(`${url}?${pageParams}`, { cache: 'no-cache' })
+    .then(response => {
+      if (!response.ok) {
+        throw new Error(`Error fetching reviews: ${response.status}`);
+      }
+      const nextCursor = response.headers.get('X-Next-Cursor');
+      return response.json().then(reviews => {
+        if (!Array.isArray(reviews)) {
+          console.error('Invalid reviews response:', reviews);
+          throw new Error('Invalid response from server');
+        }
+        return { reviews, nextCursor };
+      });
+    });
+}
+
+function removeLoadMore(list) {
+  const button = list.nextElementSibling;
+  if (button && button.classList.contains('load-more-btn')) button.remove();
+}
+
+// Add a "Load more" button after list that appends the next page to it
+function showLoadMore(list, url, params, nextCursor, renderReview) {
+  removeLoadMore(list);
+  if (!nextCursor) return;
+  
+  const button = document.createElement('button');
+  button.type = 'button';
+  button.className = 'secondary-btn load-more-btn';
+  button.textContent = 'Load more reviews';
+  button.addEventListener('click', () => {
+    button.disabled = true;
+    button.textContent = 'Loading...';
+    fetchReviewsPage(url, params, nextCursor)
+      .then(({ reviews, nextCursor }) => {
+        list.insertAdjacentHTML('beforeend', reviews.map(renderReview).join(''));
+        showLoadMore(list, url, params, nextCursor, renderReview);
+      })
+      .catch(error => {
+        console.error('Error loading more reviews:', error);
+        button.disabled = false;
+        button.textContent = 'Load more reviews';
+      });
+  });
+  list.insertAdjacentElement('afterend', button);
+}
+
+function renderReviewCard(review, showAuthor = true) {
+  const date = new Date(review.timestamp).toLocaleDateString();
+  const stars = '★'.repeat(review.rating) + '☆'.repeat(5 - review.rating);
+  
+  return `
+    <div class="review-card">
+      <div class="review-header">
+        <h3>${review.restaurant}</h3>
+        <div class="rating">${stars}</div>
+      </div>
+      <p class="review-text">${review.review}</p>
+      <div class="review-footer">
+        ${showAuthor ? `<span class="review-author">By ${review.userName}</span>` : ''}
+        <span class="review-date">${date}</span>
+      </div>
+      ${review.photoUrl ? `<div class="review-photo"><img src="${review.photoUrl}" alt="Review photo"></div>` : ''}
+    </div>
+  `;
+}
+
 // Load reviews from API
 function loadReviews(filters = {}) {
   const reviewsList = document.getElementById('reviewsList');
   if (!reviewsList) return;
   
   reviewsList.innerHTML = '<div class="loading">Loading reviews...</div>';
+  removeLoadMore(reviewsList);
   
   const params = new URLSearchParams();
   for (const [key, value] of Object.entries(filters)) {
     if (value) params.append(key, value);
   }
   
-  // Always add a timestamp parameter to prevent caching
-  params.append('_t', Date.now());
+  // No cache-busting parameter: requests revalidate with the server's ETag
+  // and a 304 reuses the body the browser already has
   console.log('Loading reviews with params:', params.toString());
   
   // First try the test endpoint to see if the backend is available
@@ -386,23 +459,11 @@ function loadReviews(filters = {}) {
       return response.json();
     })
     .then(() => {
-      // If test endpoint succeeds, get reviews
+      // If test endpoint succeeds, get the first page of reviews
       console.log('Backend test succeeded, fetching reviews');
-      return fetch(`/api/reviews?${params}`);
-    })
-    .then(response => {
-      if (!response.ok) {
-        throw new Error(`Error fetching reviews: ${response.status}`);
-      }
-      console.log('Reviews fetched successfully, parsing JSON');
-      return response.json();
+      return fetchReviewsPage('/api/reviews', params);
     })
-    .then(reviews => {
-      if (!Array.isArray(reviews)) {
-        console.error('Invalid reviews response:', reviews);
-        throw new Error('Invalid response from server');
-      }
-      
+    .then(({ reviews, nextCursor }) => {
       console.log('Loaded reviews:', reviews);
       
       if (reviews.length === 0) {
@@ -410,28 +471,8 @@ function loadReviews(filters = {}) {
         return;
       }
       
-      let html = '';
-      reviews.forEach(review => {
-        const date = new Date(review.timestamp).toLocaleDateString();
-        const stars = '★'.repeat(review.rating) + '☆'.repeat(5 - review.rating);
-        
-        html += `
-          <div class="review-card">
-            <div class="review-header">
-              <h3>${review.restaurant}</h3>
-              <div class="rating">${stars}</div>
-            </div>
-            <p class="review-text">${review.review}</p>
-            <div class="review-footer">
-              <span class="review-author">By ${review.userName}</span>
-              <span class="review-date">${date}</span>
-            </div>
-            ${review.photoUrl ? `<div class="review-photo"><img src="${review.photoUrl}" alt="Review photo"></div>` : ''}
-          </div>
-        `;
-      });
-      
-      reviewsList.innerHTML = html;
+      reviewsList.innerHTML = reviews.map(review => renderReviewCard(review)).join('');
+      showLoadMore(reviewsList, '/api/reviews', params, nextCursor, review => renderReviewCard(review));
       console.log(`Rendered ${reviews.length} reviews`);
     })
     .catch(error => {
@@ -447,10 +488,6 @@ function loadTrending() {
   
   trendingContainer.innerHTML = '<div class="loading">Loading trending data...</div>';
   
-  // Add a timestamp parameter to prevent caching
-  const params = new URLSearchParams();
-  params.append('_t', Date.now());
-  
   // First try the test endpoint to see if the backend is available
   fetch('/api/test')
     .then(response => {
@@ -461,7 +498,7 @@ function loadTrending() {
     })
     .then(() => {
       // If test endpoint succeeds, get trending data
-      return fetch(`/api/trending?${params}`);
+      return fetch('/api/trending', { cache: 'no-cache' });
     })
     .then(response => {
       if (!response.ok) {
@@ -622,49 +659,22 @@ function loadUserReviews() {
 
   userReviewsContainer.innerHTML = '<div class="loading">Loading your reviews...</div>';
 
-  // Add a timestamp parameter to prevent caching
+  // Revalidate with the server's ETag instead of busting the cache
+  const url = 'http://localhost:5001/api/reviews';
   const params = new URLSearchParams();
   params.append('userId', currentUser.uid);
-  params.append('_t', Date.now());
-
-  fetch(`http://localhost:5001/api/reviews?${params}`)
-    .then(response => {
-      if (!response.ok) {
-        throw new Error(`Error fetching user reviews: ${response.status}`);
-      }
-      return response.json();
-    })
-    .then(reviews => {
-      if (!Array.isArray(reviews)) {
-        throw new Error('Invalid response from server');
-      }
 
+  fetchReviewsPage(url, params)
+    .then(({ reviews, nextCursor }) => {
       if (reviews.length === 0) {
         userReviewsContainer.innerHTML = '<p>You haven\'t written any reviews yet.</p>';
         return;
       }
 
-      let html = '<div class="reviews-list">';
-      reviews.forEach(review => {
-        const date = new Date(review.timestamp).toLocaleDateString();
-        const stars = '★'.repeat(review.rating) + '☆'.repeat(5 - review.rating);
-        
-        html += `
-          <div class="review-card">
-            <div class="review-header">
-              <h3>${review.restaurant}</h3>
-              <div class="rating">${stars}</div>
-            </div>
-            <p class="review-text">${review.review}</p>
-            <div class="review-footer">
-              <span class="review-date">${date}</span>
-            </div>
-            ${review.photoUrl ? `<div class="review-photo"><img src="${review.photoUrl}" alt="Review photo"></div>` : ''}
-          </div>
-        `;
-      });
-      html += '</div>';
-      userReviewsContainer.innerHTML = html;
+      userReviewsContainer.innerHTML =
+        `<div class="reviews-list">${reviews.map(review => renderReviewCard(review, false)).join('')}</div>`;
+      showLoadMore(userReviewsContainer.firstElementChild, url, params, nextCursor,
+                   review => renderReviewCard(review, false));
     })
     .catch(error => {
       console.error('Error loading user reviews:', error);
@@ -0,0 +1,250 @@
+import asyncio
+import json
+import logging
+import os
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+# A backplane carries messages between socket-server processes. Every node
+# publishes reviews and system messages to it and gets every published
+# message back through deliver(message), including its own, and then fans it
+# out to its own clients. Reviews are numbered by the backplane, so sequence
+# numbers (and resuming with them) mean the same thing on every node.
+
+BACKPLANE = os.environ.get('BACKPLANE', 'memory')
+BACKPLANE_REDIS_URL = os.environ.get('BACKPLANE_REDIS_URL', 'redis://localhost:6379/0')
+BACKPLANE_PREFIX = os.environ.get('BACKPLANE_PREFIX', 'reviews')
+
+CONNECTION_ERRORS = (ConnectionError, OSError, asyncio.IncompleteReadError, asyncio.TimeoutError)
+
+# Single process: publishing is delivering
+class InProcessBackplane:
+    shared = False
+
+    def __init__(self, log, deliver):
+        self.log = log
+        self.deliver = deliver
+        self.counters = {'published': 0}
+
+    async def start(self):
+        return self
+
+    async def publish_review(self, review):
+        # The log is updated by deliver before anything else can publish
+        self.counters['published'] += 1
+        await self.deliver(dict(review, seq=self.log.last_seq + 1))
+
+    async def publish(self, message):
+        self.counters['published'] += 1
+        await self.deliver(message)
+
+    async def close(self):
+        pass
+
+    def stats(self):
+        return {'backplane': 'memory', **self.counters}
+
+# Minimal RESP client over asyncio streams
+class RedisError(Exception):
+    """Error reply from the server"""
+
+def encode_command(args):
+    parts = [b'*%d\r\n' % len(args)]
+    for arg in args:
+        data = arg if isinstance(arg, bytes) else str(arg).encode('utf-8')
+        parts.append(b'$%d\r\n%s\r\n' % (len(data), data))
+    return b''.join(parts)
+
+async def read_reply(reader):
+    line = await reader.readline()
+    if not line.endswith(b'\r\n'):
+        raise ConnectionError("Connection closed by Redis")
+    kind, payload = line[:1], line[1:-2]
+    if kind == b'+':
+        return payload.decode('utf-8')
+    if kind == b'-':
+        return RedisError(payload.decode('utf-8'))
+    if kind == b':':
+        return int(payload)
+    if kind == b'$':
+        length = int(payload)
+        return None if length < 0 else (await reader.readexactly(length + 2))[:-2]
+    if kind == b'*':
+        length = int(payload)
+        return None if length < 0 else [await read_reply(reader) for _ in range(length)]
+    raise ConnectionError(f"Unexpected reply from Redis: {line!r}")
+
+class RedisConnection:
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def open(cls, url, timeout=5):
+        """Connection for a redis://[:password@]host[:port][/db] URL"""
+        parsed = urlparse(url)
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(parsed.hostname or 'localhost', parsed.port or 6379), timeout)
+        connection = cls(reader, writer)
+        db = parsed.path.lstrip('/')
+        if parsed.password:
+            await connection.pipeline([('AUTH', parsed.password)])
+        if db and db != '0':
+            await connection.pipeline([('SELECT', db)])
+        return connection
+
+    async def pipeline(self, commands):
+        """Send commands in one write and return their replies in order"""
+        self.writer.write(b''.join(encode_command(command) for command in commands))
+        await self.writer.drain()
+        replies = [await read_reply(self.reader) for _ in commands]
+        for reply in replies:
+            if isinstance(reply, RedisError):
+                raise reply
+        return replies
+
+    async def read(self):
+        """Next message pushed to a subscribed connection"""
+        return await read_reply(self.reader)
+
+    def close(self):
+        self.writer.close()
+
+# Redis pub/sub: reviews and system messages go over one channel, and the last
+# buffer_size reviews are kept in a Redis list so a node that starts (or
+# reconnects) can catch up. A review is numbered, stored and published in one
+# WATCH/MULTI/EXEC transaction, so every node receives reviews in seq order.
+class RedisBackplane:
+    shared = True
+
+    def __init__(self, deliver, url, prefix='reviews', buffer_size=200, retry_delay=1.0):
+        self.deliver = deliver
+        self.url = url
+        self.channel = f"{prefix}:events"
+        self.seq_key = f"{prefix}:seq"
+        self.buffer_key = f"{prefix}:buffer"
+        self.buffer_size = buffer_size
+        self.retry_delay = retry_delay
+        self.commands = None
+        self.command_lock = asyncio.Lock()  # WATCH state is per connection
+        self.subscriber = None
+        self.listener = None
+        self.last_seq = 0  # highest review number seen, in case Redis loses its counter
+        self.counters = {'published': 0, 'received': 0, 'conflicts': 0, 'reconnects': 0}
+
+    async def start(self):
+        """Subscribe and deliver the buffered reviews; raises if Redis is unreachable"""
+        await self._subscribe()
+        self.listener = asyncio.create_task(self._listen())
+        return self
+
+    async def _subscribe(self):
+        subscriber = await RedisConnection.open(self.url)
+        await subscriber.pipeline([('SUBSCRIBE', self.channel)])
+        self.subscriber = subscriber
+        # Read the buffer after subscribing so nothing falls in between; the
+        # overlap is delivered twice and dropped by seq
+        for payload in await self._command([('LRANGE', self.buffer_key, 0, -1)]):
+            await self._deliver(json.loads(payload))
+
+    async def _deliver(self, message):
+        self.last_seq = max(self.last_seq, message.get("seq", 0))
+        await self.deliver(message)
+
+    async def _command(self, commands):
+        async with self.command_lock:
+            return await self._command_locked(commands)
+
+    async def _command_locked(self, commands):
+        # Caller holds command_lock
+        if self.commands is None:
+            self.commands = await RedisConnection.open(self.url)
+        try:
+            return (await self.commands.pipeline(commands))[-1]
+        except CONNECTION_ERRORS:
+            self.commands.close()
+            self.commands = None
+            raise
+
+    async def _listen(self):
+        while True:
+            try:
+                reply = await self.subscriber.read()
+            except CONNECTION_ERRORS as e:
+                logger.error(f"Lost the backplane subscription: {e}")
+                await self._resubscribe()
+                continue
+            if isinstance(reply, list) and len(reply) == 3 and reply[0] == b'message':
+                self.counters['received'] += 1
+                try:
+                    await self._deliver(json.loads(reply[2]))
+                except Exception as e:
+                    logger.error(f"Error delivering a backplane message: {e}")
+
+    async def _resubscribe(self):
+        self.subscriber.close()
+        while True:
+            await asyncio.sleep(self.retry_delay)
+            try:
+                await self._subscribe()
+                self.counters['reconnects'] += 1
+                logger.info("Backplane subscription restored")
+                return
+            except CONNECTION_ERRORS as e:
+                logger.warning(f"Backplane still unavailable: {e}")
+
+    async def publish_review(self, review):
+        async with self.command_lock:
+            try:
+                await self._publish_review_locked(review)
+            except CONNECTION_ERRORS:
+                # Once more on a new connection, e.g. after Redis restarted
+                await self._publish_review_locked(review)
+
+    async def _publish_review_locked(self, review):
+        # Caller holds command_lock
+        while True:
+            current = await self._command_locked([('WATCH', self.seq_key), ('GET', self.seq_key)])
+            seq = max(int(current or 0), self.last_seq) + 1
+            payload = json.dumps(dict(review, seq=seq))
+            result = await self._command_locked([
+                ('MULTI',),
+                ('SET', self.seq_key, seq),
+                ('RPUSH', self.buffer_key, payload),
+                ('LTRIM', self.buffer_key, -self.buffer_size, -1),
+                ('PUBLISH', self.channel, payload),
+                ('EXEC',)
+            ])
+            if result is not None:
+                self.counters['published'] += 1
+                return
+            # Another node published in between; number it again
+            self.counters['conflicts'] += 1
+
+    async def publish(self, message):
+        command = [('PUBLISH', self.channel, json.dumps(message))]
+        try:
+            await self._command(command)
+        except CONNECTION_ERRORS:
+            await self._command(command)
+        self.counters['published'] += 1
+
+    async def close(self):
+        if self.listener is not None:
+            self.listener.cancel()
+        for connection in (self.subscriber, self.commands):
+            if connection is not None:
+                connection.close()
+
+    def stats(self):
+        return {'backplane': 'redis', **self.counters}
+
+def create_backplane(log, deliver, backend=None, buffer_size=200):
+    """The backplane named by BACKPLANE ("memory" or "redis"); call start() on the running loop"""
+    backend = backend or BACKPLANE
+    if backend == 'redis':
+        return RedisBackplane(deliver, BACKPLANE_REDIS_URL, BACKPLANE_PREFIX, buffer_size)
+    if backend != 'memory':
+        logger.error(f"Unknown backplane '{backend}', using memory")
+    return InProcessBackplane(log, deliver)
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Test helpers shared with the socket server's tests (local_redis)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'test-support'))
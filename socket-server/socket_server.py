@@ -1,31 +1,285 @@
 import asyncio
+import concurrent.futures
+import hashlib
 import websockets
 import json
+import os
 import random
-import nltk
-from nltk.sentiment import SentimentIntensityAnalyzer
+import threading
+import time
+from collections import OrderedDict, deque
 from datetime import datetime
+from itertools import takewhile
+from urllib.parse import parse_qs, urlsplit
 import logging
 
+from backplane import create_backplane
+
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Download NLTK's VADER lexicon if not already downloaded
-try:
-    nltk.download('vader_lexicon')
-    logger.info("NLTK VADER lexicon downloaded successfully")
-except Exception as e:
-    logger.error(f"Error downloading NLTK lexicon: {e}")
+# NLTK and the VADER lexicon are loaded on first use. The lexicon is read from
+# NLTK's data path (including $NLTK_DATA, e.g. a directory baked into the image)
+# and only downloaded when it is missing there, so restarts need no network.
+NLTK_DATA_DIR = os.environ.get('NLTK_DATA')
+
+# A failed load is retried after a delay that doubles up to the maximum, so a
+# transient download failure doesn't disable scoring until a restart
+SENTIMENT_RETRY_DELAY = float(os.environ.get('SENTIMENT_RETRY_DELAY', 1))
+SENTIMENT_RETRY_MAX_DELAY = float(os.environ.get('SENTIMENT_RETRY_MAX_DELAY', 60))
+
+_sia = None
+_sia_error = None  # why the last load failed
+_sia_retry_at = 0.0  # time.monotonic() before which the load isn't tried again
+_sia_retry_delay = SENTIMENT_RETRY_DELAY
+_sia_lock = threading.Lock()
+
+def get_sentiment_analyzer():
+    """Shared SentimentIntensityAnalyzer, created on the first call.
+
+    If it can't be created (e.g. the lexicon is missing and can't be
+    downloaded) calls raise RuntimeError, and the load is tried again only
+    once the retry delay has passed.
+    """
+    global _sia, _sia_error, _sia_retry_at, _sia_retry_delay
+    if _sia is None:
+        with _sia_lock:
+            if _sia is None:
+                if _sia_error is not None and time.monotonic() < _sia_retry_at:
+                    raise _sia_error
+                try:
+                    _sia = load_sentiment_analyzer()
+                except Exception as e:
+                    _sia_error = RuntimeError(f"VADER sentiment analyzer unavailable: {e}")
+                    _sia_retry_at = time.monotonic() + _sia_retry_delay
+                    logger.error(f"{_sia_error}; retrying in {_sia_retry_delay:.0f}s")
+                    _sia_retry_delay = min(_sia_retry_delay * 2, SENTIMENT_RETRY_MAX_DELAY)
+                    raise _sia_error
+                _sia_error = None
+                _sia_retry_delay = SENTIMENT_RETRY_DELAY
+                logger.info("NLTK VADER sentiment analyzer loaded")
+    return _sia
+
+def load_sentiment_analyzer():
+    import nltk
+    from nltk.sentiment import SentimentIntensityAnalyzer
+    
+    try:
+        nltk.data.find('sentiment/vader_lexicon.zip')
+    except LookupError:
+        logger.info("VADER lexicon not found locally, downloading it")
+        if not nltk.download('vader_lexicon', download_dir=NLTK_DATA_DIR, quiet=True):
+            logger.error("Error downloading NLTK lexicon")
+    return SentimentIntensityAnalyzer()
+
+# Sentiment scoring runs in an executor so it never blocks the event loop.
+# Reviews waiting for a worker are scored together in one batch, and scores
+# are memoized by a hash of the whitespace-normalized text (VADER splits on
+# whitespace and reads case, so only whitespace is normalized).
+SENTIMENT_EXECUTOR = os.environ.get('SENTIMENT_EXECUTOR', 'thread')  # or 'process'
+SENTIMENT_WORKERS = int(os.environ.get('SENTIMENT_WORKERS', 2))
+SENTIMENT_BATCH_SIZE = int(os.environ.get('SENTIMENT_BATCH_SIZE', 32))
+SENTIMENT_CACHE_SIZE = int(os.environ.get('SENTIMENT_CACHE_SIZE', 10000))
+STATS_LOG_INTERVAL = float(os.environ.get('STATS_LOG_INTERVAL', 60))
 
-# Initialize Sentiment Analyzer
-sia = SentimentIntensityAnalyzer()
+def score_texts(texts):
+    """VADER scores for a batch of texts; runs in an executor worker"""
+    analyzer = get_sentiment_analyzer()
+    return [analyzer.polarity_scores(text) for text in texts]
 
-# Store connected clients and their usernames
+def text_key(text):
+    return hashlib.blake2b(" ".join(text.split()).encode('utf-8'), digest_size=16).digest()
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile, None for no values"""
+    if not sorted_values:
+        return None
+    return sorted_values[max(0, (len(sorted_values) * pct + 99) // 100 - 1)]
+
+# Texts waiting to be scored, batched per free worker. Identical texts share
+# one pending score; stats() reports queue depth and latency.
+class SentimentScorer:
+    def __init__(self, executor, workers, batch_size=32, cache_size=10000):
+        self.executor = executor
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self.cache = OrderedDict()  # text key -> scores, least recently used first
+        self.pending = {}  # text key -> future, for texts queued or being scored
+        self.queue = None  # (key, text, queued at), created on the running loop
+        self.worker_slots = None
+        self.workers = workers
+        self.task = None
+        self.batches = set()  # running batch tasks
+        self.latencies = deque(maxlen=1000)  # seconds from queued to scored
+        self.batch_times = deque(maxlen=1000)  # seconds per batch in the executor
+        self.counters = {'requests': 0, 'cache_hits': 0, 'coalesced': 0, 'scored': 0, 'batches': 0, 'errors': 0}
+
+    async def score(self, text):
+        """VADER polarity scores for text"""
+        self.counters['requests'] += 1
+        key = text_key(text)
+        scores = self.cache.get(key)
+        if scores is not None:
+            self.cache.move_to_end(key)
+            self.counters['cache_hits'] += 1
+            return scores
+        future = self.pending.get(key)
+        if future is not None:
+            # The same text is already on its way to be scored
+            self.counters['coalesced'] += 1
+        else:
+            if self.task is None:
+                self.queue = asyncio.Queue()
+                self.worker_slots = asyncio.Semaphore(self.workers)
+                self.task = asyncio.create_task(self._run())
+            future = self.pending[key] = asyncio.get_running_loop().create_future()
+            self.queue.put_nowait((key, text, time.perf_counter()))
+        # Shielded: one waiter going away must not cancel the score for the others
+        return await asyncio.shield(future)
+
+    async def _run(self):
+        while True:
+            # Wait for a free worker first, so texts arriving meanwhile join the batch
+            await self.worker_slots.acquire()
+            batch = [await self.queue.get()]
+            while len(batch) < self.batch_size and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            task = asyncio.create_task(self._score_batch(batch))
+            self.batches.add(task)
+            task.add_done_callback(self.batches.discard)
+
+    async def _score_batch(self, batch):
+        try:
+            start = time.perf_counter()
+            try:
+                results = await asyncio.get_running_loop().run_in_executor(
+                    self.executor, score_texts, [text for _, text, _ in batch])
+            except Exception as e:
+                logger.error(f"Sentiment scoring failed for {len(batch)} reviews: {e}")
+                self.counters['errors'] += 1
+                for key, _, _ in batch:
+                    self.pending.pop(key).set_exception(e)
+                return
+            finished = time.perf_counter()
+            self.batch_times.append(finished - start)
+            self.counters['batches'] += 1
+            self.counters['scored'] += len(batch)
+            for (key, _, queued), scores in zip(batch, results):
+                self.latencies.append(finished - queued)
+                self.cache[key] = scores
+                if len(self.cache) > self.cache_size:
+                    self.cache.popitem(last=False)
+                self.pending.pop(key).set_result(scores)
+        finally:
+            self.worker_slots.release()
+
+    def stats(self):
+        """Counters, queue depth and recent latencies (milliseconds), for sizing the pool"""
+        latencies = sorted(self.latencies)
+        batch_times = sorted(self.batch_times)
+        stats = dict(self.counters)
+        stats.update({
+            'workers': self.workers,
+            'executor': SENTIMENT_EXECUTOR,
+            'queue_depth': self.queue.qsize() if self.queue is not None else 0,
+            'pending': len(self.pending),
+            'cache_size': len(self.cache),
+            'latency_ms': {f'p{pct}': None if value is None else round(value * 1000, 3)
+                           for pct, value in ((50, percentile(latencies, 50)),
+                                              (95, percentile(latencies, 95)),
+                                              (99, percentile(latencies, 99)))},
+            'batch_ms_p50': None if not batch_times else round(percentile(batch_times, 50) * 1000, 3),
+            'batch_size_avg': round(self.counters['scored'] / self.counters['batches'], 2)
+                              if self.counters['batches'] else None
+        })
+        return stats
+
+def create_sentiment_executor():
+    if SENTIMENT_EXECUTOR == 'process':
+        # Each worker process loads its own analyzer on its first batch
+        return concurrent.futures.ProcessPoolExecutor(SENTIMENT_WORKERS)
+    return concurrent.futures.ThreadPoolExecutor(SENTIMENT_WORKERS, thread_name_prefix='sentiment')
+
+sentiment_scorer = SentimentScorer(create_sentiment_executor(), SENTIMENT_WORKERS,
+                                   SENTIMENT_BATCH_SIZE, SENTIMENT_CACHE_SIZE)
+
+# Every open connection, websocket -> Client. Only clients that have joined
+# (have a username) receive broadcasts.
 connected_clients = {}
 
+# Frames a client may have waiting before it is considered too slow and dropped
+SEND_QUEUE_SIZE = int(os.environ.get('SEND_QUEUE_SIZE', 256))
+
+# A connection with its own bounded outbox, drained by a writer task. Broadcasts
+# only enqueue, so a slow socket delays nobody but itself.
+class Client:
+    def __init__(self, websocket):
+        self.websocket = websocket
+        self.username = None
+        self.topics = set()  # subscribed restaurants, and/or GLOBAL_FEED
+        self.outbox = asyncio.Queue(SEND_QUEUE_SIZE)
+        self.writer = asyncio.create_task(self._write())
+        self.closing = None  # task closing the connection, once close() is called
+
+    @property
+    def name(self):
+        return self.username or "(not joined)"
+
+    def send(self, frame):
+        """Queue an encoded frame; False when the outbox is full"""
+        try:
+            self.outbox.put_nowait(frame)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    async def _write(self):
+        while True:
+            frame = await self.outbox.get()
+            try:
+                await self.websocket.send(frame)
+            except websockets.exceptions.ConnectionClosed:
+                return
+
+    def close(self, code=1000, reason=""):
+        """Stop writing and close the connection without waiting for the handshake"""
+        self.writer.cancel()
+        # Kept on the client so the task isn't garbage-collected mid-close
+        self.closing = asyncio.create_task(self.websocket.close(code, reason))
+
+# Reviews go only to clients subscribed to their restaurant or to the global
+# feed. Joining subscribes to the global feed, so clients that never send
+# "subscribe" still get every review.
+GLOBAL_FEED = "*"
+MAX_SUBSCRIPTIONS = int(os.environ.get('MAX_SUBSCRIPTIONS', 100))
+
+# Topic (restaurant name or GLOBAL_FEED) -> subscribed clients
+subscribers = {}
+
+def subscribe(client, topic):
+    if topic not in client.topics and len(client.topics) >= MAX_SUBSCRIPTIONS:
+        raise ValueError(f"At most {MAX_SUBSCRIPTIONS} subscriptions per connection")
+    client.topics.add(topic)
+    subscribers.setdefault(topic, set()).add(client)
+
+def unsubscribe(client, topic):
+    client.topics.discard(topic)
+    topic_subscribers = subscribers.get(topic)
+    if topic_subscribers is not None:
+        topic_subscribers.discard(client)
+        if not topic_subscribers:
+            del subscribers[topic]
+
+def requested_topics(data):
+    """Topics named by a subscribe/unsubscribe message: "restaurant" or a "restaurants" list"""
+    topics = data.get("restaurants", [data.get("restaurant")])
+    if not isinstance(topics, list) or not topics or not all(isinstance(topic, str) and topic for topic in topics):
+        raise ValueError('Expected "restaurant" or a list of "restaurants" ("*" for all)')
+    return topics
+
 # Sample reviews with detailed ratings
-reviews = [
+sample_reviews = [
     {
         "user": "Alice",
         "review": "Great food and amazing ambiance!",
@@ -50,45 +304,149 @@ reviews = [
     }   
 ]
 
+# Reviews replayed to new and reconnecting clients
+REPLAY_BUFFER_SIZE = int(os.environ.get('REPLAY_BUFFER_SIZE', 200))
+
+# Ring buffer of the most recent reviews. Every review gets the next sequence
+# number, so a client that reconnects asks for what came after the last one it saw.
+class ReviewLog:
+    def __init__(self, size):
+        self.entries = deque(maxlen=size)
+        self.last_seq = 0
+        self.full_snapshot = None  # Encoded snapshot of the whole buffer, until the next append
+
+    def __len__(self):
+        return len(self.entries)
+
+    def append(self, review):
+        """Number and store a review; returns it with its "seq" set"""
+        review = dict(review, seq=self.last_seq + 1)
+        self.add(review)
+        return review
+
+    def add(self, review):
+        """Store a review numbered elsewhere; False if it is not newer than the last one"""
+        if review["seq"] <= self.last_seq:
+            return False
+        self.last_seq = review["seq"]
+        self.entries.append(review)
+        self.full_snapshot = None
+        return True
+
+    def since(self, seq):
+        """Reviews after seq, and whether nothing after seq was already evicted"""
+        if seq is None or seq > self.last_seq:
+            # A new client, or a sequence number from before a restart
+            return list(self.entries), seq is None
+        if not self.entries:
+            return [], True
+        first_seq = self.entries[0]["seq"]
+        if seq < first_seq:
+            return list(self.entries), seq >= first_seq - 1
+        # Usually only the last few; scan back from the newest
+        newer = list(takewhile(lambda review: review["seq"] > seq, reversed(self.entries)))
+        newer.reverse()
+        return newer, True
+
+    def snapshot(self, seq=None, restaurants=None):
+        """Encoded "snapshot" frame with the reviews after seq (everything when None), optionally only for restaurants"""
+        if seq is None and restaurants is None and self.full_snapshot is not None:
+            return self.full_snapshot
+        entries, complete = self.since(seq)
+        if restaurants is not None:
+            entries = [review for review in entries if review.get("restaurant") in restaurants]
+        frame = json.dumps({
+            "type": "snapshot",
+            "reviews": entries,
+            "seq": self.last_seq,
+            "complete": complete
+        })
+        if seq is None and restaurants is None:
+            self.full_snapshot = frame
+        return frame
+
+reviews = ReviewLog(REPLAY_BUFFER_SIZE)
+
+async def deliver(message):
+    """Fan a message from the backplane out to this node's clients"""
+    if message.get("type") == "review":
+        # Reviews can arrive twice while a node catches up
+        if not reviews.add(message):
+            return
+        await broadcast_message(message, restaurant=message["restaurant"])
+    else:
+        await broadcast_message(message)
+
+# Connects this process to the others serving the same clients (see backplane.py)
+backplane = create_backplane(reviews, deliver, buffer_size=REPLAY_BUFFER_SIZE)
+if not backplane.shared:
+    for review in sample_reviews:
+        reviews.append({"type": "review", **review})
+
 # WebSocket server configuration
-HOST = '127.0.0.1'
-PORT = 5001
-
-async def broadcast_message(message, exclude=None):
-    """Broadcast message to all connected clients except the excluded one"""
-    logger.info(f"Broadcasting message to {len(connected_clients)} clients")
-    for client in connected_clients:
-        if client != exclude:
-            try:
-                await client.send(json.dumps(message))
-                logger.info(f"Message sent to client {connected_clients[client]}")
-            except websockets.exceptions.ConnectionClosed:
-                logger.warning(f"Client {connected_clients[client]} disconnected during broadcast")
-                await handle_disconnect(client)
+HOST = os.environ.get('HOST', '127.0.0.1')
+PORT = int(os.environ.get('PORT', 5001))
+
+async def broadcast_message(message, exclude=None, restaurant=None):
+    """Broadcast message to all joined clients except the excluded websocket,
+    or when restaurant is given, to the subscribers of it and of the global feed"""
+    frame = json.dumps(message)
+    # Recipients are copied: disconnects below change connected_clients and subscribers
+    if restaurant is None:
+        recipients = [client for client in connected_clients.values() if client.username is not None]
+    else:
+        recipients = list(subscribers.get(GLOBAL_FEED, ()))
+        recipients.extend(client for client in subscribers.get(restaurant, ()) if GLOBAL_FEED not in client.topics)
+    slow = []
+    for client in recipients:
+        if client.websocket is exclude:
+            continue
+        if not client.send(frame):
+            slow.append(client)
+    for client in slow:
+        if connected_clients.get(client.websocket) is not client:
+            # Already dropped by a nested broadcast (its "has left" message)
+            continue
+        logger.warning(f"Dropping client {client.name}: {SEND_QUEUE_SIZE} messages waiting to be sent")
+        client.close(1013, "Too slow to keep up")
+        await handle_disconnect(client.websocket)
 
 async def handle_disconnect(websocket):
     """Handle client disconnection"""
-    if websocket in connected_clients:
-        username = connected_clients[websocket]
-        del connected_clients[websocket]
-        logger.info(f"Client {username} disconnected")
-        await broadcast_message({
-            "type": "system",
-            "message": f"{username} has left the chat",
-            "timestamp": datetime.now().isoformat()
-        })
+    client = connected_clients.pop(websocket, None)
+    if client is None:
+        return
+    client.writer.cancel()
+    for topic in list(client.topics):
+        unsubscribe(client, topic)
+    if client.username is not None:
+        logger.info(f"Client {client.username} disconnected")
+        try:
+            await backplane.publish({
+                "type": "system",
+                "message": f"{client.username} has left the chat",
+                "timestamp": datetime.now().isoformat()
+            })
+        except Exception as e:
+            # The client is gone either way; only the notice is lost
+            logger.error(f"Error announcing that {client.username} left: {e}")
 
 async def handle_message(websocket, message):
     """Handle incoming messages"""
+    client = connected_clients.get(websocket)
+    if client is None:
+        # Dropped as too slow; ignore what it still sends while the close completes
+        return
     try:
         data = json.loads(message)
-        logger.info(f"Received message from {connected_clients[websocket]}: {data}")
+        logger.info(f"Received message from {client.name}: {data}")
         
         if data["type"] == "join":
             username = data["username"]
-            connected_clients[websocket] = username
+            client.username = username
+            subscribe(client, GLOBAL_FEED)
             logger.info(f"New client joined: {username}")
-            await broadcast_message({
+            await backplane.publish({
                 "type": "system",
                 "message": f"{username} has joined the chat",
                 "timestamp": datetime.now().isoformat()
@@ -97,7 +455,7 @@ async def handle_message(websocket, message):
         elif data["type"] == "review":
             # Process the review with sentiment analysis
             text = data["review"]
-            sentiment_score = sia.polarity_scores(text)
+            sentiment_score = await sentiment_scorer.score(text)
             sentiment = "Positive" if sentiment_score['compound'] > 0 else "Negative" if sentiment_score['compound'] < 0 else "Neutral"
             
             review_data = {
@@ -110,39 +468,63 @@ async def handle_message(websocket, message):
                 "timestamp": data["timestamp"]
             }
             
-            # Add to reviews list
-            reviews.append(review_data)
+            # Numbered by the backplane, then buffered and sent to the
+            # restaurant's subscribers on every node by deliver()
+            await backplane.publish_review(review_data)
             logger.info(f"New review added from {data['username']}")
             
-            # Broadcast to all clients
-            await broadcast_message(review_data)
+        elif data["type"] in ("subscribe", "unsubscribe"):
+            update = subscribe if data["type"] == "subscribe" else unsubscribe
+            for topic in requested_topics(data):
+                update(client, topic)
+            client.send(json.dumps({"type": "subscriptions", "restaurants": sorted(client.topics)}))
+            
+        elif data["type"] == "stats":
+            client.send(json.dumps({"type": "stats", **server_stats()}))
+            
+        elif data["type"] == "resume":
+            # Everything after the last review this client saw
+            restaurants = None if not client.topics or GLOBAL_FEED in client.topics else client.topics
+            client.send(reviews.snapshot(parse_seq(data.get("since")), restaurants))
             
     except json.JSONDecodeError as e:
         logger.error(f"JSON decode error: {e}")
-        await websocket.send(json.dumps({
+        client.send(json.dumps({
             "type": "error",
             "message": "Invalid JSON format"
         }))
     except Exception as e:
         logger.error(f"Error handling message: {e}")
-        await websocket.send(json.dumps({
+        client.send(json.dumps({
             "type": "error",
             "message": str(e)
         }))
 
+def parse_seq(value):
+    """A client-supplied sequence number, or None when missing or invalid"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def requested_seq(websocket):
+    """The ?since= sequence number of the connection URL, if any"""
+    # websockets >= 13 exposes the handshake request; older versions only the path
+    request = getattr(websocket, 'request', None)
+    path = request.path if request is not None else getattr(websocket, 'path', '')
+    return parse_seq(parse_qs(urlsplit(path).query).get('since', [None])[0])
+
 async def send_reviews(websocket):
     """Handle WebSocket connection"""
     logger.info("New connection established")
+    client = connected_clients[websocket] = Client(websocket)
     
     try:
-        # Send initial reviews
-        logger.info(f"Sending {len(reviews)} initial reviews")
-        for review in reviews:
-            await websocket.send(json.dumps({
-                "type": "review",
-                **review
-            }))
-            await asyncio.sleep(0.5)  # Small delay between initial reviews
+        # One snapshot frame with the buffered reviews (or those after ?since=),
+        # queued ahead of any broadcast
+        since = requested_seq(websocket)
+        client.send(reviews.snapshot(since))
+        logger.info(f"Sent snapshot after {since} ({len(reviews)} reviews buffered)")
         
         # Handle incoming messages
         async for message in websocket:
@@ -150,15 +532,45 @@ async def send_reviews(websocket):
             
     except websockets.exceptions.ConnectionClosed:
         logger.info("Client connection closed")
-        await handle_disconnect(websocket)
     except Exception as e:
         logger.error(f"Error in send_reviews: {e}")
+    finally:
         await handle_disconnect(websocket)
 
+def server_stats():
+    return {
+        "clients": len(connected_clients),
+        "topics": len(subscribers),
+        "buffered_reviews": len(reviews),
+        "last_seq": reviews.last_seq,
+        "backplane": backplane.stats(),
+        "sentiment": sentiment_scorer.stats()
+    }
+
+async def log_stats():
+    while True:
+        await asyncio.sleep(STATS_LOG_INTERVAL)
+        logger.info(f"Stats: {json.dumps(server_stats())}")
+
+async def warm_up_sentiment():
+    try:
+        await asyncio.get_running_loop().run_in_executor(sentiment_scorer.executor, score_texts, [""])
+    except Exception as e:
+        logger.error(f"Sentiment warm-up failed, the analyzer will be loaded again later: {e}")
+
 async def main():
+    global backplane
+    try:
+        await backplane.start()
+    except Exception as e:
+        logger.error(f"Backplane unavailable, serving this process's clients only: {e}")
+        backplane = create_backplane(reviews, deliver, backend='memory')
     try:
         async with websockets.serve(send_reviews, HOST, PORT):
             logger.info(f"WebSocket server started on ws://{HOST}:{PORT}")
+            # Load the analyzer in the background so the first review doesn't wait for it
+            warm_up_task = asyncio.create_task(warm_up_sentiment())
+            stats_task = asyncio.create_task(log_stats()) if STATS_LOG_INTERVAL > 0 else None
             await asyncio.Future()  # run forever
     except Exception as e:
         logger.error(f"Server error: {e}")
@@ -0,0 +1,95 @@
+import asyncio
+
+from local_redis import LocalRedisServer
+from backplane import RedisBackplane
+from socket_server import ReviewLog
+
+class Node:
+    """A socket-server process: its backplane and the review log deliver() keeps"""
+    def __init__(self, url, buffer_size=30):
+        self.log = ReviewLog(100)
+        self.received = []  # seq of every review delivered, duplicates included
+        self.backplane = RedisBackplane(self.deliver, url, buffer_size=buffer_size, retry_delay=0.05)
+
+    async def deliver(self, message):
+        self.received.append(message["seq"])
+        self.log.add(message)
+
+    def seqs(self):
+        return [review["seq"] for review in self.log.entries]
+
+    def order(self):
+        return [review["review"] for review in self.log.entries]
+
+async def wait_until(condition, timeout=5):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+def review(text):
+    return {"type": "review", "restaurant": "Bistro", "review": text}
+
+def test_nodes_share_review_order():
+    """Test that concurrent publishes from two nodes are numbered once and seen in the same order by both"""
+    server = LocalRedisServer().start()
+    url = f"redis://127.0.0.1:{server.port}/0"
+
+    async def scenario():
+        first, second = Node(url), Node(url)
+        await first.backplane.start()
+        await second.backplane.start()
+        await asyncio.gather(*(node.backplane.publish_review(review(f"{name}{number}"))
+                               for number in range(20) for name, node in (("a", first), ("b", second))))
+        await wait_until(lambda: first.log.last_seq == 40 and second.log.last_seq == 40)
+        for node in (first, second):
+            await node.backplane.close()
+        return first, second
+
+    try:
+        first, second = asyncio.run(scenario())
+    finally:
+        server.stop()
+    assert first.seqs() == list(range(1, 41))
+    assert first.order() == second.order()
+    assert len(set(first.order())) == 40
+    assert first.backplane.stats()['published'] + second.backplane.stats()['published'] == 40
+
+def test_late_node_catches_up_and_drops_overlap():
+    """Test that a node started later gets the buffered reviews, and those it also receives live only once"""
+    server = LocalRedisServer().start()
+    url = f"redis://127.0.0.1:{server.port}/0"
+
+    async def scenario():
+        first = Node(url)
+        await first.backplane.start()
+        for number in range(40):
+            await first.backplane.publish_review(review(f"a{number}"))
+
+        late = Node(url)
+        # Publish right after the late node subscribes and before it reads the
+        # buffer, so that review reaches it both ways
+        read_buffer = late.backplane._command
+
+        async def publish_then_read_buffer(commands):
+            late.backplane._command = read_buffer
+            await first.backplane.publish_review(review("overlap"))
+            return await read_buffer(commands)
+
+        late.backplane._command = publish_then_read_buffer
+        await late.backplane.start()
+        await wait_until(lambda: late.received.count(41) == 2)
+        await first.backplane.publish_review(review("live"))
+        await wait_until(lambda: late.log.last_seq == 42 and first.log.last_seq == 42)
+        for node in (first, late):
+            await node.backplane.close()
+        return first, late
+
+    try:
+        first, late = asyncio.run(scenario())
+    finally:
+        server.stop()
+    # Only the last buffer_size (30) reviews were kept in Redis
+    assert late.seqs() == list(range(12, 43))
+    assert late.order() == first.order()[-31:]
+    assert late.order()[-2:] == ["overlap", "live"]
@@ -0,0 +1,329 @@
+import asyncio
+import concurrent.futures
+import json
+import threading
+
+import pytest
+import websockets.exceptions  # noqa: F401 (imported by websockets.serve when the server runs)
+
+import socket_server
+from backplane import InProcessBackplane
+from socket_server import ReviewLog, SentimentScorer, handle_disconnect, handle_message, requested_topics
+
+def test_sentiment_analyzer_failure_is_retried_after_backoff(monkeypatch):
+    """Test that a failed analyzer load is not retried by every call, but is retried once the delay has passed"""
+    attempts = []
+
+    def load():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise LookupError("Resource vader_lexicon not found")
+        return FakeAnalyzer()
+
+    monkeypatch.setattr(socket_server, '_sia', None)
+    monkeypatch.setattr(socket_server, '_sia_error', None)
+    monkeypatch.setattr(socket_server, '_sia_retry_delay', 1.0)
+    monkeypatch.setattr(socket_server, 'load_sentiment_analyzer', load)
+    for _ in range(3):
+        with pytest.raises(RuntimeError, match="vader_lexicon"):
+            socket_server.score_texts(["Great food"])
+    assert len(attempts) == 1
+    assert socket_server._sia_retry_delay == 2.0
+
+    # The delay has passed: tried again, failing again doubles the delay
+    monkeypatch.setattr(socket_server, '_sia_retry_at', 0.0)
+    with pytest.raises(RuntimeError):
+        socket_server.score_texts(["Great food"])
+    assert len(attempts) == 2
+    assert socket_server._sia_retry_delay == 4.0
+
+    monkeypatch.setattr(socket_server, '_sia_retry_at', 0.0)
+    assert socket_server.score_texts(["Great food"]) == [{"compound": 0.5}]
+    assert len(attempts) == 3
+    assert socket_server._sia_error is None
+
+class FakeAnalyzer:
+    def polarity_scores(self, text):
+        return {"compound": 0.5}
+
+def make_log(count, size=5):
+    log = ReviewLog(size)
+    for number in range(count):
+        log.append({"type": "review", "restaurant": f"R{number % 2}", "review": str(number)})
+    return log
+
+def test_review_log_since_reports_evicted_reviews():
+    """Test that resuming is complete only when nothing after seq was evicted"""
+    log = make_log(8)  # 1-3 evicted, 4-8 kept
+    assert [r["seq"] for r in log.since(6)[0]] == [7, 8]
+    assert log.since(6)[1]
+    assert log.since(8) == ([], True)
+    # Everything after 3 is still there
+    entries, complete = log.since(3)
+    assert [r["seq"] for r in entries] == [4, 5, 6, 7, 8]
+    assert complete
+    # 3 itself was missed
+    assert not log.since(2)[1]
+
+def test_review_log_since_seq_from_before_restart():
+    """Test that a seq newer than anything in the log (e.g. after a restart) gets everything, flagged incomplete"""
+    log = make_log(3)
+    entries, complete = log.since(50)
+    assert [r["seq"] for r in entries] == [1, 2, 3]
+    assert not complete
+    # A new client is not missing anything
+    assert log.since(None)[1]
+
+def test_review_log_snapshot_cache():
+    """Test that the cached full snapshot is replaced once a review is added"""
+    log = make_log(2)
+    first = log.snapshot()
+    assert log.snapshot() is first
+    assert not log.add({"type": "review", "restaurant": "R0", "seq": 2})
+    assert log.snapshot() is first
+    log.append({"type": "review", "restaurant": "R1", "review": "new"})
+    frame = json.loads(log.snapshot())
+    assert frame["seq"] == 3
+    assert frame["complete"]
+    assert [r["seq"] for r in frame["reviews"]] == [1, 2, 3]
+    # Filtered snapshots are never cached
+    filtered = json.loads(log.snapshot(seq=1, restaurants={"R1"}))
+    assert [r["seq"] for r in filtered["reviews"]] == [2, 3]
+    assert json.loads(log.snapshot()) == frame
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+        self.closed = []  # close codes
+
+    async def send(self, frame):
+        self.sent.append(json.loads(frame))
+
+    def frames(self, frame_type):
+        return [frame for frame in self.sent if frame["type"] == frame_type]
+
+    async def close(self, code=1000, reason=""):
+        self.closed.append(code)
+
+class StalledWebSocket(FakeWebSocket):
+    """A client that stopped reading: the first send never completes"""
+    async def send(self, frame):
+        await asyncio.Event().wait()
+
+@pytest.fixture
+def server_state(monkeypatch):
+    """Fresh clients, subscriptions and review log for each test"""
+    log = ReviewLog(10)
+    monkeypatch.setattr(socket_server, 'connected_clients', {})
+    monkeypatch.setattr(socket_server, 'subscribers', {})
+    monkeypatch.setattr(socket_server, 'reviews', log)
+    monkeypatch.setattr(socket_server, 'backplane', InProcessBackplane(log, socket_server.deliver))
+    return socket_server
+
+async def connect(username, subscribe=None, unsubscribe=None):
+    websocket = FakeWebSocket()
+    socket_server.connected_clients[websocket] = socket_server.Client(websocket)
+    await send(websocket, type="join", username=username)
+    if unsubscribe:
+        await send(websocket, type="unsubscribe", restaurants=unsubscribe)
+    if subscribe:
+        await send(websocket, type="subscribe", restaurants=subscribe)
+    return websocket
+
+async def send(websocket, **message):
+    await handle_message(websocket, json.dumps(message))
+    # Let the writer tasks catch up
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+async def publish(restaurant):
+    await socket_server.backplane.publish_review({"type": "review", "user": "x", "restaurant": restaurant})
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+def test_reviews_go_to_subscribers_once(server_state):
+    """Test restaurant-scoped delivery, including clients on both the global feed and the restaurant"""
+    async def scenario():
+        everything = await connect("alice", subscribe=["Bistro"])
+        bistro = await connect("bob", subscribe=["Bistro"], unsubscribe=["*"])
+        diner = await connect("carol", subscribe=["Diner"], unsubscribe=["*"])
+        await publish("Bistro")
+        return everything, bistro, diner
+
+    everything, bistro, diner = asyncio.run(scenario())
+    assert len(everything.frames("review")) == 1
+    assert len(bistro.frames("review")) == 1
+    assert diner.frames("review") == []
+    assert bistro.frames("subscriptions")[-1]["restaurants"] == ["Bistro"]
+
+def test_subscription_limit(server_state, monkeypatch):
+    """Test that a connection can't subscribe to more than MAX_SUBSCRIPTIONS topics"""
+    monkeypatch.setattr(socket_server, 'MAX_SUBSCRIPTIONS', 3)
+
+    async def scenario():
+        websocket = await connect("alice")  # subscribed to "*"
+        await send(websocket, type="subscribe", restaurants=["A", "B", "C"])
+        await send(websocket, type="subscribe", restaurant="A")  # already subscribed
+        return websocket
+
+    websocket = asyncio.run(scenario())
+    assert "At most 3 subscriptions" in websocket.frames("error")[0]["message"]
+    assert len(websocket.frames("error")) == 1
+    assert set(server_state.subscribers) == {"*", "A", "B"}
+    with pytest.raises(ValueError):
+        requested_topics({"restaurants": ["A", ""]})
+
+def test_disconnect_removes_subscriptions(server_state):
+    """Test that a disconnected client is no longer indexed under any topic"""
+    async def scenario():
+        staying = await connect("alice", subscribe=["Bistro"])
+        leaving = await connect("bob", subscribe=["Bistro", "Diner"])
+        await handle_disconnect(leaving)
+        return staying
+
+    staying = asyncio.run(scenario())
+    clients = server_state.connected_clients
+    assert set(server_state.subscribers) == {"*", "Bistro"}
+    assert server_state.subscribers["Bistro"] == {clients[staying]}
+    assert server_state.subscribers["*"] == {clients[staying]}
+
+def test_resume_replays_subscribed_restaurants(server_state):
+    """Test that resuming without the global feed replays only the subscribed restaurants"""
+    async def scenario():
+        diner = await connect("carol", subscribe=["Diner"], unsubscribe=["*"])
+        for restaurant in ("Bistro", "Diner", "Cafe", "Diner"):
+            await publish(restaurant)
+        await send(diner, type="resume", since=1)
+        everything = await connect("alice")
+        await send(everything, type="resume", since=1)
+        return diner, everything
+
+    diner, everything = asyncio.run(scenario())
+    snapshot = diner.frames("snapshot")[0]
+    assert [review["seq"] for review in snapshot["reviews"]] == [2, 4]
+    assert snapshot["seq"] == 4
+    assert [review["seq"] for review in everything.frames("snapshot")[0]["reviews"]] == [2, 3, 4]
+
+def test_slow_clients_are_dropped(server_state, monkeypatch):
+    """Test that clients whose outbox fills up are closed with 1013 once each, without holding up the others"""
+    monkeypatch.setattr(socket_server, 'SEND_QUEUE_SIZE', 3)
+
+    async def scenario():
+        fast = await connect("alice")
+        stalled = []
+        for name in ("bob", "carol"):
+            websocket = StalledWebSocket()
+            socket_server.connected_clients[websocket] = socket_server.Client(websocket)
+            await handle_message(websocket, json.dumps({"type": "join", "username": name}))
+            stalled.append(websocket)
+        clients = [server_state.connected_clients[websocket] for websocket in stalled]
+        for number in range(10):
+            await socket_server.broadcast_message({"type": "system", "message": str(number)})
+            await asyncio.sleep(0)
+        for _ in range(5):
+            await asyncio.sleep(0)
+        assert all(client.closing.done() for client in clients)
+        return fast, stalled, [server_state.connected_clients.get(websocket) for websocket in stalled]
+
+    fast, stalled, remaining = asyncio.run(scenario())
+    assert remaining == [None, None]
+    assert [websocket.closed for websocket in stalled] == [[1013], [1013]]
+    assert server_state.subscribers == {"*": {server_state.connected_clients[fast]}}
+    messages = [frame["message"] for frame in fast.frames("system")]
+    assert [message for message in messages if message.isdigit()] == [str(number) for number in range(10)]
+    assert "bob has left the chat" in messages
+    assert "carol has left the chat" in messages
+
+class StubScorer:
+    """Stands in for score_texts: records batches, and holds the first one until released"""
+    def __init__(self, error=None):
+        self.batches = []
+        self.error = error
+        self.release = threading.Event()
+
+    def __call__(self, texts):
+        self.batches.append(list(texts))
+        self.release.wait(5)
+        if self.error is not None:
+            raise self.error
+        return [{"compound": len(text)} for text in texts]
+
+def make_scorer(monkeypatch, stub, cache_size=100):
+    monkeypatch.setattr(socket_server, 'score_texts', stub)
+    executor = concurrent.futures.ThreadPoolExecutor(1)
+    return SentimentScorer(executor, workers=1, batch_size=3, cache_size=cache_size)
+
+async def settle():
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+def test_sentiment_scorer_batches_and_coalesces(monkeypatch):
+    """Test that texts queued behind a busy worker are scored in batches, once per distinct text"""
+    stub = StubScorer()
+    scorer = make_scorer(monkeypatch, stub)
+
+    async def scenario():
+        first = asyncio.ensure_future(scorer.score("a"))
+        await settle()
+        # Queued while "a" is being scored; "b  " and "b" normalize to the same key
+        rest = [asyncio.ensure_future(scorer.score(text)) for text in ("b", "cc", "ddd", "b  ", "eeee", "cc")]
+        await settle()
+        stub.release.set()
+        results = await asyncio.gather(first, *rest)
+        cached = await scorer.score("cc")
+        return results, cached
+
+    results, cached = asyncio.run(scenario())
+    assert [scores["compound"] for scores in results] == [1, 1, 2, 3, 1, 4, 2]
+    assert stub.batches == [["a"], ["b", "cc", "ddd"], ["eeee"]]
+    assert cached == {"compound": 2}
+    stats = scorer.stats()
+    assert (stats['coalesced'], stats['cache_hits'], stats['batches'], stats['scored']) == (2, 1, 3, 5)
+    assert stats['pending'] == 0
+
+def test_sentiment_scorer_cache_is_lru(monkeypatch):
+    """Test that the memo cache keeps the most recently used scores up to its size"""
+    stub = StubScorer()
+    stub.release.set()
+    scorer = make_scorer(monkeypatch, stub, cache_size=2)
+
+    async def scenario():
+        for text in ("x", "y", "x", "z", "y", "x"):
+            await scorer.score(text)
+
+    asyncio.run(scenario())
+    # "x" was used after "y", so "y" is evicted by "z", and then "x" by "y"
+    assert stub.batches == [["x"], ["y"], ["z"], ["y"], ["x"]]
+    assert scorer.stats()['cache_hits'] == 1
+
+def test_sentiment_scorer_error_reaches_every_waiter(monkeypatch):
+    """Test that a failed batch fails every review waiting on it, including coalesced ones, and isn't cached"""
+    stub = StubScorer(error=RuntimeError("analyzer unavailable"))
+    scorer = make_scorer(monkeypatch, stub)
+
+    async def scenario():
+        waiters = [asyncio.ensure_future(scorer.score(text)) for text in ("a", "b", "a")]
+        await settle()
+        stub.release.set()
+        return await asyncio.gather(*waiters, return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert [str(result) for result in results] == ["analyzer unavailable"] * 3
+    assert all(isinstance(result, RuntimeError) for result in results)
+    stats = scorer.stats()
+    assert (stats['errors'], stats['pending'], stats['cache_size']) == (1, 0, 0)
+
+def test_disconnect_survives_backplane_outage(server_state):
+    """Test that a client is cleaned up even when its "has left" notice can't be published"""
+    class DownBackplane:
+        async def publish(self, message):
+            raise ConnectionError("Connection closed by Redis")
+
+    async def scenario():
+        websocket = await connect("alice", subscribe=["Bistro"])
+        server_state.backplane = DownBackplane()
+        await handle_disconnect(websocket)
+
+    asyncio.run(scenario())
+    assert server_state.connected_clients == {}
+    assert server_state.subscribers == {}
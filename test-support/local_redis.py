@@ -0,0 +1,337 @@
+"""Local stand-in for the handful of Redis commands the backend and the socket
+server use. It imports neither, so both test suites can share it.
+
+For development without a Redis server and for tests:
+    python test-support/local_redis.py [--port 6379]
+then run the backend with RATE_LIMIT_BACKEND=redis, or socket servers with
+BACKPLANE=redis (pub/sub, lists and WATCH/MULTI/EXEC are supported too).
+"""
+import argparse
+import socket
+import socketserver
+import threading
+import time
+
+# Commands that modify their first key (DEL: every key), for WATCH
+WRITE_COMMANDS = {'set', 'incrby', 'incr', 'decr', 'pexpire', 'expire', 'del', 'rpush', 'ltrim'}
+
+class KeyValueStore:
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.data = {}
+        self.expiry = {}  # key -> deadline
+        self.versions = {}  # key -> write count, compared by EXEC for WATCHed keys
+        self.channels = {}  # channel -> subscribed handlers
+        # Reentrant so EXEC can run its queued commands while holding it
+        self.lock = threading.RLock()
+
+    def _live(self, key):
+        # Caller holds the lock
+        deadline = self.expiry.get(key)
+        if deadline is not None and deadline <= self.clock():
+            self.data.pop(key, None)
+            self.expiry.pop(key, None)
+        return key in self.data
+
+    def execute(self, name, args):
+        with self.lock:
+            handler = getattr(self, 'cmd_' + name.lower(), None)
+            if handler is None:
+                return Exception(f"ERR unknown command '{name}'")
+            try:
+                reply = handler(*args)
+            except (TypeError, ValueError):
+                return Exception(f"ERR wrong arguments for '{name}'")
+            if name.lower() in WRITE_COMMANDS:
+                for key in (args if name.lower() == 'del' else args[:1]):
+                    self.versions[key] = self.versions.get(key, 0) + 1
+            return reply
+
+    def version(self, key):
+        with self.lock:
+            return self.versions.get(key, 0)
+
+    def cmd_ping(self, message=None):
+        return message if message is not None else 'PONG'
+
+    def cmd_auth(self, *args):
+        return 'OK'
+
+    def cmd_select(self, db):
+        return 'OK'
+
+    def cmd_get(self, key):
+        return self.data[key] if self._live(key) else None
+
+    def cmd_set(self, key, value, *options):
+        self.data[key] = value
+        self.expiry.pop(key, None)
+        options = [option.upper() if isinstance(option, bytes) else option for option in options]
+        if b'PX' in options:
+            self.cmd_pexpire(key, options[options.index(b'PX') + 1])
+        elif b'EX' in options:
+            self.cmd_expire(key, options[options.index(b'EX') + 1])
+        return 'OK'
+
+    def cmd_incrby(self, key, amount):
+        value = int(self.data[key]) if self._live(key) else 0
+        value += int(amount)
+        self.data[key] = str(value).encode('ascii')
+        return value
+
+    def cmd_incr(self, key):
+        return self.cmd_incrby(key, 1)
+
+    def cmd_decr(self, key):
+        return self.cmd_incrby(key, -1)
+
+    def cmd_pexpire(self, key, milliseconds):
+        if not self._live(key):
+            return 0
+        self.expiry[key] = self.clock() + int(milliseconds) / 1000
+        return 1
+
+    def cmd_expire(self, key, seconds):
+        return self.cmd_pexpire(key, int(seconds) * 1000)
+
+    def cmd_pttl(self, key):
+        if not self._live(key):
+            return -2
+        deadline = self.expiry.get(key)
+        return -1 if deadline is None else int((deadline - self.clock()) * 1000)
+
+    def cmd_del(self, *keys):
+        removed = 0
+        for key in keys:
+            if self._live(key):
+                removed += 1
+            self.data.pop(key, None)
+            self.expiry.pop(key, None)
+        return removed
+
+    def cmd_flushall(self, *args):
+        for key in list(self.data):
+            self.versions[key] = self.versions.get(key, 0) + 1
+        self.data.clear()
+        self.expiry.clear()
+        return 'OK'
+
+    def cmd_rpush(self, key, *values):
+        if not values:
+            raise ValueError(key)
+        items = self.data[key] if self._live(key) else []
+        if not isinstance(items, list):
+            return Exception("WRONGTYPE Operation against a key holding the wrong kind of value")
+        items.extend(values)
+        self.data[key] = items
+        return len(items)
+
+    def _list(self, key):
+        items = self.data[key] if self._live(key) else []
+        if not isinstance(items, list):
+            raise ValueError(key)
+        return items
+
+    @staticmethod
+    def _range(length, start, stop):
+        start, stop = int(start), int(stop)
+        start = max(0, start + length if start < 0 else start)
+        stop = stop + length if stop < 0 else min(stop, length - 1)
+        return start, stop
+
+    def cmd_lrange(self, key, start, stop):
+        items = self._list(key)
+        start, stop = self._range(len(items), start, stop)
+        return items[start:stop + 1]
+
+    def cmd_ltrim(self, key, start, stop):
+        items = self._list(key)
+        start, stop = self._range(len(items), start, stop)
+        del items[stop + 1:]
+        del items[:start]
+        if not items:
+            self.data.pop(key, None)
+        return 'OK'
+
+    def cmd_llen(self, key):
+        return len(self._list(key))
+
+    def cmd_publish(self, channel, message):
+        # Sent while holding the store lock, so every subscriber sees one order
+        subscribers = self.channels.get(channel, ())
+        frame = encode_reply([b'message', channel, message])
+        for handler in list(subscribers):
+            handler.push(frame)
+        return len(subscribers)
+
+    def subscribe(self, channel, handler):
+        with self.lock:
+            self.channels.setdefault(channel, set()).add(handler)
+
+    def unsubscribe(self, channel, handler):
+        with self.lock:
+            subscribers = self.channels.get(channel)
+            if subscribers is not None:
+                subscribers.discard(handler)
+                if not subscribers:
+                    del self.channels[channel]
+
+def encode_reply(reply):
+    if reply is None:
+        return b'$-1\r\n'
+    if isinstance(reply, Exception):
+        return b'-%s\r\n' % str(reply).encode('utf-8')
+    if isinstance(reply, str):
+        return b'+%s\r\n' % reply.encode('utf-8')
+    if isinstance(reply, int):
+        return b':%d\r\n' % reply
+    if isinstance(reply, bytes):
+        return b'$%d\r\n%s\r\n' % (len(reply), reply)
+    return b'*%d\r\n' % len(reply) + b''.join(encode_reply(item) for item in reply)
+
+# One client connection. Transactions and subscriptions are per connection, so
+# they are handled here; everything else goes to the shared store.
+def read_command(reader):
+    """Next command from a client: a RESP array of bulk strings"""
+    line = reader.readline()
+    if not line.startswith(b'*') or not line.endswith(b'\r\n'):
+        raise ConnectionError("Connection closed or not a command")
+    args = []
+    for _ in range(int(line[1:-2])):
+        header = reader.readline()
+        if not header.startswith(b'$'):
+            raise ConnectionError("Expected a bulk string")
+        length = int(header[1:-2])
+        data = reader.read(length + 2)
+        if len(data) != length + 2:
+            raise ConnectionError("Connection closed mid-command")
+        args.append(data[:-2])
+    return args
+
+class RESPHandler(socketserver.StreamRequestHandler):
+    def setup(self):
+        super().setup()
+        # Replies are written one by one; don't let Nagle hold them back
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.server.connections.add(self.connection)
+        self.write_lock = threading.Lock()  # replies and published messages share the socket
+        self.transaction = None  # queued commands between MULTI and EXEC
+        self.watched = {}  # key -> version when WATCHed
+        self.channels = set()
+
+    def finish(self):
+        for channel in self.channels:
+            self.server.store.unsubscribe(channel, self)
+        self.server.connections.discard(self.connection)
+        super().finish()
+
+    def push(self, data):
+        with self.write_lock:
+            try:
+                self.wfile.write(data)
+            except OSError:
+                pass
+
+    def handle(self):
+        while True:
+            try:
+                command = read_command(self.rfile)
+            except (ConnectionError, ValueError, OSError):
+                return
+            if not command:
+                return
+            name = command[0].decode('utf-8').lower()
+            args = command[1:]
+            session_command = getattr(self, 'cmd_' + name, None)
+            if session_command is not None:
+                try:
+                    session_command(*args)
+                except TypeError:
+                    self.push(encode_reply(Exception(f"ERR wrong arguments for '{name}'")))
+            elif self.transaction is not None:
+                self.transaction.append((name, args))
+                self.push(encode_reply('QUEUED'))
+            else:
+                self.push(encode_reply(self.server.store.execute(name, args)))
+
+    def cmd_multi(self):
+        self.transaction = []
+        self.push(encode_reply('OK'))
+
+    def cmd_discard(self):
+        self.transaction = None
+        self.watched = {}
+        self.push(encode_reply('OK'))
+
+    def cmd_watch(self, *keys):
+        for key in keys:
+            self.watched[key] = self.server.store.version(key)
+        self.push(encode_reply('OK'))
+
+    def cmd_unwatch(self):
+        self.watched = {}
+        self.push(encode_reply('OK'))
+
+    def cmd_exec(self):
+        if self.transaction is None:
+            self.push(encode_reply(Exception("ERR EXEC without MULTI")))
+            return
+        store = self.server.store
+        queued, self.transaction = self.transaction, None
+        watched, self.watched = self.watched, {}
+        with store.lock:
+            if any(store.version(key) != version for key, version in watched.items()):
+                replies = None  # a watched key changed: abort
+            else:
+                replies = [store.execute(name, args) for name, args in queued]
+        self.push(encode_reply(replies))
+
+    def cmd_subscribe(self, *channels):
+        for channel in channels:
+            self.channels.add(channel)
+            self.server.store.subscribe(channel, self)
+            self.push(encode_reply([b'subscribe', channel, len(self.channels)]))
+
+    def cmd_unsubscribe(self, *channels):
+        for channel in channels or list(self.channels):
+            self.channels.discard(channel)
+            self.server.store.unsubscribe(channel, self)
+            self.push(encode_reply([b'unsubscribe', channel, len(self.channels)]))
+
+class LocalRedisServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', port=0):
+        """port=0 picks a free port; see self.port"""
+        super().__init__((host, port), RESPHandler)
+        self.store = KeyValueStore()
+        self.connections = set()
+        self.port = self.server_address[1]
+
+    def start(self):
+        """Serve from a background thread"""
+        threading.Thread(target=self.serve_forever, name='local-redis', daemon=True).start()
+        return self
+
+    def stop(self):
+        """Stop listening and drop every client connection"""
+        self.shutdown()
+        self.server_close()
+        for connection in list(self.connections):
+            try:
+                connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=6379)
+    args = parser.parse_args()
+    server = LocalRedisServer(args.host, args.port)
+    print(f"Local Redis stand-in listening on {args.host}:{server.port}")
+    server.serve_forever()
+
+if __name__ == '__main__':
+    main()